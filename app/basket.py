@@ -0,0 +1,209 @@
+# app/basket.py
+
+import os
+import threading
+import numpy as np
+import pandas as pd
+from utils import get_detail_frame, content_fingerprints
+
+# === Basket Layout ===
+# Market-basket counts over the shared detail frame. A basket is the set of
+# distinct items in one transaction on one date (two lattes count once), kept
+# as a sparse transaction × item incidence matrix in CSR form: baskets sorted
+# by id, items sorted within a basket, items dictionary-encoded. Pairs are
+# enumerated one offset at a time (entry i with entry i + offset) over only
+# the entries whose basket still has an entry that far ahead, so the cost is
+# O(entries + pairs), i.e. sum(k²) over baskets of k items, and one very large
+# basket only costs its own pairs.
+#
+# Counts are kept per date, so after a load only new or changed dates are
+# re-counted (like app/cube.py): their old counts are subtracted and the new
+# ones added. A pair is stored as one int64 code, first item << 32 | second,
+# which stays valid as the item dictionary grows.
+TOP_PAIRS = int(os.getenv("BASKET_TOP_PAIRS", "15"))
+MIN_PAIR_ORDERS = int(os.getenv("BASKET_MIN_PAIR_ORDERS", "3"))
+PAIR_SHIFT = 32
+
+
+def _merge(codes: list, counts: list) -> tuple:
+    """Sum counts over equal codes; codes whose count nets to zero are dropped."""
+    codes, counts = np.concatenate(codes), np.concatenate(counts)
+    merged, inverse = np.unique(codes, return_inverse=True)
+    totals = np.bincount(inverse, weights=counts, minlength=len(merged)).round().astype("int64")
+    keep = totals != 0
+    return merged[keep], totals[keep]
+
+
+class Basket:
+    """Item and item-pair order counts over every basket in the detail frame."""
+
+    def __init__(self):
+        self.labels = []
+        self.index = {}
+        self.baskets = 0
+        self.item_counts = np.zeros(0, dtype="int64")
+        self.pair_codes = np.zeros(0, dtype="int64")
+        self.pair_counts = np.zeros(0, dtype="int64")
+        # date -> (content hash of its (transaction_id, item) rows, baskets, item codes, item counts, pair codes, pair counts)
+        self.by_date = {}
+
+    def copy(self) -> "Basket":
+        # Arrays are replaced, never written in place, so they can be shared.
+        basket = Basket()
+        basket.labels = list(self.labels)
+        basket.index = dict(self.index)
+        basket.baskets = self.baskets
+        basket.item_counts = self.item_counts
+        basket.pair_codes, basket.pair_counts = self.pair_codes, self.pair_counts
+        basket.by_date = dict(self.by_date)
+        return basket
+
+    # === Building ===
+    def _encode(self, values) -> np.ndarray:
+        """Item codes of `values`, growing the item dictionary for new items."""
+        codes, uniques = pd.factorize(values)
+        for label in uniques:
+            if label not in self.index:
+                self.index[label] = len(self.labels)
+                self.labels.append(label)
+        lookup = np.array([self.index[u] for u in uniques], dtype="int64")
+        return lookup[codes]
+
+    def _count(self, sub: pd.DataFrame, dates: list) -> dict:
+        """Per-date (baskets, item codes, item counts, pair codes, pair counts) for the rows of `dates`."""
+        date_pos = pd.Index(dates).get_indexer(sub["date"]).astype("int64")
+        txn = sub["transaction_id"].cat.codes.to_numpy().astype("int64")
+        n_txn = max(len(sub["transaction_id"].cat.categories), 1)
+        item = self._encode(sub["item"])
+        n_items = len(self.labels)
+
+        # Incidence entries sorted by (basket, item), one per distinct item in a basket.
+        entries = np.unique((date_pos * n_txn + txn) * n_items + item)
+        basket_id, item = entries // n_items, entries % n_items
+        basket_date = basket_id // n_txn
+        firsts = np.unique(basket_id, return_index=True)[1]
+        baskets = np.bincount(basket_date[firsts], minlength=len(dates))
+        items = np.bincount(basket_date * n_items + item, minlength=len(dates) * n_items).reshape(len(dates), n_items)
+
+        # Pairs: entry i with entry i + offset while both are in the same basket.
+        # `active` shrinks to the entries with a partner `offset` ahead each pass.
+        sizes = np.diff(np.append(firsts, len(entries)))
+        end = np.repeat(firsts + sizes, sizes)  # one past the last entry of each entry's basket
+        active, offset, pair_keys = np.arange(len(entries)), 1, []
+        while True:
+            active = active[active + offset < end[active]]
+            if not len(active):
+                break
+            first, second = item[active], item[active + offset]
+            pair_keys.append((basket_date[active] * n_items + first) * n_items + second)
+            offset += 1
+        pair_keys, pair_counts = np.unique(
+            np.concatenate(pair_keys) if pair_keys else np.zeros(0, dtype="int64"), return_counts=True
+        )
+        pair_date = pair_keys // (n_items * n_items)
+        pair_codes = ((pair_keys // n_items) % n_items << PAIR_SHIFT) | (pair_keys % n_items)
+        bounds = np.searchsorted(pair_date, np.arange(len(dates) + 1))
+
+        counted = {}
+        for pos, day in enumerate(dates):
+            sold = np.flatnonzero(items[pos])
+            pairs = slice(bounds[pos], bounds[pos + 1])
+            counted[day] = (int(baskets[pos]), sold, items[pos][sold], pair_codes[pairs], pair_counts[pairs].astype("int64"))
+        return counted
+
+    def update(self, df: pd.DataFrame) -> int:
+        """
+        Bring the counts in line with `df` (the shared detail frame).
+
+        Only dates that are new or whose (transaction_id, item) rows changed
+        are re-counted; dates missing from df are subtracted.
+
+        Returns:
+            Number of dates re-counted or removed.
+        """
+        df = df[df["transaction_id"].notna() & df["item"].notna()]
+        day_codes, days = pd.factorize(df["date"])
+        hashes = content_fingerprints(df, day_codes, len(days), ["transaction_id", "item"])
+        fingerprints = dict(zip(days, hashes.tolist()))
+        changed = [day for day, fp in fingerprints.items() if day not in self.by_date or self.by_date[day][0] != fp]
+        removed = [day for day in self.by_date if day not in fingerprints]
+        if not changed and not removed:
+            return 0
+
+        counted = {}
+        if changed:
+            rows = pd.Index(changed).get_indexer(df["date"]) >= 0
+            sub = df.loc[rows].copy()
+            sub["transaction_id"] = sub["transaction_id"].astype("category").cat.remove_unused_categories()
+            counted = self._count(sub, changed)
+
+        # (sign, baskets, item codes, item counts, pair codes, pair counts): old counts out, new ones in.
+        deltas = [(-1, *self.by_date.pop(day)[1:]) for day in removed + [d for d in changed if d in self.by_date]]
+        for day, counts in counted.items():
+            self.by_date[day] = (fingerprints[day], *counts)
+            deltas.append((1, *counts))
+
+        self.baskets += sum(sign * baskets for sign, baskets, *_ in deltas)
+        self.item_counts = np.pad(self.item_counts, (0, len(self.labels) - len(self.item_counts))) + np.bincount(
+            np.concatenate([d[2] for d in deltas]),
+            weights=np.concatenate([d[0] * d[3] for d in deltas]),
+            minlength=len(self.labels),
+        ).round().astype("int64")
+        self.pair_codes, self.pair_counts = _merge(
+            [self.pair_codes] + [d[4] for d in deltas],
+            [self.pair_counts] + [d[0] * d[5] for d in deltas],
+        )
+        return len(changed) + len(removed)
+
+    # === Rules ===
+    def top_pairs(self, n: int = TOP_PAIRS, min_orders: int = MIN_PAIR_ORDERS) -> pd.DataFrame:
+        """
+        Item pairs bought together in at least `min_orders` orders, by lift.
+
+        Returns:
+            Columns item_a, item_b, orders (baskets with both), support (share
+            of all baskets), confidence_a_b (share of item_a's baskets that
+            have item_b), confidence_b_a and lift (support over what
+            independent items would give; > 1 means they sell together).
+        """
+        keep = self.pair_counts >= min_orders
+        codes, together = self.pair_codes[keep], self.pair_counts[keep]
+        first, second = codes >> PAIR_SHIFT, codes & ((1 << PAIR_SHIFT) - 1)
+        count_a, count_b = self.item_counts[first], self.item_counts[second]
+        lift = together * self.baskets / (count_a * count_b) if len(codes) else np.zeros(0)
+        order = np.lexsort((second, first, -together, -lift))[:n]
+        labels = np.array(self.labels, dtype=object)
+        return pd.DataFrame({
+            "item_a": labels[first[order]],
+            "item_b": labels[second[order]],
+            "orders": together[order],
+            "support": (together[order] / max(self.baskets, 1)).round(4),
+            "confidence_a_b": (together[order] / count_a[order]).round(3),
+            "confidence_b_a": (together[order] / count_b[order]).round(3),
+            "lift": lift[order].round(2),
+        })
+
+
+# === Shared Basket ===
+# One basket per location (None = every location) per process, brought up to
+# date whenever get_detail_frame() hands out a new frame (i.e. after a load).
+_baskets = {}  # location -> (basket, source frame)
+_basket_lock = threading.Lock()
+
+
+def get_basket(location: str | None = None) -> Basket | None:
+    """
+    Return the process-wide basket counts for a location's current detail
+    frame, or None when there is no data. Treat it as read-only: updates go
+    to a copy that replaces it.
+    """
+    df = get_detail_frame(location)
+    if df.empty:
+        return None
+    with _basket_lock:
+        basket, source = _baskets.get(location, (Basket(), None))
+        if source is not df:
+            basket = basket.copy()
+            basket.update(df)
+            _baskets[location] = (basket, df)
+        return basket
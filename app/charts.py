@@ -0,0 +1,115 @@
+# app/charts.py
+
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from utils import current_generation, CACHE_TTL_SECONDS
+
+# === Chart Payload Limits ===
+# Every point of a chart is serialized into the page, so long histories are
+# reduced before they reach Plotly/Altair: time series are re-bucketed to a
+# coarser granularity for wide ranges and then LTTB-downsampled, categorical
+# bars keep the top N plus one "Other" bar, and built figures are cached per
+# load generation + filter state so an unchanged chart is not rebuilt.
+MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "400"))
+TOP_N = int(os.getenv("CHART_TOP_N", "12"))
+CACHE_ENTRIES = int(os.getenv("CHART_CACHE_ENTRIES", "128"))
+
+# Widest visible range (days) still drawn at each granularity.
+GRANULARITIES = [
+    (92, "D", "Daily"),
+    (730, "W-MON", "Weekly"),
+    (float("inf"), "MS", "Monthly"),
+]
+
+_figures = OrderedDict()  # (name, generation, state) -> (built_at, figure)
+_figures_lock = threading.Lock()
+
+
+# === Time Series ===
+def pick_granularity(start, end) -> tuple:
+    """Return (pandas frequency, label) for a visible range from start to end."""
+    days = (pd.Timestamp(end) - pd.Timestamp(start)).days + 1
+    for max_days, freq, label in GRANULARITIES:
+        if days <= max_days:
+            return freq, label
+    return GRANULARITIES[-1][1:]
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indices of n_out points that keep the
+    visual shape of (x, y). First and last points are always kept.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = x.astype("float64")
+    y = y.astype("float64")
+    edges = np.linspace(1, n - 1, n_out - 1).astype("int64")  # n_out - 2 inner buckets
+    keep = np.empty(n_out, dtype="int64")
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_lo, nxt_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[nxt_lo:nxt_hi].mean(), y[nxt_lo:nxt_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def time_series(df: pd.DataFrame, x: str, y: str, max_points: int = MAX_POINTS, agg: str = "sum") -> tuple:
+    """
+    Aggregate a time series to a granularity that fits its range, then
+    LTTB-downsample it if it still has more than max_points points.
+
+    Returns:
+        (frame with columns x and y, granularity label e.g. 'Daily')
+    """
+    data = df[[x, y]].dropna(subset=[x])
+    if data.empty:
+        return data, GRANULARITIES[0][2]
+    freq, label = pick_granularity(data[x].min(), data[x].max())
+    out = data.groupby(pd.Grouper(key=x, freq=freq))[y].agg(agg).reset_index()
+    if freq != "D":
+        out = out[out[y].notna() & (out[y] != 0)]  # buckets with no sales at all
+    if len(out) > max_points:
+        keep = lttb(out[x].to_numpy().astype("int64"), out[y].to_numpy(), max_points)
+        out = out.iloc[keep]
+    return out.reset_index(drop=True), label
+
+
+# === Categorical Bars ===
+def top_n(df: pd.DataFrame, label: str, value: str, n: int = TOP_N, other: str = "Other") -> pd.DataFrame:
+    """Top n rows by value; the rest are summed into a single `other` row."""
+    data = df.groupby(label, observed=True, sort=False)[value].sum().sort_values(ascending=False)
+    if len(data) > n:
+        data = pd.concat([data.iloc[:n], pd.Series({other: data.iloc[n:].sum()})])
+    return data.rename_axis(label).rename(value).reset_index()
+
+
+# === Figure Cache ===
+def cached_chart(name: str, build, **state):
+    """
+    Return the figure/chart built by build(), reusing it while the load
+    generation and the filter state (keyword arguments) are unchanged (and
+    for at most CACHE_TTL_SECONDS, like query results). Cached figures are
+    shared by every session: do not mutate them.
+    """
+    key = (name, current_generation(), repr(sorted(state.items())))
+    with _figures_lock:
+        entry = _figures.get(key)
+        if entry is not None and time.monotonic() - entry[0] <= CACHE_TTL_SECONDS:
+            _figures.move_to_end(key)
+            return entry[1]
+    figure = build()
+    with _figures_lock:
+        _figures[key] = (time.monotonic(), figure)
+        while len(_figures) > CACHE_ENTRIES:
+            _figures.popitem(last=False)
+    return figure
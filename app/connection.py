@@ -0,0 +1,154 @@
+# app/connection.py
+
+import hashlib
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event, text
+
+log = logging.getLogger(__name__)
+
+# === Connection Settings ===
+# One engine per process, created on first use, shared by every Streamlit
+# session. Pool connections are health-checked on checkout (pre-ping),
+# recycled before Supabase's idle timeout, and every new connection gets a
+# statement_timeout so a stalled query fails the fetch instead of hanging the
+# render.
+load_dotenv()
+
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))      # seconds to wait for a free connection
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))       # seconds before a connection is replaced
+POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP", "2"))            # connections opened in the background at start
+STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+WORK_MEM = os.getenv("DB_WORK_MEM", "16MB")
+# Server-side PREPARE/EXECUTE for the fixed sql/ files. Needs session-level
+# connections (not a transaction-mode pooler such as Supabase's port 6543).
+PREPARED_STATEMENTS = os.getenv("DB_PREPARED_STATEMENTS", "0").lower() in ("1", "true", "yes")
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def db_url() -> str:
+    """DATABASE_URL if set, otherwise the Supabase-compatible URL built from DB_*."""
+    if os.getenv("DATABASE_URL"):
+        return os.getenv("DATABASE_URL")
+    return (
+        f"postgresql+psycopg2://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@"
+        f"{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
+        f"?sslmode={os.getenv('DB_SSLMODE', 'require')}"
+    )
+
+
+def create_db_engine(statement_timeout_ms=STATEMENT_TIMEOUT_MS, work_mem=WORK_MEM, pool_size=POOL_SIZE,
+                     max_overflow=MAX_OVERFLOW, application_name="toastedbean-dashboard"):
+    """
+    Build an engine with the shared pool settings and per-session tuning.
+
+    Args:
+        statement_timeout_ms: Per-statement limit set on every new connection; 0 disables it.
+        work_mem: Postgres work_mem for sorts/hashes in this session, e.g. '16MB'.
+        pool_size: Connections kept open.
+        max_overflow: Extra connections allowed under burst load.
+        application_name: Shown in pg_stat_activity.
+    """
+    engine = create_engine(
+        db_url(),
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=POOL_TIMEOUT,
+        pool_recycle=POOL_RECYCLE,
+        pool_pre_ping=True,
+        connect_args={"connect_timeout": 10, "application_name": application_name},
+    )
+
+    @event.listens_for(engine, "connect")
+    def _tune_session(dbapi_conn, _record):
+        with dbapi_conn.cursor() as cur:
+            cur.execute("SET statement_timeout = %s", (statement_timeout_ms,))
+            cur.execute("SET work_mem = %s", (work_mem,))
+        dbapi_conn.commit()
+
+    return engine
+
+
+def get_engine():
+    """Return the process-wide dashboard engine, creating it on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_db_engine()
+    return _engine
+
+
+def _warm_up(connections: int) -> None:
+    try:
+        engine = get_engine()
+        with ThreadPoolExecutor(max_workers=connections) as pool:
+            list(pool.map(lambda _: _ping(engine), range(connections)))
+    except Exception as e:
+        log.warning("Connection warm-up failed: %s", e)
+
+
+def _ping(engine) -> None:
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+def warm_up() -> None:
+    """Open POOL_WARMUP connections in the background so the first render skips the TLS handshakes."""
+    connections = min(POOL_WARMUP, POOL_SIZE)
+    if connections > 0:
+        threading.Thread(target=_warm_up, args=(connections,), name="db-warmup", daemon=True).start()
+
+
+# === Prepared Statements ===
+_BIND = re.compile(r"(?<![:\w]):(\w+)")
+_COMMENT = re.compile(r"--[^\n]*")
+
+
+def can_prepare(sql: str) -> bool:
+    """Only single-statement files can be PREPAREd."""
+    body = _COMMENT.sub("", sql).strip().rstrip(";")
+    return ";" not in body
+
+
+def _positional(sql: str) -> tuple:
+    """':name' binds -> '$n' placeholders; returns (sql, [names in $n order])."""
+    names = []
+
+    def to_dollar(match):
+        if match.group(1) not in names:
+            names.append(match.group(1))
+        return f"${names.index(match.group(1)) + 1}"
+
+    body = _BIND.sub(to_dollar, _COMMENT.sub("", sql)).strip().rstrip(";")
+    return body, names
+
+
+def execute_prepared(conn, sql: str, params: dict | None = None):
+    """
+    Run sql through a per-connection PREPAREd statement (EXECUTE on reuse).
+
+    The statement name is a hash of the SQL text, so an edited .sql file gets
+    a new statement. Returns the SQLAlchemy Result.
+    """
+    body, names = _positional(sql)
+    name = "sql_" + hashlib.sha1(body.encode()).hexdigest()[:16]
+    prepared = conn.connection.info.setdefault("prepared_statements", set())
+    if name not in prepared:
+        exists = conn.execute(text("SELECT 1 FROM pg_prepared_statements WHERE name = :name"), {"name": name}).scalar()
+        if not exists:
+            conn.exec_driver_sql(f"PREPARE {name} AS {body}".replace("%", "%%"), {})
+        prepared.add(name)
+
+    if not names:
+        return conn.exec_driver_sql(f"EXECUTE {name}", {})
+    args = ", ".join(f"%({n})s" for n in names)
+    return conn.exec_driver_sql(f"EXECUTE {name}({args})", {n: (params or {}).get(n) for n in names})
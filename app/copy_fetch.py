@@ -0,0 +1,107 @@
+# app/copy_fetch.py
+
+import os
+import re
+import threading
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import connection
+
+# === COPY Fast Path ===
+# Large results skip the DB-API row path (one Python tuple per row, then a
+# second copy into the DataFrame): the query is wrapped in
+# COPY (...) TO STDOUT (FORMAT csv) and psycopg2 streams the CSV through a
+# pipe into pyarrow's multithreaded CSV reader, which parses it with the
+# explicit column types below. Only the files listed here use it; everything
+# else, and any failure here, goes through the regular fetch.
+COPY_FETCH = os.getenv("QUERY_COPY_FETCH", "1").lower() in ("1", "true", "yes")
+_BIND = re.compile(r"(?<![:\w]):(\w+)")
+_COMMENT = re.compile(r"--[^\n]*")
+
+_DETAIL_TYPES = {
+    "transaction_id": pa.string(),
+    "item": pa.string(),
+    "category": pa.string(),
+    "date": pa.date32(),
+    "time": pa.time64("us"),
+    "gross_sales": pa.float64(),
+    "discounts": pa.float64(),
+    "refunds": pa.float64(),
+    "modifiers_applied": pa.string(),
+    "channel": pa.string(),
+    "card_brand": pa.string(),
+    "datetime": pa.timestamp("us"),
+}
+
+# sql/ file -> Arrow type of every output column
+COPY_FETCH_TYPES = {
+    "sql/detail_items.sql": _DETAIL_TYPES,
+    "sql/detail_items_filtered.sql": {k: v for k, v in _DETAIL_TYPES.items() if k != "transaction_id"},
+}
+
+
+def supports(sql_path: str, sql: str) -> bool:
+    return COPY_FETCH and sql_path in COPY_FETCH_TYPES and connection.can_prepare(sql)
+
+
+def _copy_statement(cursor, sql: str, params: dict | None) -> str:
+    """COPY (query) TO STDOUT with the :name binds inlined by psycopg2 (lists become ARRAY[...])."""
+    body = _COMMENT.sub("", sql).strip().rstrip(";").replace("%", "%%")
+    body = _BIND.sub(lambda m: f"%({m.group(1)})s", body)
+    query = cursor.mogrify(body, params or {}).decode()
+    return f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER true)"
+
+
+def fetch(conn, sql_path: str, sql: str, params: dict | None = None) -> pd.DataFrame:
+    """
+    Run one single-statement sql/ file through COPY TO STDOUT into Arrow.
+
+    Args:
+        conn: An open SQLAlchemy Connection.
+        sql_path: Key into COPY_FETCH_TYPES.
+        sql: The file's SQL text.
+        params: Bound parameters for its `:name` placeholders.
+
+    Returns:
+        A DataFrame with the same columns and values as the regular fetch
+        (NULL -> None/NaN/NaT; '' stays an empty string).
+    """
+    column_types = COPY_FETCH_TYPES[sql_path]
+    cursor = conn.connection.cursor()
+    read_fd, write_fd = os.pipe()
+    errors = []
+
+    def produce():
+        with os.fdopen(write_fd, "wb") as sink:
+            try:
+                cursor.copy_expert(statement, sink)
+            except Exception as e:  # BrokenPipeError when the reader gave up first
+                errors.append(e)
+
+    try:
+        statement = _copy_statement(cursor, sql, params)
+    except Exception:
+        os.close(read_fd)
+        os.close(write_fd)
+        cursor.close()
+        raise
+
+    producer = threading.Thread(target=produce, name="copy-fetch", daemon=True)
+    producer.start()
+    try:
+        with os.fdopen(read_fd, "rb") as source:
+            table = pa_csv.read_csv(
+                source,
+                convert_options=pa_csv.ConvertOptions(
+                    column_types=column_types,
+                    strings_can_be_null=True,          # unquoted empty field = NULL
+                    quoted_strings_can_be_null=False,  # "" = empty string
+                ),
+            )
+    finally:
+        producer.join()
+        cursor.close()
+    if errors:
+        raise errors[0]
+    return table.to_pandas(coerce_temporal_nanoseconds=True)
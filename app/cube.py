@@ -0,0 +1,173 @@
+# app/cube.py
+
+import threading
+import numpy as np
+import pandas as pd
+from utils import get_detail_frame, content_fingerprints, WEEKDAYS
+
+# === Cube Layout ===
+# Dense NumPy pre-aggregates of the shared detail frame. Every axis is
+# dictionary-encoded (label list + label -> position map), so any combination
+# of page filters is an np.ix_ slice plus a sum, independent of how many line
+# items are behind it. `orders` (distinct transactions) is only additive over
+# transaction-level axes, so it has no category axis. Money is int64 cents.
+MEASURES = {
+    # name: (axes, frame column summed, or None to count lines)
+    "revenue": (("date", "hour", "channel", "card_brand", "category"), "gross_cents"),
+    "items": (("date", "hour", "channel", "card_brand", "category"), None),
+    "orders": (("date", "hour", "channel", "card_brand"), "transaction_id"),
+    "item_revenue": (("date", "channel", "card_brand", "item"), "gross_cents"),
+    "item_lines": (("date", "channel", "card_brand", "item"), None),
+}
+AXES = ("date", "hour", "channel", "card_brand", "category", "item")
+# Every column a measure reads; a date is re-aggregated when any of them changes.
+FINGERPRINT_COLUMNS = [*AXES[1:], "transaction_id", "gross_cents"]
+
+
+class Cube:
+    """Pre-aggregated revenue/items/orders over date × hour × channel × card_brand × category (+ item)."""
+
+    def __init__(self):
+        self.labels = {axis: [] for axis in AXES}
+        self.index = {axis: {} for axis in AXES}
+        self.arrays = {name: np.zeros([0] * len(axes), dtype="int64") for name, (axes, _) in MEASURES.items()}
+        self.fingerprint = np.zeros(0, dtype="uint64")  # per date: content hash of its rows (FINGERPRINT_COLUMNS)
+
+    def copy(self) -> "Cube":
+        cube = Cube()
+        cube.labels = {axis: list(labels) for axis, labels in self.labels.items()}
+        cube.index = {axis: dict(index) for axis, index in self.index.items()}
+        cube.arrays = {name: array.copy() for name, array in self.arrays.items()}
+        cube.fingerprint = self.fingerprint.copy()
+        return cube
+
+    # === Building ===
+    def _encode(self, axis: str, values) -> np.ndarray:
+        """Positions of `values` on an axis, growing the axis (and every array on it) for new labels."""
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        uniques = [None if pd.isna(u) else u for u in uniques]
+        new = [u for u in uniques if u not in self.index[axis]]
+        if new:
+            for label in new:
+                self.index[axis][label] = len(self.labels[axis])
+                self.labels[axis].append(label)
+            for name, (axes, _) in MEASURES.items():
+                if axis in axes:
+                    pad = [(0, 0)] * len(axes)
+                    pad[axes.index(axis)] = (0, len(new))
+                    self.arrays[name] = np.pad(self.arrays[name], pad)
+            if axis == "date":
+                self.fingerprint = np.pad(self.fingerprint, (0, len(new)))
+        lookup = np.array([self.index[axis][u] for u in uniques], dtype="int64")
+        return lookup[codes]
+
+    def update(self, df: pd.DataFrame) -> int:
+        """
+        Bring the cube in line with `df` (the shared detail frame).
+
+        Only dates that are new or whose rows changed in any aggregated
+        column are re-aggregated; dates missing from df are zeroed.
+
+        Returns:
+            Number of dates re-aggregated.
+        """
+        date_codes = self._encode("date", df["date"])
+        n_dates = len(self.labels["date"])
+        fingerprint = content_fingerprints(df, date_codes, n_dates, FINGERPRINT_COLUMNS)
+        changed = np.flatnonzero(fingerprint != self.fingerprint)
+        self.fingerprint = fingerprint
+        if len(changed) == 0:
+            return 0
+
+        # Local date positions 0..k-1 for the changed dates; other rows are skipped.
+        local = np.full(n_dates, -1, dtype="int64")
+        local[changed] = np.arange(len(changed))
+        rows = local[date_codes] >= 0
+        sub = df.loc[rows]
+        codes = {"date": local[date_codes[rows]]}
+        for axis in AXES[1:]:
+            codes[axis] = self._encode(axis, sub[axis])
+
+        for name, (axes, column) in MEASURES.items():
+            shape = (len(changed), *(len(self.labels[a]) for a in axes[1:]))
+            flat = np.ravel_multi_index([codes[a] for a in axes], shape)
+            if column == "transaction_id":  # distinct transactions per cell
+                txn, uniques = pd.factorize(sub[column])
+                flat = np.unique(flat * max(len(uniques), 1) + txn) // max(len(uniques), 1)
+                block = np.bincount(flat, minlength=int(np.prod(shape)))
+            elif column is None:
+                block = np.bincount(flat, minlength=int(np.prod(shape)))
+            else:
+                block = np.bincount(flat, weights=sub[column], minlength=int(np.prod(shape))).round()
+            self.arrays[name][changed] = block.astype("int64").reshape(shape)
+        return len(changed)
+
+    # === Slicing ===
+    def _positions(self, axis: str, selected) -> np.ndarray:
+        """Axis positions of the selected labels (None = whole axis); unknown labels are ignored."""
+        if selected is None:
+            return np.arange(len(self.labels[axis]))
+        return np.array([self.index[axis][s] for s in selected if s in self.index[axis]], dtype="int64")
+
+    def slice(self, measure: str, **filters) -> np.ndarray:
+        """
+        The sub-array of `measure` for the given filters, e.g.
+        slice('revenue', date=[ts], channel=['Toasted Bean Coffee']).
+        Axes without a filter are kept whole.
+        """
+        axes, _ = MEASURES[measure]
+        return self.arrays[measure][np.ix_(*(self._positions(a, filters.get(a)) for a in axes))]
+
+    def total(self, measure: str, **filters) -> int:
+        return int(self.slice(measure, **filters).sum())
+
+    def top_items(self, n: int = 15, **filters) -> pd.DataFrame:
+        """Items by revenue for the filters: columns item, gross_sales (dollars)."""
+        revenue = self.slice("item_revenue", **filters).sum(axis=(0, 1, 2))
+        lines = self.slice("item_lines", **filters).sum(axis=(0, 1, 2))
+        sold = np.flatnonzero(lines)
+        order = sold[np.argsort(-revenue[sold], kind="stable")][:n]
+        return pd.DataFrame({
+            "item": [self.labels["item"][i] for i in order],
+            "gross_sales": revenue[order] / 100,
+        })
+
+    def weekday_hour(self) -> pd.DataFrame:
+        """All-dates revenue and orders by weekday × hour (like sql/hourly_volume_heatmap.sql)."""
+        weekdays = pd.DatetimeIndex(self.labels["date"]).day_name().to_numpy()
+        onehot = (np.array(WEEKDAYS)[:, None] == weekdays[None, :]).astype("int64")  # weekday x date
+        orders = onehot @ self.arrays["orders"].sum(axis=(2, 3))
+        revenue = onehot @ self.arrays["revenue"].sum(axis=(2, 3, 4))
+        w, h = np.nonzero(orders)
+        out = pd.DataFrame({
+            "weekday": np.array(WEEKDAYS)[w],
+            "hour": np.array(self.labels["hour"], dtype="int64")[h],
+            "orders": orders[w, h],
+            "revenue": revenue[w, h] / 100,
+        })
+        return out.sort_values(["weekday", "hour"]).reset_index(drop=True)
+
+
+# === Shared Cube ===
+# One cube per location (None = every location) per process, brought up to
+# date whenever get_detail_frame() hands out a new frame (i.e. after a load).
+_cubes = {}  # location -> (cube, source frame)
+_cube_lock = threading.Lock()
+
+
+def get_cube(location: str | None = None) -> Cube | None:
+    """
+    Return the process-wide cube for a location's current detail frame, or
+    None when there is no data. Treat it as read-only: updates go to a copy
+    that replaces it, so sessions slicing the old one are never disturbed.
+    """
+    df = get_detail_frame(location)
+    if df.empty:
+        return None
+    with _cube_lock:
+        cube, source = _cubes.get(location, (Cube(), None))
+        if source is not df:
+            cube = cube.copy()
+            cube.update(df)
+            _cubes[location] = (cube, df)
+        return cube
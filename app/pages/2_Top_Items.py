@@ -1,61 +1,66 @@
 # app/pages/2_Top_Items.py
 
 import streamlit as st
-from utils import fetch_query
+from utils import fetch_query, fetch_filter_options, select_location
+from report import get_section
+from perf import start_rerun, section, render_panel
 import pandas as pd
 import plotly.express as px
 
 # === Page Setup ===
 st.set_page_config(page_title="Top Items", layout="wide")
+start_rerun("Top Items")
 st.title("🏅 Top-Selling Items")
 st.caption("Explore top-performing products by revenue. Filter by month, channel, and category to uncover sales drivers.")
 st.markdown("---")
 
-# === Load Data ===
-df = fetch_query("sql/detail_items.sql")
-df["datetime"] = pd.to_datetime(df["datetime"], errors="coerce", utc=True)
-df = df.dropna(subset=["datetime"])
-df["date"] = df["datetime"].dt.date
-df["month"] = pd.to_datetime(df["datetime"].astype(str), errors="coerce").dt.to_period("M").astype(str)
-
-# === Ensure Valid Columns Exist ===
-required_cols = ["gross_sales", "channel", "category", "item", "month"]
-if df.empty or not all(col in df.columns for col in required_cols):
-    st.warning("No valid item sales data available.")
-    st.stop()
-
 # === Sidebar Filters ===
-st.sidebar.header("📂 Filter Options")
-month_options = sorted(df["month"].dropna().unique(), reverse=True)
-channel_options = sorted(df["channel"].dropna().unique())
-category_options = sorted(df["category"].dropna().unique())
+section("Sidebar Filters")
+location = select_location()
+options = fetch_filter_options(location)
+month_options = sorted(options.get("month", []), reverse=True)
+channel_options = options.get("channel", [])
+category_options = options.get("category", [])
 
 if not month_options:
     st.warning("No monthly data available.")
     st.stop()
 
+st.sidebar.header("📂 Filter Options")
 selected_month = st.sidebar.selectbox("Select Month", month_options)
 selected_channel = st.sidebar.multiselect("Sales Channel", channel_options, default=channel_options)
 selected_category = st.sidebar.multiselect("Category", category_options, default=category_options)
 
-# === Apply Filters ===
-filtered = df[
-    (df["month"] == selected_month) &
-    (df["channel"].isin(selected_channel)) &
-    (df["category"].isin(selected_category))
-]
-
-# === Top Items Chart ===
-st.subheader(f"📌 Top 15 Items – {selected_month}")
-
-if not filtered.empty:
+# === Apply Filters (report snapshot for the default filters, else filtered in Postgres) ===
+section("Apply Filters")
+if set(selected_channel) == set(channel_options) and set(selected_category) == set(category_options):
+    by_month = get_section("top_items", location=location)["tables"]["top_items_by_month"]
+    top_items = by_month.loc[by_month["month"] == selected_month, ["item", "gross_sales"]].reset_index(drop=True)
+else:
+    # One month, only the selected channels/categories: no need for the whole shared frame.
+    month = pd.Period(selected_month, freq="M")
+    df = fetch_query("sql/detail_items_filtered.sql", params={
+        "location": location,
+        "start_date": month.start_time.date(),
+        "end_date": (month + 1).start_time.date(),
+        "channels": selected_channel,
+        "categories": selected_category,
+        "card_brands": None,
+    })
     top_items = (
-        filtered.groupby("item")["gross_sales"]
+        df.groupby("item", observed=True)["gross_sales"]
         .sum()
+        .round(2)
         .sort_values(ascending=False)
         .head(15)
         .reset_index()
-    )
+    ) if not df.empty else pd.DataFrame(columns=["item", "gross_sales"])
+
+# === Top Items Chart ===
+section("Top Items Chart")
+st.subheader(f"📌 Top 15 Items – {selected_month}")
+
+if not top_items.empty:
 
     top_fig = px.bar(
         top_items,
@@ -79,8 +84,9 @@ else:
     st.info("No item-level sales found for the selected filters.")
 
 # === Modifier Lift Section ===
+section("Modifier Lift Section")
 st.subheader("✨ Top Modifiers by Revenue Lift")
-mod_df = fetch_query("sql/modifier_lift.sql")
+mod_df = fetch_query("sql/modifier_lift.sql", {"location": location})
 
 if not mod_df.empty:
     st.dataframe(mod_df.head(15), use_container_width=True)
@@ -93,3 +99,5 @@ st.markdown(
     "<div style='text-align: center; color: gray;'>Use filters to explore revenue drivers by item and modifier.</div>",
     unsafe_allow_html=True
 )
+
+render_panel()
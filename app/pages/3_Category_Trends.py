@@ -1,39 +1,53 @@
 # app/pages/3_Category_Trends.py
 
 import streamlit as st
-import pandas as pd
 import altair as alt
-from utils import fetch_query
+from charts import top_n, cached_chart
+from report import get_section
+from utils import select_location
+from perf import start_rerun, section, render_panel
 
 st.title("📊 Category Sales Trends")
 st.caption("Analyze category-level revenue trends by month.")
 
-# === Load Data ===
-df = fetch_query("sql/revenue_by_category.sql")
+start_rerun("Category Trends")
+if select_location() is not None:
+    st.caption("📍 Square's category export covers every location, so this page is store-wide.")
 
-if df.empty or "start_date" not in df.columns:
+# === Load Data (report snapshot when current, else parsed live) ===
+section("Load Data")
+df = get_section("category_trends")["tables"]["category_months"]
+
+if df.empty:
     st.warning("No data available.")
     st.stop()
 
-# === Parse and Clean ===
-df["month"] = pd.to_datetime(df["start_date"], errors="coerce").dt.to_period("M").dt.to_timestamp()
-df = df.dropna(subset=["month", "category", "revenue"])
-df["revenue"] = pd.to_numeric(df["revenue"], errors="coerce")
-
 # === Filter Sidebar ===
+section("Filter Sidebar")
 months = df["month"].dt.strftime("%B %Y").sort_values().unique().tolist()
 selected = st.multiselect("Select Month(s):", months, default=months)
 filtered_df = df[df["month"].dt.strftime("%B %Y").isin(selected)]
 
 # === Chart ===
+section("Chart")
+# One bar per category (top N + "Other") summed over the selected months,
+# instead of one stacked segment per category and month.
 if not filtered_df.empty:
-    chart = alt.Chart(filtered_df).mark_bar().encode(
-        x=alt.X("revenue:Q", title="Total Revenue ($)"),
-        y=alt.Y("category:N", sort='-x'),
-        color=alt.Color("category:N", legend=None),
-        tooltip=["category", "revenue", "month"]
-    ).properties(height=400, width=700)
-
+    bars = top_n(filtered_df, "category", "revenue")
+    first, last = filtered_df["month"].min(), filtered_df["month"].max()
+    bars["months"] = first.strftime("%b %Y") if first == last else f"{first:%b %Y} – {last:%b %Y}"
+
+    def build_chart():
+        return alt.Chart(bars).mark_bar().encode(
+            x=alt.X("revenue:Q", title="Total Revenue ($)"),
+            y=alt.Y("category:N", sort='-x'),
+            color=alt.Color("category:N", legend=None),
+            tooltip=["category", "revenue", "months"]
+        ).properties(height=400, width=700)
+
+    chart = cached_chart("category_trends", build_chart, months=tuple(selected))
     st.altair_chart(chart, use_container_width=True)
 else:
     st.info("No data available for selected month(s).")
+
+render_panel()
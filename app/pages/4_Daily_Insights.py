@@ -1,78 +1,103 @@
 # app/pages/4_Daily_Insights.py
 
 import streamlit as st
-from utils import fetch_query, rename_columns
+from utils import fetch_queries, fetch_filter_options, select_location
+from cube import get_cube
+from basket import get_basket
+from charts import cached_chart
+from report import get_section
+from perf import start_rerun, section, render_panel
 import pandas as pd
 import plotly.express as px
 import altair as alt
 
 # === Page Setup ===
 st.set_page_config(page_title="Daily Insights", layout="wide")
+start_rerun("Daily Insights")
 st.title("📅 Daily Order Insights")
 st.caption("Analyze day-level sales patterns including hourly volume, item performance, and revenue mix.")
 st.markdown("---")
 
-# === Load and Prepare Data ===
-df = fetch_query("sql/detail_items.sql")
-df["datetime"] = pd.to_datetime(df["datetime"], errors="coerce", utc=True)
-df = df.dropna(subset=["datetime", "gross_sales"])
-df["date"] = df["datetime"].dt.date
-df["hour"] = df["datetime"].dt.hour
-df["weekday"] = df["datetime"].dt.day_name()
-
 # === Sidebar Filters ===
+section("Sidebar Filters")
+location = select_location()
+options = fetch_filter_options(location)
+available_dates = [pd.Timestamp(d).date() for d in sorted(options.get("date", []), reverse=True)]
+if not available_dates:
+    st.warning("No daily sales data available.")
+    st.stop()
+
 st.sidebar.header("📂 Filter Options")
-available_dates = sorted(df["date"].unique(), reverse=True)
 selected_date = st.sidebar.selectbox("Select a Date", available_dates)
 
-card_options = df["card_brand"].dropna().unique()
-channel_options = df["channel"].dropna().unique()
+card_options = options.get("card_brand", [])
+channel_options = options.get("channel", [])
 
 selected_cards = st.sidebar.multiselect("Payment Type", card_options, default=card_options)
 selected_channels = st.sidebar.multiselect("Sales Channel", channel_options, default=channel_options)
 
-filtered = df[
-    (df["date"] == selected_date) &
-    (df["card_brand"].isin(selected_cards)) &
-    (df["channel"].isin(selected_channels))
-]
+# === Apply Filters (report snapshot for the default filters, else a cube slice) ===
+section("Apply Filters")
+report = get_section("daily_insights", live=False, location=location)
+defaults = set(selected_cards) == set(card_options) and set(selected_channels) == set(channel_options)
+cube = None
+if report is not None and defaults:
+    day = pd.Timestamp(selected_date)
+    kpi_rows = report["tables"]["daily_kpis"]
+    kpi_rows = kpi_rows[kpi_rows["date"] == day]
+    lines = int(kpi_rows["lines"].sum())
+    revenue_cents = int(kpi_rows["revenue_cents"].sum())
+    by_date = report["tables"]["top_items_by_date"]
+    top_items = by_date.loc[by_date["date"] == day, ["item", "gross_sales"]].reset_index(drop=True)
+else:
+    cube = get_cube(location)
+    if cube is None:
+        st.warning("No daily sales data available.")
+        st.stop()
+
+    selection = {"date": [pd.Timestamp(selected_date)], "card_brand": selected_cards, "channel": selected_channels}
+    lines = cube.total("items", **selection)
+    revenue_cents = cube.total("revenue", **selection)
+    top_items = cube.top_items(15, **selection)
 
 # === KPI Summary ===
+section("KPI Summary")
 st.subheader(f"📌 Summary for {selected_date}")
 k1, k2, k3 = st.columns(3)
 
-k1.metric("Total Orders", len(filtered))
-k2.metric("Total Revenue", f"${filtered['gross_sales'].sum():,.2f}")
+k1.metric("Total Orders", lines)
+k2.metric("Total Revenue", f"${revenue_cents / 100:,.2f}")
 k3.metric(
     "Avg Order Value",
-    f"${filtered['gross_sales'].mean():.2f}" if not filtered.empty else "$0.00"
+    f"${revenue_cents / lines / 100:.2f}" if lines else "$0.00"
 )
 
 st.markdown("---")
 
 # === Hourly Revenue Heatmap ===
+section("Hourly Revenue Heatmap")
 st.subheader("🕒 Hourly Revenue Heatmap (All Dates)")
-heat_df = df.groupby(["weekday", "hour"])["gross_sales"].sum().reset_index()
 
-heat = alt.Chart(heat_df).mark_rect().encode(
-    x=alt.X("hour:O", title="Hour of Day"),
-    y=alt.Y("weekday:N", sort=["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]),
-    color=alt.Color("gross_sales:Q", scale=alt.Scale(scheme="blues"), title="Revenue ($)"),
-    tooltip=["weekday:N", "hour:O", "gross_sales:Q"]
-).properties(height=420)
+
+def build_heatmap():
+    heat_df = report["tables"]["heatmap"] if report is not None else (cube or get_cube(location)).weekday_hour()
+    heat_df = heat_df.rename(columns={"revenue": "gross_sales"})
+    return alt.Chart(heat_df).mark_rect().encode(
+        x=alt.X("hour:O", title="Hour of Day"),
+        y=alt.Y("weekday:N", sort=["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]),
+        color=alt.Color("gross_sales:Q", scale=alt.Scale(scheme="blues"), title="Revenue ($)"),
+        tooltip=["weekday:N", "hour:O", "gross_sales:Q"]
+    ).properties(height=420)
+
+
+heat = cached_chart("daily_heatmap", build_heatmap, location=location)
 
 st.altair_chart(heat, use_container_width=True)
 st.markdown("> 💡 Use this view to optimize hourly staffing and promo timing based on weekday heat zones.")
 
 # === Top Items Table ===
+section("Top Items Table")
 st.subheader("🏆 Top Items Sold on Selected Day")
-top_items = (
-    filtered.groupby("item")["gross_sales"]
-    .sum()
-    .sort_values(ascending=False)
-    .reset_index()
-    .head(15)
-)
 
 if not top_items.empty:
     st.dataframe(top_items, use_container_width=True)
@@ -80,10 +105,20 @@ else:
     st.info("No item data available for the selected filters.")
 
 # === Bonus Insights ===
+section("Bonus Insights")
 st.markdown("---")
 
+if report is not None:
+    bonus = report["tables"]
+else:
+    bonus = fetch_queries({
+        "weekday": ("sql/revenue_by_weekday.sql", {"location": location}),
+        "peak": ("sql/peak_hours.sql", {"location": location}),
+        "bundle": ("sql/bundle_effect.sql", {"location": location}),
+    })
+
 st.subheader("📅 Total Revenue by Weekday")
-weekday_df = fetch_query("sql/revenue_by_weekday.sql")
+weekday_df = bonus["weekday"]
 if not weekday_df.empty:
     weekday_chart = px.bar(weekday_df, x="weekday", y="total_revenue", title=None, labels={"total_revenue": "Revenue ($)"})
     weekday_chart.update_layout(height=360)
@@ -93,22 +128,35 @@ else:
     st.info("No weekday revenue data available.")
 
 st.subheader("⏱️ Peak Ordering Hours")
-peak_df = fetch_query("sql/peak_hours.sql")
+peak_df = bonus["peak"]
 if not peak_df.empty:
     st.dataframe(peak_df, use_container_width=True)
 else:
     st.info("No peak hour data available.")
 
 st.subheader("🧃 Bundle Effect Insights")
-bundle_df = fetch_query("sql/bundle_effect.sql")
+bundle_df = bonus["bundle"]
 if not bundle_df.empty:
     st.dataframe(bundle_df, use_container_width=True)
 else:
     st.info("No bundle effect data available.")
 
+pairs_df = bonus.get("pairs")
+if pairs_df is None:
+    basket = get_basket(location)
+    pairs_df = basket.top_pairs() if basket is not None else pd.DataFrame()
+if not pairs_df.empty:
+    st.markdown("**🤝 Bought Together**")
+    st.dataframe(pairs_df, use_container_width=True)
+    st.markdown("> 🧁 Lift above 1 means the pair shows up in the same order more often than chance — bundle or cross-sell it.")
+else:
+    st.info("No item pairs bought together often enough yet.")
+
 # === Footer ===
 st.markdown("---")
 st.markdown(
     "<div style='text-align: center; color: gray;'>Use this dashboard to fine-tune prep, shifts, and product pairings.</div>",
     unsafe_allow_html=True
 )
+
+render_panel()
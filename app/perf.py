@@ -0,0 +1,184 @@
+# app/perf.py
+
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+import pandas as pd
+
+# === Settings ===
+# Every query and page section is written as one JSON object per line to
+# PERF_LOG ("" turns the log off). PERF_PANEL=1 adds a sidebar panel listing
+# the slowest sections/queries of the current rerun. PERF_EXPLAIN_MS opts in
+# to an EXPLAIN (ANALYZE, BUFFERS) capture for cache misses slower than that.
+PERF_LOG = os.getenv("PERF_LOG", "logs/perf.jsonl")
+PERF_PANEL = os.getenv("PERF_PANEL", "0").lower() in ("1", "true", "yes")
+EXPLAIN_MS = float(os.getenv("PERF_EXPLAIN_MS")) if os.getenv("PERF_EXPLAIN_MS") else None
+
+_log_lock = threading.Lock()
+_rerun = contextvars.ContextVar("perf_rerun", default=None)
+_in_batch = contextvars.ContextVar("perf_in_batch", default=False)
+
+
+class Rerun:
+    """Events of one page run, shared with the fetch_queries worker threads."""
+
+    def __init__(self, page: str):
+        self.id = uuid.uuid4().hex[:8]
+        self.page = page
+        self.started = time.perf_counter()
+        self.events = []
+        self.section = None  # [name, started, blocked query seconds]
+        self.lock = threading.Lock()
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+def _write(event: dict) -> None:
+    """Append one event to the JSON-lines log and to the current rerun."""
+    rerun = _rerun.get()
+    event = {
+        "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        "rerun": rerun.id if rerun else None,
+        "page": rerun.page if rerun else None,
+        **event,
+    }
+    if rerun is not None:
+        with rerun.lock:
+            rerun.events.append(event)
+    if PERF_LOG:
+        line = json.dumps(event, default=str)
+        with _log_lock:
+            Path(PERF_LOG).parent.mkdir(parents=True, exist_ok=True)
+            with open(PERF_LOG, "a") as f:
+                f.write(line + "\n")
+
+
+def _add_blocked(seconds: float) -> None:
+    """Charge time the page spent waiting on queries to the open section."""
+    rerun = _rerun.get()
+    if rerun is not None and rerun.section is not None:
+        rerun.section[2] += seconds
+
+
+# === Queries ===
+def record_query(sql_path: str, params, started: float, df=None, cache="miss",
+                 first_row_seconds=None, nbytes=None, error=None, explain=None) -> float:
+    """
+    Log one fetch: wall time, time to first row, rows, bytes and cache hit/miss.
+
+    Returns:
+        Wall time in milliseconds.
+    """
+    elapsed = time.perf_counter() - started
+    if not _in_batch.get():
+        _add_blocked(elapsed)
+    rerun = _rerun.get()
+    event = {
+        "kind": "query",
+        "section": rerun.section[0] if rerun and rerun.section else None,
+        "sql": sql_path,
+        "params": params,
+        "cache": cache,
+        "wall_ms": _ms(elapsed),
+        "first_row_ms": _ms(first_row_seconds) if first_row_seconds is not None else None,
+        "rows": len(df) if df is not None else None,
+        "bytes": nbytes,
+    }
+    if error is not None:
+        event["error"] = error
+    if explain is not None:
+        event["explain"] = explain
+    _write(event)
+    return event["wall_ms"]
+
+
+def should_explain(wall_ms: float) -> bool:
+    return EXPLAIN_MS is not None and wall_ms >= EXPLAIN_MS
+
+
+def in_batch(func, *args):
+    """Run func as a fetch_queries worker: its time is charged via blocking() instead."""
+    _in_batch.set(True)
+    return func(*args)
+
+
+@contextmanager
+def blocking():
+    """Charge the wall time of the block (e.g. waiting on a query batch) to the open section."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _add_blocked(time.perf_counter() - started)
+
+
+# === Page Sections ===
+def _close_section(rerun: Rerun) -> None:
+    if rerun.section is None:
+        return
+    name, started, blocked = rerun.section
+    rerun.section = None
+    wall = time.perf_counter() - started
+    _write({
+        "kind": "section",
+        "section": name,
+        "wall_ms": _ms(wall),
+        "query_ms": _ms(blocked),
+        "transform_ms": _ms(max(wall - blocked, 0.0)),  # pandas + chart building
+    })
+
+
+def start_rerun(page: str) -> None:
+    """Begin collecting events for this run of `page` (call once at the top of a page)."""
+    _rerun.set(Rerun(page))
+
+
+def section(name: str) -> None:
+    """Start timing the next page section; the previous one is closed and logged."""
+    rerun = _rerun.get()
+    if rerun is None:
+        return
+    _close_section(rerun)
+    rerun.section = [name, time.perf_counter(), 0.0]
+
+
+def slowest(limit: int = 10) -> pd.DataFrame:
+    """Slowest sections and queries of the current rerun."""
+    rerun = _rerun.get()
+    if rerun is None:
+        return pd.DataFrame()
+    rows = [{
+        "what": e["section"] if e["kind"] == "section" else e["sql"],
+        "kind": e["kind"] if e["kind"] == "section" else f"query ({e['cache']})",
+        "wall_ms": e["wall_ms"],
+        "query_ms": e.get("query_ms"),
+        "rows": e.get("rows"),
+    } for e in rerun.events if e["kind"] in ("section", "query")]
+    if not rows:
+        return pd.DataFrame()
+    return pd.DataFrame(rows).sort_values("wall_ms", ascending=False).head(limit).reset_index(drop=True)
+
+
+def render_panel() -> None:
+    """Close the last section, log the rerun total and, with PERF_PANEL=1, show the sidebar panel."""
+    rerun = _rerun.get()
+    if rerun is None:
+        return
+    _close_section(rerun)
+    total_ms = _ms(time.perf_counter() - rerun.started)
+    _write({"kind": "rerun", "wall_ms": total_ms})
+    if not PERF_PANEL:
+        return
+
+    import streamlit as st
+    with st.sidebar.expander(f"⏱️ Performance — {total_ms:,.0f} ms", expanded=False):
+        st.dataframe(slowest(), use_container_width=True, hide_index=True)
+        st.caption(f"Rerun {rerun.id} · full log: {PERF_LOG or 'disabled'}")
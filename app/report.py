@@ -0,0 +1,336 @@
+# app/report.py
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import pandas as pd
+
+if __name__ == "__main__":
+    project_root = Path(__file__).resolve().parent.parent
+    os.chdir(project_root)
+    sys.path.append(str(project_root / "app"))
+
+from utils import fetch_query, fetch_queries, get_detail_frame, current_generation
+from cube import get_cube
+from basket import get_basket
+import traffic
+
+log = logging.getLogger(__name__)
+
+# === Report Settings ===
+# Every page metric that does not depend on a viewer's filter choice, computed
+# from one detail frame, one cube, one basket and one batch of sql/ queries. The CLI
+# (python app/report.py) writes them to REPORT_DIR as report.json plus one
+# table file per result; pages render a section straight from the report
+# while its load generation is current, and compute it live otherwise.
+# A report covers one location (--location) or, by default, every location;
+# pages scoped to any other location compute live.
+REPORT_DIR = Path(os.getenv("REPORT_DIR", "data/reports"))
+TOP_ITEMS = 15
+
+HOME_QUERIES = {
+    "revenue": "sql/sales_trends.sql",
+    "aov": "sql/avg_items_per_order.sql",
+    "payment": "sql/aov_by_payment_method.sql",
+    "category": "sql/revenue_by_category.sql",
+    "loyalty": "sql/top_returning_customers.sql",
+    "alert": ("sql/low_traffic_alerts.sql", traffic.alert_params()),
+}
+OTHER_QUERIES = {
+    "modifier_lift": "sql/modifier_lift.sql",
+    "category_trends": "sql/revenue_by_category.sql",
+    "weekday": "sql/revenue_by_weekday.sql",
+    "peak": "sql/peak_hours.sql",
+    "bundle": "sql/bundle_effect.sql",
+}
+# Store-wide exports without a location column (no :location bind).
+STORE_WIDE = {"sql/sales_trends.sql", "sql/revenue_by_category.sql"}
+
+_report = None  # (mtime, manifest)
+_report_lock = threading.Lock()
+
+
+def _top_items(frame: pd.DataFrame, n: int) -> pd.DataFrame:
+    return (
+        frame.groupby("item", observed=True)["gross_cents"]
+        .sum()
+        .div(100)
+        .rename("gross_sales")
+        .sort_values(ascending=False)
+        .head(n)
+        .reset_index()
+    )
+
+
+def scoped(queries: dict, location) -> dict:
+    """fetch_queries() input with :location bound for every file that takes it."""
+    out = {}
+    for name, query in queries.items():
+        sql_path, params = query if isinstance(query, tuple) else (query, None)
+        out[name] = query if sql_path in STORE_WIDE else (sql_path, {**(params or {}), "location": location})
+    return out
+
+
+def anonymize_customer_names(df, column="customer_name"):
+    if column in df.columns:
+        unique_names = df[column].dropna().unique()
+        name_map = {name: f"Customer_{i+1:03d}" for i, name in enumerate(unique_names)}
+        df[column] = df[column].map(name_map)
+    return df
+
+
+# === Sections ===
+def home(today, location=None) -> dict:
+    """main.py: month-to-date gross sales, AOV, payment/category mix, loyalty and traffic alerts."""
+    results = fetch_queries(scoped(HOME_QUERIES, location))
+    revenue_df, aov_df = results["revenue"], results["aov"]
+    aov = aov_df.iloc[0] if not aov_df.empty else {}
+
+    loyalty_df = anonymize_customer_names(results["loyalty"], column="customer_name")
+    if "customer_id" in loyalty_df.columns:
+        loyalty_df = loyalty_df.drop(columns=["customer_id"])
+
+    revenue_loaded = not revenue_df.empty and "date_range" in revenue_df.columns
+    mtd_df = pd.DataFrame(columns=["date", "gross_sales"])
+    if revenue_loaded:
+        revenue_df = revenue_df.rename(columns={"date_range": "date", "total_amount": "gross_sales"})
+        revenue_df["date"] = revenue_df["date"].str.extract(r"(\d{2}/\d{2}/\d{4})")[0]
+        revenue_df["date"] = pd.to_datetime(revenue_df["date"], format="%m/%d/%Y", errors="coerce")
+        start_month = pd.Timestamp(today).replace(day=1)
+        mtd_df = revenue_df[revenue_df["date"] >= start_month].copy()
+
+    alert_df = results["alert"]
+    if "traffic_flag" in alert_df.columns:
+        several = location is None and alert_df["location"].nunique() > 1
+        alert_df = alert_df[(["location"] if several else []) + ["date", "orders", "traffic_flag"]]
+    return {
+        "kpis": {
+            "revenue_loaded": revenue_loaded,
+            "mtd_gross_sales": float(mtd_df["gross_sales"].sum()),
+            "avg_order_value": float(aov["avg_order_value"]) if "avg_order_value" in aov else None,
+            "avg_items_per_order": float(aov["avg_items_per_order"]) if "avg_items_per_order" in aov else None,
+        },
+        "tables": {
+            "revenue_mtd": mtd_df,
+            "payment": results["payment"],
+            "category": results["category"],
+            "loyalty": loyalty_df.head(10),
+            "alert": alert_df,
+        },
+    }
+
+
+def overview(location=None) -> dict:
+    """1_Overview.py: week-over-week KPIs, last 14 days of revenue, this week's top items, modifier lift."""
+    frame = get_detail_frame(location)
+    latest_day = frame["date"].max() if not frame.empty else pd.NaT
+    if pd.isnull(latest_day):
+        return {"kpis": {"latest_day": None}, "tables": {}}
+
+    week_start = latest_day - timedelta(days=6)
+    prev_week_start = week_start - timedelta(days=7)
+    prev_week_end = week_start - timedelta(days=1)
+    df = frame[frame["date"] >= prev_week_start]
+    this_week = df[(df["date"] >= week_start) & (df["date"] <= latest_day)]
+    last_week = df[(df["date"] >= prev_week_start) & (df["date"] <= prev_week_end)]
+
+    this_revenue = this_week["gross_cents"].sum() / 100
+    last_revenue = last_week["gross_cents"].sum() / 100
+    return {
+        "kpis": {
+            "first_day": frame["date"].min().isoformat(),
+            "latest_day": latest_day.isoformat(),
+            "week_start": week_start.isoformat(),
+            "revenue_this_week": float(this_revenue),
+            "revenue_last_week": float(last_revenue),
+            "wow_delta": float((this_revenue - last_revenue) / last_revenue) if last_revenue != 0 else 0.0,
+            "orders_this_week": int(len(this_week)),
+        },
+        "tables": {
+            "daily_revenue": df.groupby("date")["gross_cents"].sum().div(100).rename("gross_sales").reset_index(),
+            "top_items_week": _top_items(this_week, 10),
+            "modifier_lift": fetch_query(OTHER_QUERIES["modifier_lift"], {"location": location}),
+        },
+    }
+
+
+def top_items(location=None) -> dict:
+    """2_Top_Items.py with every channel and category selected: top items per month."""
+    frame = get_detail_frame(location)
+    if not frame.empty:
+        frame = frame[frame["channel"].notna() & frame["category"].notna()]  # what "all selected" matches
+    by_month = [
+        _top_items(month_rows, TOP_ITEMS).assign(month=month)
+        for month, month_rows in frame.groupby("month", observed=True)
+    ] if not frame.empty else []
+    table = pd.concat(by_month, ignore_index=True) if by_month else pd.DataFrame(columns=["item", "gross_sales", "month"])
+    return {"kpis": {}, "tables": {"top_items_by_month": table[["month", "item", "gross_sales"]]}}
+
+
+def category_trends(location=None) -> dict:
+    """3_Category_Trends.py: monthly category revenue, parsed (store-wide: the export has no location)."""
+    df = fetch_query(OTHER_QUERIES["category_trends"])
+    if df.empty or "start_date" not in df.columns:
+        return {"kpis": {}, "tables": {"category_months": pd.DataFrame(columns=["month", "category", "revenue"])}}
+    df["month"] = pd.to_datetime(df["start_date"], errors="coerce").dt.to_period("M").dt.to_timestamp()
+    df = df.dropna(subset=["month", "category", "revenue"])
+    df["revenue"] = pd.to_numeric(df["revenue"], errors="coerce")
+    return {"kpis": {}, "tables": {"category_months": df}}
+
+
+def daily_insights(location=None) -> dict:
+    """4_Daily_Insights.py with every card brand and channel selected: per-day KPIs and top items, heatmap, bonus tables."""
+    cube = get_cube(location)
+    bonus = fetch_queries(scoped({k: OTHER_QUERIES[k] for k in ("weekday", "peak", "bundle")}, location))
+    tables = {"weekday": bonus["weekday"], "peak": bonus["peak"], "bundle": bonus["bundle"]}
+    if cube is None:
+        return {"kpis": {}, "tables": tables}
+    tables["pairs"] = get_basket(location).top_pairs()
+
+    # "All selected" in the sidebar never matches a NULL card brand or channel.
+    everything = {axis: [v for v in cube.labels[axis] if v is not None] for axis in ("card_brand", "channel")}
+    dates = sorted(cube.labels["date"])
+    tables["daily_kpis"] = pd.DataFrame({
+        "date": dates,
+        "lines": [cube.total("items", date=[d], **everything) for d in dates],
+        "revenue_cents": [cube.total("revenue", date=[d], **everything) for d in dates],
+    })
+    tables["top_items_by_date"] = pd.concat(
+        [cube.top_items(TOP_ITEMS, date=[d], **everything).assign(date=d) for d in dates], ignore_index=True
+    )[["date", "item", "gross_sales"]]
+    tables["heatmap"] = cube.weekday_hour()
+    return {"kpis": {}, "tables": tables}
+
+
+SECTIONS = {
+    "home": home,
+    "overview": overview,
+    "top_items": top_items,
+    "category_trends": category_trends,
+    "daily_insights": daily_insights,
+}
+
+
+# === Writing ===
+def build_report(today=None, location=None) -> dict:
+    """Compute every section: one detail frame, one cube, one basket and one concurrent batch of queries."""
+    today = pd.Timestamp(today or datetime.now().date())
+    fetch_queries(scoped({**HOME_QUERIES, **OTHER_QUERIES}, location))  # warms the query cache the sections read from
+    get_cube(location)
+    get_basket(location)
+    return {
+        name: (compute(today, location) if name == "home" else compute(location))
+        for name, compute in SECTIONS.items()
+    }
+
+
+def write_report(sections: dict, generation, out_dir: Path = REPORT_DIR, fmt: str = "parquet", today=None,
+                 location=None) -> Path:
+    """
+    Write report.json (KPIs + table index) and one file per table.
+
+    Tables are Parquet, or JSON with an embedded schema (fmt='json') so
+    dtypes survive the round trip. Table files are named per run and
+    report.json is replaced last, atomically, so a reader never pairs a
+    manifest with another run's tables; the previous run's files are removed
+    afterwards. `generation` is the load generation read before the sections
+    were built, so a load that lands mid-run leaves the report stale rather
+    than wrong.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    run = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}-{os.getpid()}"
+    manifest = {
+        "generation": generation,
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "as_of": pd.Timestamp(today or datetime.now().date()).date().isoformat(),
+        "format": fmt,
+        "location": location,
+        "sections": {},
+    }
+    for name, result in sections.items():
+        files = {}
+        for table, df in result["tables"].items():
+            path = out_dir / f"{name}__{table}.{run}.{fmt}"
+            if fmt == "parquet":
+                df.to_parquet(path, index=False)
+            else:
+                df.reset_index(drop=True).to_json(path, orient="table", index=False, date_format="iso")
+            files[table] = path.name
+        manifest["sections"][name] = {"kpis": result["kpis"], "tables": files}
+
+    tmp_path = out_dir / f"report.json.{os.getpid()}.tmp"
+    tmp_path.write_text(json.dumps(manifest, indent=2, default=str))
+    os.replace(tmp_path, out_dir / "report.json")
+
+    current = {file for section in manifest["sections"].values() for file in section["tables"].values()}
+    for path in out_dir.glob("*__*.*"):
+        if path.name not in current and path.suffix in (".parquet", ".json"):
+            path.unlink(missing_ok=True)
+    return out_dir / "report.json"
+
+
+# === Reading (pages) ===
+def _manifest():
+    global _report
+    path = REPORT_DIR / "report.json"
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return None
+    with _report_lock:
+        if _report is None or _report[0] != mtime:
+            _report = (mtime, json.loads(path.read_text()))
+        return _report[1]
+
+
+def get_section(name: str, today=None, live=True, location=None) -> dict | None:
+    """
+    A section's {'kpis', 'tables'}: from the written report when it matches
+    the current load generation and location (and, for 'home', today's date),
+    computed live otherwise (or None with live=False, for pages with a
+    cheaper path).
+    """
+    manifest = _manifest()
+    generation = current_generation()
+    fresh = (
+        manifest is not None
+        and generation is not None
+        and manifest["generation"] == generation
+        and manifest.get("location") == location
+        and name in manifest["sections"]
+        and (name != "home" or manifest["as_of"] == pd.Timestamp(today).date().isoformat())
+    )
+    if fresh:
+        try:
+            entry = manifest["sections"][name]
+            tables = {}
+            for table, file in entry["tables"].items():
+                path = REPORT_DIR / file
+                tables[table] = pd.read_parquet(path) if manifest["format"] == "parquet" else pd.read_json(path, orient="table")
+            return {"kpis": entry["kpis"], "tables": tables}
+        except Exception as e:
+            log.warning("Could not read report section %s: %s", name, e)
+    if not live:
+        return None
+    return SECTIONS[name](pd.Timestamp(today), location) if name == "home" else SECTIONS[name](location)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute every dashboard metric in one pass and write a report snapshot.")
+    parser.add_argument("--format", choices=["parquet", "json"], default="parquet", help="Table file format.")
+    parser.add_argument("--today", default=None, help="Reference date for month-to-date metrics (YYYY-MM-DD).")
+    parser.add_argument("--location", default=None, help="Report on one location instead of all of them.")
+    args = parser.parse_args()
+
+    started = datetime.now()
+    generation = current_generation()
+    sections = build_report(args.today, args.location)
+    path = write_report(sections, generation, REPORT_DIR, args.format, args.today, args.location)
+    tables = sum(len(s["tables"]) for s in sections.values())
+    print(f"✅ Wrote {len(sections)} sections / {tables} tables to {path} "
+          f"in {(datetime.now() - started).total_seconds():.2f}s (generation {generation}).")
@@ -0,0 +1,418 @@
+# app/snapshot_backend.py
+
+import json
+import os
+from pathlib import Path
+import pandas as pd
+import pyarrow.parquet as pq
+import traffic
+
+# Offline backend for fetch_query: answers the dashboard's sql/ files from the
+# month-partitioned Parquet snapshots written by db/load_data.py, so a page
+# render needs no database connection. Each handler mirrors its .sql file.
+SNAPSHOT_DIR = Path(os.getenv("SNAPSHOT_DIR", "data/snapshots"))
+
+FM_WEEKDAY = "%A"  # TO_CHAR(date, 'FMDay')
+
+
+def read_generation():
+    """Return the load generation the snapshots were written for, or None."""
+    try:
+        return json.loads((SNAPSHOT_DIR / "_generation.json").read_text())["generation"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def scan(table: str, columns=None, start_date=None, end_date=None, location=None) -> pd.DataFrame:
+    """
+    Read a snapshot table with column projection and month-partition pruning.
+
+    Args:
+        table: Snapshot table name, e.g. 'detail_items'.
+        columns: Columns to read; None reads all of them.
+        start_date: Optional inclusive lower bound on the partition month.
+        end_date: Optional exclusive upper bound on the partition month.
+        location: Optional location; rows are sorted by it within each month,
+            so row groups of other locations are skipped on their statistics.
+    """
+    filters = []
+    if location is not None:
+        filters.append(("location", "==", location))
+    if start_date is not None:
+        filters.append(("month", ">=", pd.Timestamp(start_date).strftime("%Y-%m")))
+    if end_date is not None:
+        last_day = pd.Timestamp(end_date) - pd.Timedelta(days=1)
+        filters.append(("month", "<=", last_day.strftime("%Y-%m")))
+
+    arrow_table = pq.read_table(
+        SNAPSHOT_DIR / table,
+        columns=columns,
+        filters=filters or None,
+        memory_map=True,
+        partitioning="hive",
+    )
+    df = arrow_table.to_pandas()
+    if "month" in df.columns and (columns is None or "month" not in columns):
+        df = df.drop(columns="month")
+    for col in ("date", "start_date", "end_date"):
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col])
+    return df
+
+
+def _as_dates(df: pd.DataFrame, *cols) -> pd.DataFrame:
+    """Return DATE columns as datetime.date objects, like psycopg2 does."""
+    for col in cols:
+        df[col] = df[col].dt.date
+    return df
+
+
+def _round(series, digits=2):
+    return series.astype(float).round(digits)
+
+
+def _details(columns, start_date=None, end_date=None, location=None) -> pd.DataFrame:
+    df = scan("detail_items", columns, start_date, end_date, location)
+    if start_date is not None:
+        df = df[df["date"] >= pd.Timestamp(start_date)]
+    if end_date is not None:
+        df = df[df["date"] < pd.Timestamp(end_date)]
+    return df
+
+
+# === Handlers (one per sql/ file) ===
+def sales_trends(params):
+    df = scan("sales_summary", ["sales_type", "start_date", "end_date", "amount"])
+    df = df[df["sales_type"] == "Sale"]
+    out = df.groupby(["start_date", "end_date"], as_index=False)["amount"].sum().sort_values("start_date")
+    out["date_range"] = out["start_date"].dt.strftime("%m/%d/%Y") + "–" + out["end_date"].dt.strftime("%m/%d/%Y")
+    out["total_amount"] = _round(out["amount"])
+    return out[["date_range", "total_amount"]].reset_index(drop=True)
+
+
+def avg_items_per_order(params):
+    df = _details(["transaction_id", "gross_sales"], location=params.get("location")).dropna(subset=["transaction_id"])
+    orders = df["transaction_id"].nunique()
+    items = len(df)
+    sales = df["gross_sales"].sum()
+    return pd.DataFrame([{
+        "total_orders": orders,
+        "total_items": items,
+        "total_sales": round(sales, 2),
+        "avg_items_per_order": round(items / orders, 2) if orders else None,
+        "avg_order_value": round(sales / orders, 2) if orders else None,
+    }])
+
+
+def aov_by_payment_method(params):
+    df = _details(["transaction_id", "card_brand", "gross_sales"], location=params.get("location"))
+    df = df[df["card_brand"].notna() & (df["gross_sales"] > 0)]
+    out = df.groupby("card_brand").agg(
+        order_count=("transaction_id", "nunique"),
+        total_revenue=("gross_sales", "sum"),
+    ).reset_index().rename(columns={"card_brand": "payment_method"})
+    out["avg_order_value"] = _round(out["total_revenue"] / out["order_count"])
+    out["total_revenue"] = _round(out["total_revenue"])
+    return out.sort_values("avg_order_value", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def revenue_by_category(params):
+    # The .sql file's final statement is what pandas receives: ten raw rows.
+    df = scan("category_sales", ["category", "start_date", "end_date", "revenue"])
+    df = df[df["category"].notna()].head(10).reset_index(drop=True)
+    return _as_dates(df, "start_date", "end_date")
+
+
+def top_returning_customers(params):
+    df = _details(["customer_id", "customer_name", "date", "gross_sales"], location=params.get("location"))
+    names = df["customer_name"].str.strip()
+    df = df[df["customer_id"].notna() & names.notna() & ~names.isin(["", ","])]
+    out = df.groupby(["customer_id", "customer_name"]).agg(
+        visit_days=("date", "nunique"),
+        total_visits=("gross_sales", "size"),
+        total_spent=("gross_sales", "sum"),
+        avg_spent_per_visit=("gross_sales", "mean"),
+    ).reset_index()
+    out["total_spent"] = _round(out["total_spent"])
+    out["avg_spent_per_visit"] = _round(out["avg_spent_per_visit"])
+    return out.sort_values("total_visits", ascending=False, kind="stable").head(20).reset_index(drop=True)
+
+
+def _daily_orders(location=None):
+    df = _details(["transaction_id", "location", "date", "gross_sales"], location=location)
+    return df.groupby(["location", "date"]).agg(
+        orders=("transaction_id", "nunique"),
+        total_sales=("gross_sales", "sum"),
+    ).reset_index()
+
+
+def low_traffic_alerts(params):
+    # traffic_flags is not snapshotted: score the whole history the way the loader does.
+    params = {**traffic.alert_params(), **(params or {})}
+    daily = _daily_orders(params.get("location"))
+    if daily.empty:
+        return daily.assign(avg_orders=[], std_orders=[], z_score=[], traffic_flag=[])
+    scored = pd.concat([
+        traffic.score(rows.assign(hour=traffic.DAY)[["date", "hour", "orders"]])[0].assign(location=location)
+        for location, rows in daily.groupby("location")
+    ])
+    daily = daily.assign(date=pd.to_datetime(daily["date"])).merge(
+        scored[["location", "date", "n", "mean", "std", "z"]], on=["location", "date"])
+    daily = daily[daily["date"] > daily["date"].max() - pd.Timedelta(days=params["days"])]
+    daily = daily.assign(
+        total_sales=_round(daily["total_sales"]),
+        avg_orders=_round(daily["mean"]),
+        std_orders=_round(daily["std"]),
+        z_score=_round(daily["z"]),
+        traffic_flag=traffic.flag(daily, params["z_threshold"], params["min_history"]),
+    )
+    daily = daily.sort_values(["date", "location"], ascending=[False, True]).reset_index(drop=True)
+    return _as_dates(daily.drop(columns=["n", "mean", "std", "z"]), "date")
+
+
+def filter_options(params):
+    df = _details(["location", "date", "channel", "category", "card_brand"])
+    frames = [pd.DataFrame({"dimension": "location", "value": df["location"].unique()})]
+    if params.get("location") is not None:
+        df = df[df["location"] == params["location"]]
+    frames += [
+        pd.DataFrame({"dimension": "month", "value": df["date"].dt.strftime("%Y-%m").unique()}),
+        pd.DataFrame({"dimension": "date", "value": df["date"].dt.strftime("%Y-%m-%d").unique()}),
+    ]
+    for col in ("channel", "category", "card_brand"):
+        frames.append(pd.DataFrame({"dimension": col, "value": df[col].dropna().unique()}))
+    return pd.concat(frames, ignore_index=True)
+
+
+DETAIL_COLUMNS = [
+    "transaction_id", "item", "category", "date", "time", "gross_sales", "discounts",
+    "refunds", "modifiers_applied", "channel", "card_brand", "datetime",
+]
+
+
+def detail_items(params):
+    return _as_dates(_details(DETAIL_COLUMNS, location=params.get("location")), "date")
+
+
+def detail_items_filtered(params):
+    df = _details(DETAIL_COLUMNS[1:], params["start_date"], params["end_date"], location=params.get("location"))
+    for col, key in (("channel", "channels"), ("category", "categories"), ("card_brand", "card_brands")):
+        if params.get(key) is not None:
+            df = df[df[col].isin(params[key])]
+    return _as_dates(df.reset_index(drop=True), "date")
+
+
+def hourly_volume_heatmap(params):
+    df = _details(["transaction_id", "date", "datetime", "gross_sales"], location=params.get("location"))
+    df = df.dropna(subset=["datetime"])
+    df["weekday"] = df["date"].dt.strftime(FM_WEEKDAY)
+    df["hour"] = pd.to_datetime(df["datetime"]).dt.hour
+    out = df.groupby(["weekday", "hour"]).agg(
+        orders=("transaction_id", "nunique"),
+        revenue=("gross_sales", "sum"),
+    ).reset_index()
+    out["revenue"] = _round(out["revenue"])
+    return out
+
+
+def revenue_by_weekday(params):
+    df = _details(["date", "gross_sales"], location=params.get("location"))
+    df["weekday"] = df["date"].dt.strftime(FM_WEEKDAY).str.ljust(9)  # TO_CHAR 'Day' pads to 9
+    out = df.groupby("weekday").agg(
+        orders=("gross_sales", "size"),
+        total_revenue=("gross_sales", "sum"),
+        avg_order_value=("gross_sales", "mean"),
+    ).reset_index()
+    out["total_revenue"] = _round(out["total_revenue"])
+    out["avg_order_value"] = _round(out["avg_order_value"])
+    return out.sort_values("total_revenue", ascending=False).reset_index(drop=True)
+
+
+def peak_hours(params):
+    df = _details(["datetime", "gross_sales"], location=params.get("location")).dropna(subset=["datetime"])
+    df["hour"] = pd.to_datetime(df["datetime"]).dt.hour
+    out = df.groupby("hour").agg(
+        total_revenue=("gross_sales", "sum"),
+        order_count=("gross_sales", "size"),
+    ).reset_index()
+    out["total_revenue"] = _round(out["total_revenue"])
+    return out
+
+
+def bundle_effect(params):
+    df = _details(["transaction_id", "gross_sales"], location=params.get("location")).dropna(subset=["transaction_id"])
+    orders = df.groupby("transaction_id")["gross_sales"].agg(item_count="size", total_revenue="sum")
+    out = orders.groupby("item_count").agg(
+        order_count=("total_revenue", "size"),
+        avg_order_value=("total_revenue", "mean"),
+    ).reset_index()
+    out["avg_value_per_item"] = _round(out["avg_order_value"] / out["item_count"])
+    out["avg_order_value"] = _round(out["avg_order_value"])
+    return out
+
+
+def modifier_lift(params):
+    df = _details(["item", "modifiers_applied", "gross_sales"], location=params.get("location"))
+    totals = df.groupby("item")["gross_sales"].agg(n_all="size", sum_all="sum")
+    lines = df.dropna(subset=["modifiers_applied"]).reset_index(names="line")
+    exploded = lines.assign(modifier=lines["modifiers_applied"].str.split(",")).explode("modifier")
+    exploded["modifier"] = exploded["modifier"].str.strip()
+    exploded = exploded[exploded["modifier"].fillna("") != ""].drop_duplicates(["line", "modifier"])
+
+    per_item = exploded.groupby(["modifier", "item"])["gross_sales"].agg(n_with="size", sum_with="sum").reset_index()
+    per_item = per_item.join(totals, on="item")
+    rest = per_item["n_all"] - per_item["n_with"]
+    per_item["avg_without"] = ((per_item["sum_all"] - per_item["sum_with"]) / rest).where(rest > 0)
+    compared = per_item["avg_without"].notna()
+    per_item["compared"] = per_item["n_with"].where(compared, 0)
+    per_item["compared_with"] = per_item["sum_with"].where(compared, 0)
+    per_item["compared_without"] = per_item["n_with"] * per_item["avg_without"]
+
+    out = per_item.groupby("modifier").agg(
+        usage_count=("n_with", "sum"),
+        total_sales=("sum_with", "sum"),
+        compared=("compared", "sum"),
+        compared_with=("compared_with", "sum"),
+        compared_without=("compared_without", "sum"),
+    ).reset_index()
+    base = out["compared"].where(out["compared"] > 0)
+    out["avg_gross_sales"] = _round(out["total_sales"] / out["usage_count"])
+    out["total_sales"] = _round(out["total_sales"])
+    out["avg_without_modifier"] = _round(out["compared_without"] / base)
+    out["avg_lift"] = _round((out["compared_with"] - out["compared_without"]) / base)
+    out["lift_pct"] = _round(
+        (out["compared_with"] - out["compared_without"]) / out["compared_without"].where(base.notna()) * 100, 1
+    )
+    out = out.sort_values(["avg_lift", "usage_count"], ascending=[False, False], na_position="last", kind="stable")
+    return out[[
+        "modifier", "usage_count", "avg_gross_sales", "total_sales", "avg_without_modifier", "avg_lift", "lift_pct",
+    ]].head(15).reset_index(drop=True)
+
+
+# Rollup-backed files (daily_rollup, item_daily_rollup): the rollups are not
+# snapshotted, so these group the detail rows the way the loader builds them.
+def daily_revenue(params):
+    df = _details(["date", "gross_sales"], location=params.get("location"))
+    out = df.groupby("date", as_index=False)["gross_sales"].sum().sort_values("date")
+    out["total_revenue"] = _round(out["gross_sales"])
+    return _as_dates(out[["date", "total_revenue"]].reset_index(drop=True), "date")
+
+
+def monthly_summary(params):
+    df = _details(["transaction_id", "location", "date", "gross_sales"], location=params.get("location"))
+    daily = df.groupby(["location", "date"]).agg(
+        orders=("transaction_id", "nunique"),
+        items=("gross_sales", "size"),
+        revenue=("gross_sales", "sum"),
+    ).reset_index()
+    # DATE_TRUNC('month', date) casts the date to timestamptz (UTC sessions).
+    daily["month"] = daily["date"].dt.to_period("M").dt.to_timestamp().dt.tz_localize("UTC")
+    out = daily.groupby("month").agg(
+        total_orders=("orders", "sum"),
+        items=("items", "sum"),
+        total_revenue=("revenue", "sum"),
+    ).reset_index()
+    out["avg_order_value"] = _round(out["total_revenue"] / out["items"].where(out["items"] > 0))
+    out["total_revenue"] = _round(out["total_revenue"])
+    out = out.sort_values("month", ascending=False).reset_index(drop=True)
+    return out[["month", "total_orders", "total_revenue", "avg_order_value"]]
+
+
+def top_items(params):
+    df = _details(["item", "category", "gross_sales"], location=params.get("location"))
+    out = df.groupby(["item", "category"], dropna=False).agg(
+        sale_count=("gross_sales", "size"),
+        total_gross_sales=("gross_sales", "sum"),
+    ).reset_index()
+    out["total_gross_sales"] = _round(out["total_gross_sales"])
+    return out.sort_values("total_gross_sales", ascending=False, kind="stable").head(25).reset_index(drop=True)
+
+
+def payment_mix(params):
+    df = _details(["card_brand", "gross_sales"], location=params.get("location"))
+    df["payment_method"] = df["card_brand"].fillna("Cash")
+    out = df.groupby("payment_method").agg(
+        transaction_count=("gross_sales", "size"),
+        total_revenue=("gross_sales", "sum"),
+    ).reset_index()
+    out["total_revenue"] = _round(out["total_revenue"])
+    return out.sort_values("total_revenue", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def aov_by_channel(params):
+    df = _details(["channel", "gross_sales"], location=params.get("location"))
+    out = df.groupby("channel", dropna=False).agg(
+        order_count=("gross_sales", "size"),
+        total_revenue=("gross_sales", "sum"),
+    ).reset_index()
+    out["avg_order_value"] = _round(out["total_revenue"] / out["order_count"])
+    out["total_revenue"] = _round(out["total_revenue"])
+    return out.sort_values("total_revenue", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def customer_frequency(params):
+    df = _details(["customer_id", "date", "gross_sales"], location=params.get("location"))
+    out = df[df["customer_id"].notna()].groupby("customer_id").agg(
+        active_days=("date", "nunique"),
+        total_visits=("gross_sales", "size"),
+        total_spent=("gross_sales", "sum"),
+    ).reset_index()
+    out["total_spent"] = _round(out["total_spent"])
+    return out.sort_values("total_visits", ascending=False, kind="stable").head(20).reset_index(drop=True)
+
+
+def employee_sales_summary(params):
+    month_start = pd.Timestamp.today().normalize().replace(day=1)  # date_trunc('month', CURRENT_DATE)
+    df = _details(["transaction_id", "employee_name", "date", "gross_sales"], month_start,
+                  location=params.get("location"))
+    out = df[df["employee_name"].notna()].groupby("employee_name").agg(
+        order_count=("transaction_id", "nunique"),
+        total_revenue=("gross_sales", "sum"),
+        avg_per_order=("gross_sales", "mean"),
+    ).reset_index()
+    out["total_revenue"] = _round(out["total_revenue"])
+    out["avg_per_order"] = _round(out["avg_per_order"])
+    return out.sort_values("total_revenue", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def zero_value_orders(params):
+    df = _details(["transaction_id", "employee_name", "date", "gross_sales"], location=params.get("location"))
+    out = df.groupby(["transaction_id", "employee_name", "date"], dropna=False).agg(
+        item_count=("gross_sales", "size"),
+        total_revenue=("gross_sales", "sum"),
+    ).reset_index()
+    out = out[out["total_revenue"] < 0.01]
+    out["total_revenue"] = _round(out["total_revenue"])
+    out = out.sort_values("date", ascending=False, kind="stable").reset_index(drop=True)
+    return _as_dates(out, "date")
+
+
+HANDLERS = {
+    "sales_trends": sales_trends,
+    "avg_items_per_order": avg_items_per_order,
+    "aov_by_payment_method": aov_by_payment_method,
+    "revenue_by_category": revenue_by_category,
+    "top_returning_customers": top_returning_customers,
+    "low_traffic_alerts": low_traffic_alerts,
+    "filter_options": filter_options,
+    "detail_items": detail_items,
+    "detail_items_filtered": detail_items_filtered,
+    "hourly_volume_heatmap": hourly_volume_heatmap,
+    "revenue_by_weekday": revenue_by_weekday,
+    "peak_hours": peak_hours,
+    "bundle_effect": bundle_effect,
+    "modifier_lift": modifier_lift,
+    "daily_revenue": daily_revenue,
+    "monthly_summary": monthly_summary,
+    "top_items": top_items,
+    "payment_mix": payment_mix,
+    "aov_by_channel": aov_by_channel,
+    "customer_frequency": customer_frequency,
+    "employee_sales_summary": employee_sales_summary,
+    "zero_value_orders": zero_value_orders,
+}
+
+
+def run(sql_path: str, params: dict | None = None) -> pd.DataFrame:
+    """Answer a sql/ file from the snapshots (every file in sql/ has a handler)."""
+    return HANDLERS[Path(sql_path).stem](params or {})
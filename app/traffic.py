@@ -0,0 +1,204 @@
+# app/traffic.py
+
+import math
+import os
+from collections import deque
+import pandas as pd
+from sqlalchemy import text
+
+# === Traffic Baselines ===
+# A day's order count is compared with the previous WINDOW_WEEKS observations
+# of the same weekday (a Monday with Mondays), not with one all-time average.
+# Each (location, weekday, hour) key keeps a rolling count/mean/M2 (Welford),
+# so adding a new day and dropping the one that left the window are O(1). The
+# loader scores the dates it touched and stores the result in traffic_flags;
+# the state after the last scored day is kept in traffic_baselines so the next
+# incremental load resumes from it. hour = DAY holds whole-day baselines;
+# per-hour keys are only built with TRAFFIC_HOURLY=1.
+WINDOW_WEEKS = int(os.getenv("TRAFFIC_WINDOW_WEEKS", "8"))
+HOURLY = os.getenv("TRAFFIC_HOURLY", "0").lower() in ("1", "true", "yes")
+DAY = -1
+
+# Read-time settings (bound into sql/low_traffic_alerts.sql, no reload needed).
+Z_THRESHOLD = float(os.getenv("TRAFFIC_Z_THRESHOLD", "1.0"))
+MIN_HISTORY = int(os.getenv("TRAFFIC_MIN_HISTORY", "3"))
+ALERT_DAYS = int(os.getenv("TRAFFIC_ALERT_DAYS", "30"))
+
+LOW_FLAG = "🔻 BELOW AVERAGE"
+NORMAL_FLAG = "Normal"
+
+
+class RollingStats:
+    """Welford running count / mean / sum of squared deviations, with removal."""
+
+    def __init__(self, n=0, mean=0.0, m2=0.0):
+        self.n, self.mean, self.m2 = n, mean, m2
+
+    def add(self, x: float) -> None:
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    def remove(self, x: float) -> None:
+        if self.n <= 1:
+            self.n, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        mean = (self.n * self.mean - x) / (self.n - 1)
+        self.m2 = max(self.m2 - (x - self.mean) * (x - mean), 0.0)
+        self.n -= 1
+        self.mean = mean
+
+    @property
+    def std(self) -> float:
+        """Sample standard deviation (like Postgres STDDEV); NaN below two observations."""
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else float("nan")
+
+
+def alert_params() -> dict:
+    """Binds for sql/low_traffic_alerts.sql."""
+    return {"days": ALERT_DAYS, "z_threshold": Z_THRESHOLD, "min_history": MIN_HISTORY}
+
+
+# === Scoring ===
+def score(series: pd.DataFrame, window: int = WINDOW_WEEKS, since=None, states=None) -> tuple:
+    """
+    Roll the baselines over `series` and score every row dated on/after `since`.
+
+    Args:
+        series: Columns date, hour, orders; one row per observed (date, hour).
+            Rows before `since` only seed the baselines (at most `window` per key
+            are needed).
+        window: Observations per (weekday, hour) key in a baseline.
+        since: First date to score; None scores every row.
+        states: {(weekday, hour): (n, mean, m2, last_date, window)} from the
+            previous run. A key resumes from its state when the state ends at
+            the key's last seeding row; otherwise the seeding rows are re-added.
+
+    Returns:
+        (flags, baselines): flags has date, hour, orders, n, mean, std, z (the
+        baseline before that row); baselines has weekday, hour, n, mean, m2,
+        last_date, window (the baseline after the last row).
+    """
+    series = series.assign(date=pd.to_datetime(series["date"])).sort_values(["date", "hour"], kind="stable")
+    since = pd.Timestamp(since) if since is not None else series["date"].min()
+    states = states or {}
+    flags, baselines = [], []
+    for (weekday, hour), rows in series.groupby([series["date"].dt.weekday, "hour"], sort=True):
+        seed = rows[rows["date"] < since].tail(window)
+        state = states.get((weekday, hour))
+        values = deque(seed["orders"].astype(float))
+        if (state is not None and len(seed) and state[4] == window and state[0] == len(seed)
+                and pd.Timestamp(state[3]) == seed["date"].iloc[-1]):
+            stats = RollingStats(*state[:3])
+        else:
+            stats = RollingStats()
+            for x in values:
+                stats.add(x)
+        last_date = seed["date"].iloc[-1] if len(seed) else None
+        for day, orders in zip(rows.loc[rows["date"] >= since, "date"], rows.loc[rows["date"] >= since, "orders"]):
+            std = stats.std
+            z = (orders - stats.mean) / std if std > 0 else float("nan")
+            flags.append((day, hour, int(orders), stats.n, stats.mean if stats.n else None, std, z))
+            stats.add(float(orders))
+            values.append(float(orders))
+            if len(values) > window:
+                stats.remove(values.popleft())
+            last_date = day
+        if last_date is not None:
+            baselines.append((weekday, hour, stats.n, stats.mean, stats.m2, last_date, window))
+    flags = pd.DataFrame(flags, columns=["date", "hour", "orders", "n", "mean", "std", "z"])
+    flags = flags.sort_values(["date", "hour"]).reset_index(drop=True)
+    baselines = pd.DataFrame(baselines, columns=["weekday", "hour", "n", "mean", "m2", "last_date", "window"])
+    return flags, baselines
+
+
+def flag(flags: pd.DataFrame, z_threshold: float = Z_THRESHOLD, min_history: int = MIN_HISTORY) -> pd.Series:
+    """traffic_flag for scored rows (same rule as sql/low_traffic_alerts.sql)."""
+    low = (flags["n"] >= min_history) & (flags["z"] < -z_threshold)
+    return low.map({True: LOW_FLAG, False: NORMAL_FLAG})
+
+
+# === Loader Update ===
+def update_baselines(conn, dates, window: int = WINDOW_WEEKS, hourly: bool = HOURLY, locations=None) -> int:
+    """
+    Re-score every date from the earliest one touched by this load onwards
+    (later days' baselines include the touched ones) and store the flags and
+    the resulting baselines. Reads the rollups, so run it after refresh_rollups.
+    Every location has its own baselines.
+
+    Args:
+        conn: An open SQLAlchemy Connection (joins the load transaction).
+        dates: Dates touched by this load.
+        window: Observations per (weekday, hour) baseline.
+        hourly: Also keep per-hour baselines and flags.
+        locations: Only re-score these locations (None = every location).
+
+    Returns:
+        Number of flag rows written.
+    """
+    if not dates:
+        return 0
+    since = min(dates)
+    binds = {"day": DAY, "hourly": hourly, "since": since, "window": window, "locations": locations}
+    series = pd.DataFrame(conn.execute(text("""
+        WITH obs AS (
+          SELECT location, date, CAST(:day AS SMALLINT) AS hour, orders FROM daily_rollup
+          UNION ALL
+          SELECT location, date, hour, orders FROM hourly_rollup WHERE :hourly
+        ),
+        scoped AS (
+          SELECT * FROM obs
+          WHERE CAST(:locations AS TEXT[]) IS NULL OR location = ANY(CAST(:locations AS TEXT[]))
+        ),
+        seed AS (
+          SELECT location, date, hour, orders,
+                 ROW_NUMBER() OVER (PARTITION BY location, EXTRACT(ISODOW FROM date), hour ORDER BY date DESC) AS back
+          FROM scoped
+          WHERE date < :since
+        )
+        SELECT location, date, hour, orders FROM seed WHERE back <= :window
+        UNION ALL
+        SELECT location, date, hour, orders FROM scoped WHERE date >= :since
+    """), binds).all(), columns=["location", "date", "hour", "orders"])
+
+    states = {
+        (row.location, row.weekday, row.hour): (row.n, row.mean, row.m2, row.last_date, row.window_size)
+        for row in conn.execute(text("""
+            SELECT * FROM traffic_baselines
+            WHERE CAST(:locations AS TEXT[]) IS NULL OR location = ANY(CAST(:locations AS TEXT[]))
+        """), binds)
+    }
+    flags, baselines = [], []
+    for location, rows in series.groupby("location", sort=True):
+        own = {key[1:]: state for key, state in states.items() if key[0] == location}
+        scored, state = score(rows[["date", "hour", "orders"]], window, since, own)
+        flags.append(scored.assign(location=location))
+        baselines.append(state.assign(location=location))
+    flags = pd.concat(flags, ignore_index=True) if flags else pd.DataFrame()
+    baselines = pd.concat(baselines, ignore_index=True) if baselines else pd.DataFrame()
+
+    conn.execute(text("""
+        DELETE FROM traffic_flags
+        WHERE date >= :since
+          AND (CAST(:locations AS TEXT[]) IS NULL OR location = ANY(CAST(:locations AS TEXT[])))
+    """), binds)
+    if not flags.empty:
+        rows = flags.astype(object).where(flags.notna(), None)
+        rows["date"] = rows["date"].map(lambda d: d.date())
+        conn.execute(text("""
+            INSERT INTO traffic_flags (location, date, hour, orders, n, mean, std, z)
+            VALUES (:location, :date, :hour, :orders, :n, :mean, :std, :z)
+        """), rows.to_dict("records"))
+    conn.execute(text("""
+        DELETE FROM traffic_baselines
+        WHERE CAST(:locations AS TEXT[]) IS NULL OR location = ANY(CAST(:locations AS TEXT[]))
+    """), binds)
+    if not baselines.empty:
+        rows = baselines.rename(columns={"window": "window_size"}).astype(object)
+        rows["last_date"] = rows["last_date"].map(lambda d: d.date())
+        conn.execute(text("""
+            INSERT INTO traffic_baselines (location, weekday, hour, n, mean, m2, last_date, window_size)
+            VALUES (:location, :weekday, :hour, :n, :mean, :m2, :last_date, :window_size)
+        """), rows.to_dict("records"))
+    return len(flags)
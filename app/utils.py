@@ -1,45 +1,423 @@
 # app/utils.py
 
-from sqlalchemy import create_engine, text
-from dotenv import load_dotenv
+from sqlalchemy import text
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
+import contextvars
+import logging
+import threading
+import time
 import os
+import connection
+import copy_fetch
+import perf
+import snapshot_backend
 
-# === Load environment variables from .env ===
-load_dotenv()
+log = logging.getLogger(__name__)
 
-# === Build Supabase-compatible DB URL with SSL ===
-DB_URL = (
-    f"postgresql+psycopg2://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@"
-    f"{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}?sslmode=require"
-)
+# === Query Backend ===
+# "postgres" (default) runs sql/ files through the shared, lazily created
+# engine in connection.py; "parquet" answers them from the snapshots written
+# by db/load_data.py without any DB connection.
+DASHBOARD_BACKEND = os.getenv("DASHBOARD_BACKEND", "postgres").lower()
+if DASHBOARD_BACKEND == "postgres":
+    connection.warm_up()  # background thread; page imports never wait on the DB
 
-engine = create_engine(DB_URL)
+# === Query Result Cache ===
+# Results are kept per process, keyed on SQL text + parameters. Entries expire
+# after CACHE_TTL_SECONDS, the least recently used ones are evicted once the
+# cache grows past CACHE_MAX_BYTES, and everything is dropped as soon as the
+# loader bumps load_metadata.load_generation (checked at most every
+# GENERATION_CHECK_SECONDS so a cache hit never costs a round-trip).
+CACHE_TTL_SECONDS = float(os.getenv("QUERY_CACHE_TTL", "600"))
+CACHE_MAX_BYTES = int(float(os.getenv("QUERY_CACHE_MAX_MB", "256")) * 1024 * 1024)
+GENERATION_CHECK_SECONDS = float(os.getenv("QUERY_CACHE_GENERATION_CHECK", "15"))
 
-def fetch_query(sql_path: str) -> pd.DataFrame:
+_cache = OrderedDict()  # key -> (stored_at, generation, nbytes, DataFrame)
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+_generation = None
+_generation_checked_at = float("-inf")
+_sql_texts = {}  # path -> (mtime, sql text)
+
+
+def _read_sql(sql_path: str) -> str:
+    """Read a .sql file, re-reading it only when it changes on disk."""
+    mtime = os.path.getmtime(sql_path)
+    cached = _sql_texts.get(sql_path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(sql_path, "r") as file:
+        sql = file.read()
+    _sql_texts[sql_path] = (mtime, sql)
+    return sql
+
+
+def _cache_key(sql: str, params: dict | None) -> tuple:
+    items = tuple(sorted((k, repr(v)) for k, v in (params or {}).items()))
+    return sql, items
+
+
+def _evict(key) -> None:
+    global _cache_bytes
+    _, _, nbytes, _ = _cache.pop(key)
+    _cache_bytes -= nbytes
+
+
+def clear_cache() -> None:
+    """Drop every cached query result."""
+    global _cache_bytes
+    with _cache_lock:
+        _cache.clear()
+        _cache_bytes = 0
+
+
+def current_generation():
+    """
+    Return the warehouse load generation written by db/load_data.py.
+
+    The value is re-read at most every GENERATION_CHECK_SECONDS; when it has
+    moved since the last check the result cache is flushed. The parquet
+    backend reads the snapshot's _generation.json instead. Returns None when
+    no generation is recorded (cache then falls back to TTL only).
+    """
+    global _generation, _generation_checked_at, _cache_bytes
+    now = time.monotonic()
+    if now - _generation_checked_at < GENERATION_CHECK_SECONDS:
+        return _generation
+
+    try:
+        if DASHBOARD_BACKEND == "parquet":
+            generation = snapshot_backend.read_generation()
+        else:
+            with connection.get_engine().connect() as conn:
+                generation = conn.execute(
+                    text("SELECT load_generation FROM load_metadata WHERE id = 1")
+                ).scalar()
+    except Exception as e:
+        log.warning("Could not read load generation: %s", e)
+        generation = None
+
+    with _cache_lock:
+        if generation != _generation:
+            _cache.clear()
+            _cache_bytes = 0
+        _generation = generation
+        _generation_checked_at = now
+    return generation
+
+
+def _cache_get(key, generation):
+    """Return (copy of the cached DataFrame, its size in bytes), or (None, None)."""
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return None, None
+        stored_at, entry_generation, nbytes, df = entry
+        if entry_generation != generation or time.monotonic() - stored_at > CACHE_TTL_SECONDS:
+            _evict(key)
+            return None, None
+        _cache.move_to_end(key)
+        return df.copy(), nbytes
+
+
+def _cache_put(key, generation, df: pd.DataFrame) -> int:
+    """Cache df (unless it alone exceeds the budget) and return its size in bytes."""
+    global _cache_bytes
+    nbytes = int(df.memory_usage(deep=True).sum())
+    if nbytes > CACHE_MAX_BYTES:
+        return nbytes
+    with _cache_lock:
+        if key in _cache:
+            _evict(key)
+        _cache[key] = (time.monotonic(), generation, nbytes, df.copy())
+        _cache_bytes += nbytes
+        while _cache_bytes > CACHE_MAX_BYTES:
+            _evict(next(iter(_cache)))
+    return nbytes
+
+
+def _run_query(sql_path: str, sql: str, params: dict | None = None, timings: dict | None = None) -> pd.DataFrame:
+    """
+    Run one sql/ file on the active backend.
+
+    Files registered in copy_fetch stream through COPY TO STDOUT into Arrow;
+    if that fails they are re-run on the regular path below.
+
+    If `timings` is given, timings['first_row'] is set to the seconds until
+    the rows were available to Python (psycopg2 buffers the whole result, so
+    the remainder is DataFrame construction).
+    """
+    started = time.perf_counter()
+    if DASHBOARD_BACKEND == "parquet":
+        df = snapshot_backend.run(sql_path, params)
+        if timings is not None:
+            timings["first_row"] = time.perf_counter() - started
+        return df
+    if copy_fetch.supports(sql_path, sql):
+        try:
+            with connection.get_engine().begin() as conn:
+                df = copy_fetch.fetch(conn, sql_path, sql, params)
+            if timings is not None:
+                timings["first_row"] = time.perf_counter() - started
+            return df
+        except Exception as e:
+            log.warning("COPY fetch failed for %s, using the regular path: %s", sql_path, e)
+            started = time.perf_counter()
+    with connection.get_engine().begin() as conn:
+        if connection.PREPARED_STATEMENTS and connection.can_prepare(sql):
+            result = connection.execute_prepared(conn, sql, params)
+        else:
+            result = conn.execute(text(sql), params or {})
+        rows = result.fetchall()
+        if timings is not None:
+            timings["first_row"] = time.perf_counter() - started
+        return pd.DataFrame.from_records(rows, columns=list(result.keys()), coerce_float=True)
+
+
+def _explain(sql: str, params: dict | None = None) -> dict:
+    """EXPLAIN (ANALYZE, BUFFERS) one query in a rolled-back transaction; returns a plan summary."""
+    try:
+        with connection.get_engine().connect() as conn:
+            plan = conn.execute(text("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql), params or {}).scalar()
+            conn.rollback()
+        plan = plan[0]  # a multi-statement file returns its last SELECT instead of a plan
+        top = plan["Plan"]
+        return {
+            "execution_ms": plan.get("Execution Time"),
+            "planning_ms": plan.get("Planning Time"),
+            "node": top.get("Node Type"),
+            "shared_hit_blocks": top.get("Shared Hit Blocks"),
+            "shared_read_blocks": top.get("Shared Read Blocks"),
+            "temp_written_blocks": top.get("Temp Written Blocks"),
+            "plan": top,
+        }
+    except Exception as e:
+        return {"error": str(e).splitlines()[0] if str(e) else type(e).__name__}
+
+
+def fetch_query(sql_path: str, params: dict | None = None) -> pd.DataFrame:
     """
     Load and run a SQL query from file and return results as a DataFrame.
-    Also logs the returned columns to help debug mismatched names.
+    Results are served from the in-process cache when still valid. Every call
+    is recorded by perf (wall time, rows, bytes, cache hit/miss); errors are
+    logged and yield an empty DataFrame.
+
+    Args:
+        sql_path: Path to the .sql file, relative to the project root.
+        params: Optional bound parameters for `:name` placeholders in the file,
+            e.g. {'start_date': date(2025, 6, 1), 'channels': ['Square Online']}.
+            Lists bind as Postgres arrays, None binds as NULL.
     """
+    started = time.perf_counter()
     try:
-        with open(sql_path, "r") as file:
-            query = text(file.read())
+        sql = _read_sql(sql_path)
+        generation = current_generation()
+        key = _cache_key(sql, params)
 
-        with engine.begin() as conn:
-            df = pd.read_sql_query(query, conn)
+        cached, nbytes = _cache_get(key, generation)
+        if cached is not None:
+            perf.record_query(sql_path, params, started, cached, cache="hit", nbytes=nbytes)
+            return cached
 
-        # === Debugging Aid ===
-        print(f"[DEBUG] ✅ Query: {sql_path}")
-        print(f"[DEBUG] Columns: {df.columns.tolist()}")
+        timings = {}
+        df = _run_query(sql_path, sql, params, timings)
+        nbytes = _cache_put(key, generation, df)
 
+        # === Instrumentation ===
+        explain = None
+        if DASHBOARD_BACKEND == "postgres" and perf.should_explain((time.perf_counter() - started) * 1000):
+            explain_started = time.perf_counter()
+            explain = _explain(sql, params)
+            started += time.perf_counter() - explain_started  # keep EXPLAIN out of the query's wall time
+        perf.record_query(sql_path, params, started, df, first_row_seconds=timings.get("first_row"),
+                          nbytes=nbytes, explain=explain)
         return df
 
     except Exception as e:
-        print(f"[ERROR] ❌ Failed to run query: {sql_path}")
-        print(f"[ERROR] {str(e)}")
+        perf.record_query(sql_path, params, started, error=str(e))
+        log.exception("❌ Failed to run query: %s", sql_path)
         return pd.DataFrame()  # Fail gracefully
 
 
+def fetch_filter_options(location: str | None = None) -> dict:
+    """
+    Return the sidebar option lists from one cheap DISTINCT query.
+
+    Args:
+        location: Limit every list but 'location' to this location (None = all).
+
+    Returns:
+        A dictionary like {'location': [...], 'month': [...], 'date': [...],
+        'channel': [...], 'category': [...], 'card_brand': [...]}, each list
+        sorted ascending.
+    """
+    df = fetch_query("sql/filter_options.sql", {"location": location})
+    if df.empty:
+        return {}
+    return {dim: sorted(group["value"].dropna().tolist()) for dim, group in df.groupby("dimension")}
+
+
+# === Concurrent Batch Fetch ===
+# One process-wide pool, no wider than the engine's connection pool, so a
+# burst of sessions queues here instead of waiting on pool checkouts.
+QUERY_POOL_WORKERS = min(int(os.getenv("QUERY_POOL_WORKERS", "4")), connection.POOL_SIZE)
+_query_pool = ThreadPoolExecutor(max_workers=QUERY_POOL_WORKERS, thread_name_prefix="fetch_query")
+
+
+def fetch_queries(queries: dict) -> dict:
+    """
+    Run several independent SQL files concurrently and return their results.
+    Page latency becomes the slowest query rather than the sum of all of them.
+
+    Args:
+        queries: A dictionary like {'name': 'sql/file.sql'} or, for
+            parameterized files, {'name': ('sql/file.sql', {'param': value})}
+
+    Returns:
+        A dictionary like {'name': DataFrame}, in the same order. A failing
+        query yields an empty DataFrame for its own key only.
+    """
+    results = {}
+    with perf.blocking():  # the page's wait is charged once, not per worker
+        current_generation()  # refresh once here rather than in every worker
+        futures = {}
+        for name, query in queries.items():
+            sql_path, params = query if isinstance(query, tuple) else (query, None)
+            ctx = contextvars.copy_context()  # workers log into this page's rerun
+            futures[name] = _query_pool.submit(ctx.run, perf.in_batch, fetch_query, sql_path, params)
+
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception:
+                log.exception("❌ Failed to run batch query: %s", name)
+                results[name] = pd.DataFrame()
+    return results
+
+
+# === Location Selector ===
+# Every page scopes its queries to the location picked in the sidebar. The
+# choice lives in st.session_state (it survives page switches) and in the
+# ?location= query parameter (links open on the same truck). With a single
+# location there is nothing to choose and no selector is shown.
+ALL_LOCATIONS = "All locations"
+
+
+def select_location() -> str | None:
+    """Render the sidebar location selector; returns the location, or None for all of them."""
+    import streamlit as st
+
+    locations = fetch_filter_options().get("location", [])
+    if len(locations) <= 1:
+        return None
+    choices = [ALL_LOCATIONS] + locations
+    current = st.session_state.get("location") or st.query_params.get("location")
+    choice = st.sidebar.selectbox(
+        "📍 Location", choices, index=choices.index(current) if current in choices else 0,
+    )
+    location = None if choice == ALL_LOCATIONS else choice
+    st.session_state["location"] = location
+    if location is None:
+        st.query_params.pop("location", None)
+    else:
+        st.query_params["location"] = location
+    return location
+
+
+# === Shared Detail Frame ===
+# detail_items is fetched once per load generation and location and shared by
+# every session and page in this process. Treat it as read-only: filter or
+# copy before adding columns.
+DETAIL_CATEGORICALS = ["transaction_id", "item", "category", "channel", "card_brand"]
+DETAIL_MONEY_COLUMNS = {"gross_sales": "gross_cents", "discounts": "discount_cents", "refunds": "refund_cents"}
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+DETAIL_FRAME_SQL = "sql/detail_items.sql"
+
+_detail_frames = {}  # location (None = all) -> (frame, (generation, built_at), nbytes)
+_detail_lock = threading.Lock()
+
+
+def prepare_detail_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert a raw detail_items result into the compact shared layout.
+
+    Text dimensions become categoricals, money becomes int32 cents
+    (`gross_cents`, `discount_cents`, `refund_cents`) and the time columns
+    every page needs are computed once: `date` (midnight, tz-naive), `hour`,
+    `weekday` and `month` ('YYYY-MM').
+    """
+    df = df.copy()
+    df["datetime"] = pd.to_datetime(df["datetime"], errors="coerce")
+    df = df.dropna(subset=["datetime", "gross_sales"])
+
+    out = pd.DataFrame(index=pd.RangeIndex(len(df)))
+    for col in DETAIL_CATEGORICALS:
+        if col in df.columns:
+            out[col] = df[col].astype("category").to_numpy()
+    for col, cents in DETAIL_MONEY_COLUMNS.items():
+        if col in df.columns:
+            out[cents] = (pd.to_numeric(df[col], errors="coerce").fillna(0) * 100).round().astype("int32").to_numpy()
+
+    dt = df["datetime"].reset_index(drop=True)
+    out["datetime"] = dt
+    out["date"] = dt.dt.normalize()
+    out["hour"] = dt.dt.hour.astype("int8")
+    out["weekday"] = pd.Categorical(dt.dt.day_name(), categories=WEEKDAYS, ordered=True)
+    out["month"] = dt.dt.strftime("%Y-%m").astype("category")
+    return out
+
+
+def content_fingerprints(df: pd.DataFrame, codes, n: int, columns) -> np.ndarray:
+    """
+    Order-independent content hash of `columns` per group (`codes` in 0..n-1):
+    the wrapping uint64 sum of each row's hash. Any change to a grouped
+    row's values (not just to the group's row count or total) changes it.
+    """
+    hashes = pd.util.hash_pandas_object(df[list(columns)], index=False).to_numpy()
+    sums = np.zeros(n, dtype="uint64")
+    np.add.at(sums, np.asarray(codes), hashes)
+    return sums
+
+
+def get_detail_frame(location: str | None = None) -> pd.DataFrame:
+    """
+    Return the process-wide, read-only detail_items frame of one location
+    (None = every location).
+
+    It is rebuilt only when the loader's generation changes (or, without
+    load_metadata, after CACHE_TTL_SECONDS). Returns an empty frame on error.
+    """
+    started = time.perf_counter()
+    params = {"location": location}
+    generation = current_generation()
+    with _detail_lock:
+        if location in _detail_frames:
+            frame, (built_generation, built_at), nbytes = _detail_frames[location]
+            fresh = generation is not None or time.monotonic() - built_at <= CACHE_TTL_SECONDS
+            if built_generation == generation and fresh:
+                perf.record_query(DETAIL_FRAME_SQL, params, started, frame, cache="hit", nbytes=nbytes)
+                return frame
+
+        try:
+            timings = {}
+            raw = _run_query(DETAIL_FRAME_SQL, _read_sql(DETAIL_FRAME_SQL), params, timings=timings)
+        except Exception as e:
+            perf.record_query(DETAIL_FRAME_SQL, params, started, error=str(e))
+            log.exception("❌ Failed to load shared detail frame")
+            return pd.DataFrame()
+
+        frame = prepare_detail_frame(raw)
+        nbytes = int(frame.memory_usage(deep=True).sum())
+        _detail_frames[location] = (frame, (generation, time.monotonic()), nbytes)
+        perf.record_query(DETAIL_FRAME_SQL, params, started, frame,
+                          first_row_seconds=timings.get("first_row"), nbytes=nbytes)
+        return frame
+
+
 def rename_columns(df: pd.DataFrame, rename_map: dict) -> pd.DataFrame:
     """
     Rename columns in a DataFrame using a provided mapping dictionary.
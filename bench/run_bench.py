@@ -0,0 +1,446 @@
+# bench/run_bench.py
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import runpy
+import statistics
+import sys
+import time
+import types
+from datetime import datetime, timezone
+from pathlib import Path
+
+# === Setup ===
+project_root = Path(__file__).resolve().parent.parent
+work_dir = project_root / "bench/work"
+os.environ.setdefault("SNAPSHOT_DIR", str(work_dir / "snapshots"))  # never touch the real snapshots
+os.environ.setdefault("PERF_LOG", "")  # keep bench runs out of the dashboard's perf log
+os.environ.setdefault("REPORT_DIR", str(work_dir / "reports"))  # pages time the live path, not a stale report
+
+sys.path[:0] = [str(project_root / "bench"), str(project_root / "db"), str(project_root / "app")]
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import text
+from synthetic import generate
+
+# Benchmarks the loader, every sql/ file and every dashboard page against a
+# seeded synthetic export (bench/synthetic.py) and writes one JSON document per
+# run, so two runs can be diffed for regressions.
+#
+#   postgres backend: loads into BENCH_DB_URL (a scratch database — the full
+#       reload DROPs the dashboard tables) and runs the SQL there.
+#   parquet backend:  no database; the cleaned chunks are written straight to
+#       Parquet snapshots and the queries go through app/snapshot_backend.py.
+PAGES = ["app/main.py"] + sorted(str(p.relative_to(project_root)) for p in (project_root / "app/pages").glob("*.py"))
+
+
+def timed(func, *args, **kwargs):
+    """Run func once, returning (result, seconds)."""
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def summarize(samples: list) -> dict:
+    return {
+        "min_s": round(min(samples), 6),
+        "median_s": round(statistics.median(samples), 6),
+        "runs": len(samples),
+    }
+
+
+# === Stage: synthetic export ===
+def synthetic_export(rows: int, seed: int) -> tuple:
+    """Generate (or reuse) the export for this row count + seed."""
+    path = work_dir / f"detail_items_{rows}_{seed}.csv"
+    if path.exists():
+        return path, {"cached": True}
+    info, seconds = timed(generate, path, rows, seed)
+    return path, {"cached": False, "seconds": round(seconds, 6), **info}
+
+
+# === Stage: loader ===
+class StageClock:
+    """Accumulates wall time per named loader stage."""
+
+    def __init__(self):
+        self.seconds = {}
+
+    @contextlib.contextmanager
+    def __call__(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + time.perf_counter() - started
+
+
+def iterate_timed(chunks, clock: StageClock, stage: str):
+    """Yield from a generator, charging the time spent producing items to `stage`."""
+    while True:
+        with clock(stage):
+            chunk = next(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def bench_loader_postgres(engine, path: Path, chunksize: int) -> dict:
+    """Full reload into Postgres, timed per stage (mirrors load_data.main without --incremental)."""
+    import load_data as ld
+    import traffic
+    from modifiers import assign_line_numbers, load_modifiers
+    from partitions import ensure_partitions
+    from snapshots import export_table, write_generation
+    from bulk_copy import copy_frame
+
+    clock, rows, modifier_rows, dates, customers = StageClock(), 0, 0, set(), []
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        with clock("schema"):
+            conn.execute(text(ld.schema_path.read_text()))
+        with clock("periods"):
+            copy_frame(conn, ld.clean_category_sales(ld.category_path), "category_sales")
+            copy_frame(conn, ld.clean_sales_summary(ld.summary_path), "sales_summary")
+
+        carry, modifier_ids = {}, {}
+        for chunk in iterate_timed(ld.read_detail_chunks(path, chunksize), clock, "read_clean"):
+            with clock("line_numbers"):
+                chunk = assign_line_numbers(chunk, carry)
+                carry.update((chunk.groupby("transaction_id", sort=False)["line_no"].max() + 1).to_dict())
+            with clock("partitions"):
+                ensure_partitions(conn, chunk["date"])
+            with clock("copy_details"):
+                rows += copy_frame(conn, chunk, "detail_items")
+            with clock("modifiers"):
+                modifier_rows += load_modifiers(conn, chunk, modifier_ids)
+            dates.update(pd.to_datetime(chunk["date"]).dt.date.unique())
+            customers.append(ld.build_customers(chunk))
+
+        with clock("migrations"):
+            ld.apply_migrations(conn)
+        with clock("customers"):
+            ld.upsert_customers(conn, ld.build_customers(pd.concat(customers)))
+        with clock("rollups"):
+            ld.refresh_rollups(conn, sorted(dates))
+        with clock("traffic"):
+            traffic.update_baselines(conn, sorted(dates))
+        generation = ld.bump_generation(conn)
+
+    with clock("snapshots"), engine.connect() as conn:
+        for table in ("detail_items", "category_sales", "sales_summary"):
+            export_table(conn, table)
+        write_generation(generation)
+
+    total = time.perf_counter() - started
+    return {
+        "rows": rows,
+        "modifier_rows": modifier_rows,
+        "dates": len(dates),
+        "total_s": round(total, 6),
+        "rows_per_s": round(rows / max(total, 1e-9)),
+        "stages_s": {k: round(v, 6) for k, v in clock.seconds.items()},
+    }
+
+
+def bench_loader_parquet(path: Path, chunksize: int) -> dict:
+    """Clean the export and write the snapshots directly (no database)."""
+    import shutil
+    import load_data as ld
+    from modifiers import assign_line_numbers, explode_modifiers
+    from snapshots import SNAPSHOT_DIR, _write_partition, write_generation
+
+    shutil.rmtree(SNAPSHOT_DIR, ignore_errors=True)
+    clock, rows, modifier_rows, dates = StageClock(), 0, 0, set()
+    started = time.perf_counter()
+    with clock("periods"):
+        for table, df in (("category_sales", ld.clean_category_sales(ld.category_path)),
+                          ("sales_summary", ld.clean_sales_summary(ld.summary_path))):
+            for month, part in df.groupby(df["start_date"].dt.strftime("%Y-%m")):
+                _write_partition(part.reset_index(drop=True), table, month)
+
+    carry = {}
+    chunks = ld.read_detail_chunks(path, chunksize)
+    for i, chunk in enumerate(iterate_timed(chunks, clock, "read_clean")):
+        with clock("line_numbers"):
+            chunk = assign_line_numbers(chunk, carry)
+            carry.update((chunk.groupby("transaction_id", sort=False)["line_no"].max() + 1).to_dict())
+        with clock("modifiers"):
+            modifier_rows += len(explode_modifiers(chunk))
+        with clock("snapshots"):
+            # Same columns as the detail_items table (COPY leaves absent ones at their defaults).
+            chunk = chunk.reindex(columns=["line_no", *ld.DETAIL_KEEP_COLS]).assign(
+                discounts=chunk.get("discounts", 0.0),
+                refunds=chunk.get("refunds", 0.0),
+                date=pd.to_datetime(chunk["date"]),
+                datetime=pd.to_datetime(chunk["date"] + " " + chunk["time"]),
+            )
+            for month, part in chunk.groupby(chunk["date"].dt.strftime("%Y-%m")):
+                part_dir = SNAPSHOT_DIR / "detail_items" / f"month={month}"
+                part_dir.mkdir(parents=True, exist_ok=True)
+                pq.write_table(pa.Table.from_pandas(part, preserve_index=False),
+                               part_dir / f"part-{i}.parquet", compression="zstd")
+        dates.update(chunk["date"].dt.date.unique())
+        rows += len(chunk)
+    write_generation(1)
+
+    total = time.perf_counter() - started
+    return {
+        "rows": rows,
+        "modifier_rows": modifier_rows,
+        "dates": len(dates),
+        "total_s": round(total, 6),
+        "rows_per_s": round(rows / max(total, 1e-9)),
+        "stages_s": {k: round(v, 6) for k, v in clock.seconds.items()},
+    }
+
+
+# === Stage: SQL ===
+def query_params() -> dict:
+    """Sample parameters for the parameterized sql/ files (whole date range, every location, no filters)."""
+    import traffic
+
+    return {
+        "sql/detail_items_filtered.sql": {
+            "start_date": pd.Timestamp("2000-01-01").date(),
+            "end_date": pd.Timestamp("2100-01-01").date(),
+            "channels": None, "categories": None, "card_brands": None,
+        },
+        "sql/low_traffic_alerts.sql": traffic.alert_params(),
+    }
+
+
+def bench_sql(utils, repeat: int) -> dict:
+    paths = sorted(str(p.relative_to(project_root)) for p in (project_root / "sql").glob("*.sql"))
+
+    params = query_params()
+    results = {}
+    for path in paths:
+        sql = utils._read_sql(path)
+        samples, rows = [], None
+        try:
+            for _ in range(repeat):
+                df, seconds = timed(utils._run_query, path, sql, {"location": None, **params.get(path, {})})
+                samples.append(seconds)
+                rows = len(df)
+        except Exception as e:
+            results[path] = {"error": f"{type(e).__name__}: {e}".splitlines()[0]}
+            continue
+        results[path] = {"rows": rows, **summarize(samples)}
+    return results
+
+
+# === Stage: pages (Streamlit stubbed out) ===
+class StopPage(Exception):
+    """Raised by the stub's st.stop()."""
+
+
+class _Widget:
+    """Stand-in for any Streamlit element: every call/attribute is a no-op."""
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+    def __getattr__(self, name):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def streamlit_stub() -> types.ModuleType:
+    """
+    A fake `streamlit` module: widgets return their default selection and
+    every display call is a no-op, so a page run measures only the data work
+    (queries, pandas transforms, chart construction).
+    """
+    st = types.ModuleType("streamlit")
+    noop = _Widget()
+
+    def selectbox(label, options, index=0, **kwargs):
+        options = list(options)
+        return options[index] if options else None
+
+    def multiselect(label, options, default=None, **kwargs):
+        return list(default) if default is not None else []
+
+    def columns(spec, **kwargs):
+        return [_Widget() for _ in range(spec if isinstance(spec, int) else len(spec))]
+
+    def stop():
+        raise StopPage()
+
+    def cache_data(func=None, **kwargs):
+        return func if func is not None else (lambda f: f)
+
+    sidebar = types.SimpleNamespace(selectbox=selectbox, multiselect=multiselect, header=noop,
+                                    markdown=noop, caption=noop, info=noop)
+    for name, value in {
+        "selectbox": selectbox, "multiselect": multiselect, "columns": columns, "stop": stop,
+        "cache_data": cache_data, "cache_resource": cache_data, "sidebar": sidebar,
+        "session_state": {}, "query_params": {},
+    }.items():
+        setattr(st, name, value)
+    st.__getattr__ = lambda name: noop
+    return st
+
+
+def run_page(path: str) -> str:
+    """Execute one page script; returns 'ok', 'stopped' or the error."""
+    try:
+        runpy.run_path(str(project_root / path), run_name="__main__")
+        return "ok"
+    except StopPage:
+        return "stopped"
+    except Exception as e:
+        return f"{type(e).__name__}: {e}".splitlines()[0]
+
+
+def bench_pages(utils, repeat: int) -> dict:
+    """
+    Time each page cold (empty query cache + shared frame) and warm.
+
+    Warm runs hit the result cache, so they approximate the page's own
+    transform cost.
+    """
+    sys.modules["streamlit"] = streamlit_stub()
+    results = {}
+    for path in PAGES:
+        cold, warm, status = [], [], "ok"
+        for _ in range(repeat):
+            utils.clear_cache()
+            utils._detail_frames.clear()
+            status, seconds = timed(run_page, path)
+            cold.append(seconds)
+            _, seconds = timed(run_page, path)
+            warm.append(seconds)
+        results[path] = {"status": status, "cold": summarize(cold), "warm": summarize(warm)}
+    return results
+
+
+# === Comparison ===
+def flatten(report: dict) -> dict:
+    """{'100000 sql/top_items.sql': seconds, ...} for the timings two reports share."""
+    flat = {}
+    for run in report["runs"]:
+        prefix = str(run["rows"])
+        if "loader" in run:
+            flat[f"{prefix} loader"] = run["loader"]["total_s"]
+            for stage, seconds in run["loader"]["stages_s"].items():
+                flat[f"{prefix} loader.{stage}"] = seconds
+        for path, result in run.get("sql", {}).items():
+            if "median_s" in result:
+                flat[f"{prefix} {path}"] = result["median_s"]
+        for path, result in run.get("pages", {}).items():
+            flat[f"{prefix} {path} cold"] = result["cold"]["median_s"]
+            flat[f"{prefix} {path} warm"] = result["warm"]["median_s"]
+    return flat
+
+
+def compare(baseline: dict, report: dict, threshold: float) -> list:
+    """Timings that got slower than baseline by more than `threshold` (0.2 = 20%)."""
+    before, after = flatten(baseline), flatten(report)
+    regressions = []
+    for key in sorted(before.keys() & after.keys()):
+        if before[key] > 0 and after[key] / before[key] - 1 > threshold:
+            regressions.append({"timing": key, "baseline_s": before[key], "current_s": after[key],
+                                "ratio": round(after[key] / before[key], 3)})
+    return regressions
+
+
+# === Main ===
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark loader, SQL and pages on synthetic data.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000],
+                        help="Synthetic export sizes to benchmark (e.g. 10000 1000000 10000000).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backend", choices=["postgres", "parquet"], default="parquet")
+    parser.add_argument("--db-url", default=os.getenv("BENCH_DB_URL"),
+                        help="Scratch Postgres for the postgres backend (default: $BENCH_DB_URL).")
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per query/page (min and median are reported).")
+    parser.add_argument("--stages", nargs="+", choices=["loader", "sql", "pages"], default=["loader", "sql", "pages"])
+    parser.add_argument("--baseline", type=Path, default=None,
+                        help="Earlier result JSON; timings slower by more than --threshold are reported.")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--out", type=Path, default=None,
+                        help="JSON output path (default: bench/results/<timestamp>.json).")
+    args = parser.parse_args()
+
+    if args.backend == "postgres" and not args.db_url:
+        parser.error("--backend postgres needs --db-url or BENCH_DB_URL (it drops and reloads the tables).")
+
+    os.environ["DASHBOARD_BACKEND"] = args.backend
+    if args.backend == "postgres":
+        os.environ["DATABASE_URL"] = args.db_url  # the dashboard's lazy engine (app/connection.py)
+    os.chdir(project_root)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import utils
+    from connection import create_db_engine
+    engine = None
+    if args.backend == "postgres":
+        engine = create_db_engine(statement_timeout_ms=0, pool_size=1, max_overflow=0,
+                                  application_name="toastedbean-bench")
+
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "backend": args.backend,
+        "seed": args.seed,
+        "chunksize": args.chunksize,
+        "repeat": args.repeat,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "runs": [],
+    }
+    for rows in args.rows:
+        print(f"⏱️  {rows:,} rows ({args.backend})")
+        path, export = synthetic_export(rows, args.seed)
+        run = {"rows": rows, "export": export}
+        with contextlib.redirect_stdout(io.StringIO()):
+            if "loader" in args.stages:
+                if args.backend == "postgres":
+                    run["loader"] = bench_loader_postgres(engine, path, args.chunksize)
+                else:
+                    run["loader"] = bench_loader_parquet(path, args.chunksize)
+            utils.clear_cache()
+            utils._detail_frames.clear()
+            if "sql" in args.stages:
+                run["sql"] = bench_sql(utils, args.repeat)
+            if "pages" in args.stages:
+                run["pages"] = bench_pages(utils, args.repeat)
+        report["runs"].append(run)
+
+        if "loader" in run:
+            print(f"   loader: {run['loader']['total_s']:.2f}s ({run['loader']['rows_per_s']:,} rows/s)")
+        if "sql" in run:
+            errors = [path for path, result in run["sql"].items() if "error" in result]
+            slowest = max(run["sql"].items(), key=lambda kv: kv[1].get("median_s", 0))
+            print(f"   sql: {len(run['sql'])} files, slowest {slowest[0]} {slowest[1].get('median_s', 0):.3f}s"
+                  + (f" | ⚠️ errors: {', '.join(errors)}" if errors else ""))
+        for page, result in run.get("pages", {}).items():
+            print(f"   {page}: cold {result['cold']['median_s']:.3f}s | warm {result['warm']['median_s']:.3f}s ({result['status']})")
+
+    if args.baseline:
+        report["regressions"] = compare(json.loads(args.baseline.read_text()), report, args.threshold)
+        for reg in report["regressions"]:
+            print(f"⚠️ {reg['timing']}: {reg['baseline_s']:.3f}s → {reg['current_s']:.3f}s (x{reg['ratio']})")
+        if not report["regressions"]:
+            print(f"✅ No timing regressed more than {args.threshold:.0%} against {args.baseline}")
+
+    out = args.out or project_root / "bench/results" / f"{datetime.now():%Y%m%d-%H%M%S}-{args.backend}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2, default=str))
+    print(f"✅ Wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
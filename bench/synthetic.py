@@ -0,0 +1,180 @@
+# bench/synthetic.py
+
+import argparse
+import string
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# === Setup ===
+project_root = Path(__file__).resolve().parent.parent
+template_path = project_root / "data/cleaned/cleaned_detail_items.csv"
+
+# Synthetic Square "Item Details" exports for benchmarking. Line- and
+# transaction-level attributes are resampled from the real export, so item
+# names, prices, modifier strings, US$ amounts, channels and card brands keep
+# their real shapes and frequencies; transaction ids, customers, dates and
+# times are generated. The same seed always produces the same file.
+LINE_COLUMNS = [
+    "Category", "Item", "Qty", "Price Point Name", "SKU", "Modifiers Applied",
+    "Gross Sales", "Discounts", "Net Sales", "Tax", "Notes", "Unit", "Count",
+    "Itemization Type", "Fulfillment Note",
+]
+TRANSACTION_COLUMNS = [
+    "Time Zone", "Device Name", "Event Type", "Location", "Dining Option",
+    "Channel", "Card Brand", "PAN Suffix",
+]
+ID_ALPHABET = np.array(list(string.ascii_letters + string.digits))
+LATEST_DATE = pd.Timestamp("2025-06-18")
+ROWS_PER_DAY = 300  # default history length: rows / ROWS_PER_DAY days
+CUSTOMER_SHARE = 0.3  # share of transactions tied to a customer profile
+WRITE_CHUNK = 200_000
+
+
+def clock_labels() -> np.ndarray:
+    """'HH:MM:SS' for every second of the day, indexed by seconds since midnight."""
+    seconds = np.arange(86400)
+    h, m, s = (np.char.zfill(part.astype(str), 2) for part in (seconds // 3600, seconds // 60 % 60, seconds % 60))
+    return np.char.add(np.char.add(np.char.add(np.char.add(h, ":"), m), ":"), s).astype(object)
+
+
+CLOCK = clock_labels()
+
+
+def load_templates(path: Path = template_path) -> dict:
+    """Real export -> line templates, transaction templates and empirical distributions."""
+    real = pd.read_csv(path)
+    first_lines = real.drop_duplicates("Transaction ID")
+    basket = real.groupby("Transaction ID").size().value_counts(normalize=True).sort_index()
+    hours = real["Hour"].value_counts(normalize=True).sort_index()
+    return {
+        "lines": real[LINE_COLUMNS].reset_index(drop=True),
+        "transactions": first_lines[TRANSACTION_COLUMNS].reset_index(drop=True),
+        "basket_sizes": (basket.index.to_numpy(), basket.to_numpy()),
+        "hours": (hours.index.to_numpy(), hours.to_numpy()),
+        "columns": list(real.columns),
+    }
+
+
+def random_ids(rng: np.random.Generator, n: int, length: int, suffix: str = "") -> np.ndarray:
+    """Square-style base62 ids, e.g. 'lMd1BH8wEeTFqqFbflx7MTMbAlUZY'."""
+    chars = ID_ALPHABET[rng.integers(0, len(ID_ALPHABET), size=(n, length))]
+    return np.char.add(chars.view(f"<U{length}").ravel(), suffix)
+
+
+def format_currency(values: np.ndarray) -> pd.Series:
+    """Floats -> Square's 'US$1,234.50' / '-US$1.00' strings."""
+    amounts = pd.Series(np.abs(values)).map("{:,.2f}".format)
+    return np.where(values < 0, "-US$", "US$") + amounts
+
+
+def day_calendar(days: int) -> dict:
+    """Date/Weekday/Week/Month labels for day offsets 0..days-1 before LATEST_DATE."""
+    dates = LATEST_DATE - pd.to_timedelta(np.arange(days), unit="D")
+    week_start = dates - pd.to_timedelta(dates.weekday, unit="D")
+    return {
+        "Date": np.asarray(dates.strftime("%Y-%m-%d"), dtype=object),
+        "Weekday": np.asarray(dates.day_name(), dtype=object),
+        "Week": np.asarray(week_start.strftime("%Y-%m-%d") + "/" + (week_start + pd.Timedelta(days=6)).strftime("%Y-%m-%d"), dtype=object),
+        "Month": np.asarray(dates.strftime("%Y-%m"), dtype=object),
+    }
+
+
+def generate_chunk(rng: np.random.Generator, templates: dict, n_transactions: int,
+                   days: int, customers: np.ndarray) -> pd.DataFrame:
+    """Generate the lines of n_transactions synthetic transactions."""
+    sizes, size_p = templates["basket_sizes"]
+    basket = rng.choice(sizes, size=n_transactions, p=size_p)
+    txn = np.repeat(np.arange(n_transactions), basket)
+    n_rows = len(txn)
+
+    # Transaction-level attributes, broadcast to each line.
+    txn_attrs = templates["transactions"].iloc[rng.integers(0, len(templates["transactions"]), n_transactions)]
+    hours, hour_p = templates["hours"]
+    day = rng.integers(0, days, n_transactions)
+    second = rng.choice(hours, size=n_transactions, p=hour_p) * 3600 + rng.integers(0, 3600, n_transactions)
+    has_customer = rng.random(n_transactions) < CUSTOMER_SHARE
+    customer_idx = rng.integers(0, len(customers), n_transactions)
+    transaction_ids = random_ids(rng, n_transactions, 25, "ZY")
+
+    df = templates["lines"].iloc[rng.integers(0, len(templates["lines"]), n_rows)].reset_index(drop=True)
+    for col in TRANSACTION_COLUMNS:
+        df[col] = txn_attrs[col].to_numpy()[txn]
+    day, second = day[txn], second[txn]
+    calendar = day_calendar(days)
+    df["Date"] = calendar["Date"][day]
+    df["Time"] = CLOCK[second]
+    df["Transaction ID"] = transaction_ids[txn]
+    df["Payment ID"] = random_ids(rng, n_transactions, 27, "ZY")[txn]
+    df["Details"] = (
+        "https://app.squareup.com/dashboard/sales/transactions/" + df["Transaction ID"] + "/by-unit/LQ44G3RPEGR9T"
+    )
+    cust_id = np.where(has_customer, customers[customer_idx, 0], None)[txn]
+    cust_name = np.where(has_customer, customers[customer_idx, 1], None)[txn]
+    df["Customer ID"] = cust_id
+    df["Customer Name"] = cust_name
+    df["Customer Reference ID"] = None
+    df["Token"] = None
+
+    # Net Sales / Tax stay US$ strings like the real export.
+    net = df["Gross Sales"].to_numpy(dtype=float) + df["Discounts"].fillna(0).to_numpy(dtype=float)
+    df["Net Sales"] = format_currency(net)
+    df["Tax"] = format_currency(np.round(net * 0.086, 2))
+
+    df["Datetime"] = df["Date"] + " " + df["Time"]
+    df["Hour"] = second // 3600
+    for col in ("Weekday", "Week", "Month"):
+        df[col] = calendar[col][day]
+    df["AM/PM"] = np.where(df["Hour"] < 12, "AM", "PM")
+    return df[templates["columns"]]
+
+
+def generate(path: Path, rows: int, seed: int = 0, days: int | None = None) -> dict:
+    """
+    Write a synthetic detail export with about `rows` lines to `path`.
+
+    Args:
+        path: Output CSV path.
+        rows: Target row count (the last basket may overshoot by a few lines).
+        seed: RNG seed; same seed + rows + days -> byte-identical file.
+        days: History length; defaults to rows / ROWS_PER_DAY (at least 37 days,
+            like the real export).
+
+    Returns:
+        {'path', 'rows', 'transactions', 'days'}
+    """
+    rng = np.random.default_rng(seed)
+    templates = load_templates()
+    days = days or max(37, rows // ROWS_PER_DAY)
+    sizes, size_p = templates["basket_sizes"]
+    mean_basket = float((sizes * size_p).sum())
+
+    n_customers = max(35, rows // 30)
+    customers = np.column_stack([
+        random_ids(rng, n_customers, 26),
+        np.char.add("Customer ", np.arange(n_customers).astype(str)),
+    ]).astype(object)
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    written, transactions = 0, 0
+    with open(path, "w", newline="") as f:
+        while written < rows:
+            n_txn = max(1, int(min(WRITE_CHUNK, rows - written) / mean_basket))
+            chunk = generate_chunk(rng, templates, n_txn, days, customers)
+            chunk.to_csv(f, index=False, header=written == 0)
+            written += len(chunk)
+            transactions += n_txn
+    return {"path": str(path), "rows": written, "transactions": transactions, "days": days}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic Square detail export for benchmarks.")
+    parser.add_argument("--rows", type=int, default=100_000, help="Approximate number of detail lines.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--days", type=int, default=None, help="History length in days.")
+    parser.add_argument("--out", type=Path, default=Path("bench/work/detail_items.csv"))
+    args = parser.parse_args()
+
+    info = generate(args.out, args.rows, args.seed, args.days)
+    print(f"✅ Wrote {info['rows']:,} rows / {info['transactions']:,} transactions over {info['days']} days to {info['path']}")
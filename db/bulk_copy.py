@@ -0,0 +1,55 @@
+# db/bulk_copy.py
+
+import io
+import pandas as pd
+from sqlalchemy import text
+
+
+def _copy_sql(table: str, columns) -> str:
+    cols = ", ".join(f'"{c}"' for c in columns)
+    return f"COPY {table} ({cols}) FROM STDIN WITH (FORMAT csv)"
+
+
+def copy_frame(conn, df: pd.DataFrame, table: str, staging: bool = False) -> int:
+    """
+    Bulk-load a DataFrame with psycopg2 COPY ... FROM STDIN.
+
+    The frame is serialized to CSV in memory (no temp files) and streamed over
+    the caller's SQLAlchemy connection, so it joins the open transaction.
+    NaN/None become NULL.
+
+    Args:
+        conn: An open SQLAlchemy Connection (inside engine.begin()).
+        df: Rows to load; column names must match the target table.
+        table: Target table name.
+        staging: COPY into a `<table>_staging` temp table first (unlogged and
+            private to this session, so concurrent loads never share it), then
+            move the rows into the target with one INSERT ... SELECT and drop it.
+
+    Returns:
+        Number of rows loaded.
+    """
+    if df.empty:
+        return 0
+
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+
+    target = f"{table}_staging" if staging else table
+    if staging:
+        conn.execute(text(f"DROP TABLE IF EXISTS pg_temp.{target}"))
+        conn.execute(text(f"CREATE TEMP TABLE {target} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP"))
+
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(_copy_sql(target, df.columns), buffer)
+    finally:
+        cursor.close()
+
+    if staging:
+        cols = ", ".join(f'"{c}"' for c in df.columns)
+        conn.execute(text(f"INSERT INTO {table} ({cols}) SELECT {cols} FROM {target}"))
+        conn.execute(text(f"DROP TABLE pg_temp.{target}"))
+
+    return len(df)
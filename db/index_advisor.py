@@ -0,0 +1,398 @@
+# db/index_advisor.py
+
+import os
+import re
+import json
+import argparse
+from pathlib import Path
+from sqlalchemy import text
+
+# === Setup ===
+project_root = Path(__file__).resolve().parent.parent
+os.chdir(project_root)
+
+import sys
+sys.path.append(str(project_root / "app"))
+from datetime import timedelta
+from connection import create_db_engine
+
+# Workload-driven index advisor: EXPLAINs every sql/ file against a populated
+# database, reports sequential scans and sorts that spill to disk, derives
+# candidate indexes from the plans (BRIN for date ranges, partial indexes for
+# IS NOT NULL filters, covering indexes for GROUP BY aggregates), measures
+# each candidate's planner cost inside a rolled-back transaction and writes
+# the ones that help to db/migrations/ for load_data.py to apply.
+SQL_DIR = Path("sql")
+MIGRATIONS_DIR = Path("db/migrations")
+BIND = re.compile(r"(?<![:\w]):(\w+)")
+COMMENT = re.compile(r"--[^\n]*")
+IDENT = re.compile(r"\b([a-z_][a-z0-9_]*)\b")
+LITERALS = re.compile(r"'[^']*'|::[a-z ]+(\[\])?")  # string literals and ::type casts
+DATE_TYPES = ("date", "timestamp without time zone", "timestamp with time zone")
+MAX_INCLUDE = 4  # wider covering indexes cost more to maintain than they save here
+
+
+# === Workload ===
+def statements(sql: str) -> list:
+    """Split a .sql file into its statements (comments removed)."""
+    return [s.strip() for s in COMMENT.sub("", sql).split(";") if s.strip()]
+
+
+def sample_params(conn) -> dict:
+    """Representative values for the :name binds used in sql/ (full date range, every location, no filters)."""
+    first, last = conn.execute(text("SELECT MIN(date), MAX(date) FROM detail_items")).one()
+    return {
+        "start_date": first,
+        "end_date": last,
+        "dates": [last] if last else [],
+        "months": [last.strftime("%Y-%m")] if last else [],
+        "channels": None,
+        "categories": None,
+        "card_brands": None,
+        "days": 30,
+        "z_threshold": 1.0,
+        "min_history": 3,
+        "location": None,
+    }
+
+
+def sample_location(conn):
+    """The busiest location when there are several (pages scoped to one truck), else None."""
+    rows = conn.execute(text("""
+        SELECT location FROM detail_items GROUP BY location ORDER BY COUNT(*) DESC, location
+    """)).scalars().all()
+    return rows[0] if len(rows) > 1 else None
+
+
+def load_workload(params: dict, location=None) -> list:
+    """
+    [(label, statement, binds)] for every statement in sql/ whose binds we can
+    fill. With `location`, statements taking :location also run scoped to it
+    (label suffix '@location'), so location-filtered plans are covered too.
+    Statements taking a :start_date/:end_date range also run over its last
+    week (label suffix '@week'): partitions are whole months, so only a
+    window inside one month shows what an index on date is worth.
+    """
+    workload = []
+    for path in sorted(SQL_DIR.glob("*.sql")):
+        stmts = statements(path.read_text())
+        for i, stmt in enumerate(stmts, start=1):
+            label = str(path) if len(stmts) == 1 else f"{path}#{i}"
+            names = set(BIND.findall(stmt))
+            missing = names - params.keys()
+            if missing:
+                print(f"⚠️ Skipped {label}: no sample value for {sorted(missing)}")
+                continue
+            binds = {n: params[n] for n in names}
+            workload.append((label, stmt, binds))
+            if location is not None and "location" in names:
+                workload.append((f"{label}@location", stmt, {**binds, "location": location}))
+            if {"start_date", "end_date"} <= names and params["end_date"]:
+                last = params["end_date"]
+                week = {"start_date": last - timedelta(days=6), "end_date": last + timedelta(days=1)}
+                workload.append((f"{label}@week", stmt, {**binds, **week}))
+    return workload
+
+
+def explain(conn, stmt: str, binds: dict, analyze=False) -> dict:
+    options = "ANALYZE, BUFFERS, VERBOSE, FORMAT JSON" if analyze else "VERBOSE, FORMAT JSON"
+    return conn.execute(text(f"EXPLAIN ({options}) {stmt}"), binds).scalar()[0]["Plan"]
+
+
+def walk(node: dict, ancestors=()):
+    """Yield (node, ancestors) for every node of a plan tree."""
+    yield node, ancestors
+    for child in node.get("Plans", []):
+        yield from walk(child, ancestors + (node,))
+
+
+# === Findings ===
+def table_columns(conn) -> dict:
+    """{table: {column: data_type}} for the public schema."""
+    rows = conn.execute(text("""
+        SELECT table_name, column_name, data_type
+        FROM information_schema.columns
+        WHERE table_schema = 'public'
+    """)).all()
+    columns = {}
+    for table, column, data_type in rows:
+        columns.setdefault(table, {})[column] = data_type
+    return columns
+
+
+def partition_parents(conn) -> dict:
+    """{partition: parent table}; plans scan partitions, indexes go on the parent."""
+    rows = conn.execute(text("""
+        SELECT c.relname, p.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+    """)).all()
+    return dict(rows)
+
+
+def existing_indexes(conn) -> list:
+    """Every non-partial index already on a (parent) table, primary keys included, as candidate-shaped dicts."""
+    rows = conn.execute(text("""
+        SELECT t.relname, i.relname, am.amname,
+               ARRAY(SELECT a.attname
+                     FROM unnest(x.indkey[0:x.indnkeyatts - 1]) WITH ORDINALITY AS k(attnum, pos)
+                     JOIN pg_attribute a ON a.attrelid = x.indrelid AND a.attnum = k.attnum
+                     ORDER BY k.pos)
+        FROM pg_index x
+        JOIN pg_class t ON t.oid = x.indrelid
+        JOIN pg_class i ON i.oid = x.indexrelid
+        JOIN pg_am am ON am.oid = i.relam
+        JOIN pg_namespace n ON n.oid = t.relnamespace
+        WHERE n.nspname = 'public' AND NOT t.relispartition AND x.indpred IS NULL
+    """)).all()
+    return [{"table": table, "name": name, "method": method, "columns": list(cols), "where": None}
+            for table, name, method, cols in rows]
+
+
+def overlaps(candidate: dict, index: dict) -> bool:
+    """
+    True when `index` (existing or already accepted) makes `candidate`
+    redundant: same table, method and predicate, same leading column, and
+    one's key columns contain the other's (a prefix of it, or it plus more).
+    Such pairs serve the same scans; keeping both only doubles the writes.
+    """
+    if (candidate["table"], candidate["method"], candidate["where"]) != (index["table"], index["method"], index["where"]):
+        return False
+    a, b = set(candidate["columns"]), set(index["columns"])
+    return candidate["columns"][0] == index["columns"][0] and (a <= b or a >= b)
+
+
+def _columns_in(expr: str, known: dict) -> list:
+    """Column names of one table referenced in a plan expression, in order of appearance."""
+    found = []
+    for name in IDENT.findall(LITERALS.sub(" ", expr.lower())):
+        if name in known and name not in found:
+            found.append(name)
+    return found
+
+
+def _key_columns(keys: list, known: dict) -> list:
+    """Group/sort keys like 'd.item' or 'detail_items.date' -> plain column names, or [] if any is an expression."""
+    cols = []
+    for key in keys:
+        key = re.sub(r"^\w+\.(\w+)$", r"\1", key.strip())
+        if key not in known:
+            return []
+        cols.append(key)
+    return cols
+
+
+def analyze_plan(label: str, plan: dict, columns: dict, parents: dict) -> tuple:
+    """Return (findings, candidates) for one statement's plan."""
+    findings, candidates = [], []
+    for node, ancestors in walk(plan):
+        if node.get("Node Type") == "Sort" and node.get("Sort Space Type") == "Disk":
+            findings.append({
+                "query": label, "kind": "sort spill", "sort_key": node.get("Sort Key"),
+                "space_kb": node.get("Sort Space Used"),
+            })
+        if node.get("Node Type") != "Seq Scan":
+            continue
+
+        table = parents.get(node["Relation Name"], node["Relation Name"])
+        known = columns.get(table, {})
+        scan_filter = node.get("Filter", "")
+        findings.append({
+            "query": label, "kind": "seq scan", "table": table, "filter": scan_filter or None,
+            "rows": node.get("Actual Rows", node.get("Plan Rows")),
+        })
+        output = [c.split(".")[-1] for c in node.get("Output", []) if c.split(".")[-1] in known]
+
+        for col in _columns_in(scan_filter, known):
+            if known[col] in DATE_TYPES and re.search(rf"\b{col}\b\s*[<>]=?", scan_filter):
+                candidates.append({"table": table, "method": "brin", "columns": [col], "include": [], "where": None})
+            elif re.search(rf"\b{col}\b\s+IS NOT NULL", scan_filter, re.IGNORECASE):
+                include = [c for c in output if c != col][:MAX_INCLUDE]
+                candidates.append({"table": table, "method": "btree", "columns": [col],
+                                   "include": include, "where": f"{col} IS NOT NULL"})
+            elif re.search(rf"\b{col}\b\s*=\s", scan_filter):
+                candidates.append({"table": table, "method": "btree", "columns": [col], "include": [], "where": None})
+
+        # Covering index for GROUP BY aggregates fed directly by this scan.
+        for parent in ancestors[::-1]:
+            keys = parent.get("Group Key") or (parent.get("Sort Key") if parent.get("Node Type") == "Sort" else None)
+            if keys:
+                key_cols = _key_columns(keys, known)
+                include = [c for c in output if c not in key_cols]
+                # The scan skips NULL group keys (WHERE customer_id IS NOT NULL): so can the index.
+                where = next((f"{c} IS NOT NULL" for c in key_cols[:1]
+                              if re.search(rf"\b{c}\b\s+IS NOT NULL", scan_filter, re.IGNORECASE)), None)
+                if key_cols and len(include) <= MAX_INCLUDE:
+                    candidates.append({"table": table, "method": "btree", "columns": key_cols,
+                                       "include": include, "where": where})
+                break
+    return findings, candidates
+
+
+def merge_candidate(candidates: dict, candidate: dict) -> None:
+    """Add a candidate; one with the same key columns/predicate widens its INCLUDE list instead."""
+    key = (candidate["table"], candidate["method"], tuple(candidate["columns"]), candidate["where"])
+    if key not in candidates:
+        candidates[key] = candidate
+        return
+    include = candidates[key]["include"]
+    include += [c for c in candidate["include"] if c not in include]
+    del include[MAX_INCLUDE:]
+
+
+def index_name(candidate: dict) -> str:
+    parts = [candidate["table"], *candidate["columns"]]
+    if candidate["include"]:
+        parts.append("cov")
+    if candidate["where"]:
+        parts.append("partial")
+    if candidate["method"] != "btree":
+        parts.append(candidate["method"])
+    return ("idx_" + "_".join(parts))[:63]
+
+
+def index_ddl(candidate: dict) -> str:
+    ddl = (f"CREATE INDEX IF NOT EXISTS {index_name(candidate)} ON {candidate['table']} "
+           f"USING {candidate['method']} ({', '.join(candidate['columns'])})")
+    if candidate["include"]:
+        ddl += f" INCLUDE ({', '.join(candidate['include'])})"
+    if candidate["where"]:
+        ddl += f" WHERE {candidate['where']}"
+    return ddl
+
+
+# === Evaluation ===
+def plan_costs(conn, workload) -> dict:
+    return {label: explain(conn, stmt, binds)["Total Cost"] for label, stmt, binds in workload}
+
+
+def evaluate(engine, candidate: dict, workload, before: dict, accepted=()) -> dict:
+    """
+    Planner cost of every statement on the candidate's table with the index,
+    and every `accepted` one, in place (rolled back). `before` is each
+    statement's cost without the candidate.
+    """
+    affected = [(label, stmt, binds) for label, stmt, binds in workload
+                if re.search(rf"\b{candidate['table']}\b", stmt)]
+    with engine.connect() as conn:
+        try:
+            for index in [*accepted, candidate]:
+                conn.execute(text(index_ddl(index)))
+            after = plan_costs(conn, affected)
+        finally:
+            conn.rollback()
+    return {label: {"before": before[label], "after": cost} for label, cost in after.items()}
+
+
+def next_migration_path(slug: str) -> Path:
+    numbers = [int(p.name[:4]) for p in MIGRATIONS_DIR.glob("[0-9][0-9][0-9][0-9]_*.sql")]
+    return MIGRATIONS_DIR / f"{max(numbers, default=0) + 1:04d}_{slug}.sql"
+
+
+def write_migration(accepted: list, path: Path) -> None:
+    lines = [
+        f"-- {path}",
+        "-- Generated by db/index_advisor.py. Planner cost (before -> after) per affected query.",
+        "-- Idempotent; applied by db/load_data.py after the detail rows on every load.",
+        "-- <file>@location is the query scoped to one location (a page with a location selected),",
+        "-- <file>@week the query over the last week of its date range.",
+        "",
+    ]
+    for candidate in accepted:
+        for label, cost in sorted(candidate["costs"].items()):
+            if cost["after"] < cost["before"]:
+                lines.append(f"-- {label}: {cost['before']:.1f} -> {cost['after']:.1f}")
+        lines.append(index_ddl(candidate) + ";")
+        lines.append("")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("\n".join(lines))
+
+
+# === Main ===
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Propose indexes for the sql/ workload from EXPLAIN plans.")
+    parser.add_argument("--min-gain", type=float, default=0.1,
+                        help="Keep a candidate only if it cuts some query's planner cost by this fraction.")
+    parser.add_argument("--no-analyze", action="store_true",
+                        help="Plain EXPLAIN (no execution); sort spills cannot be detected then.")
+    parser.add_argument("--write", action="store_true", help="Write the accepted indexes to db/migrations/.")
+    parser.add_argument("--json", type=Path, default=None, help="Also write the full report as JSON.")
+    args = parser.parse_args()
+
+    engine = create_db_engine(statement_timeout_ms=0, pool_size=1, max_overflow=0,
+                              application_name="toastedbean-index-advisor")
+    with engine.connect() as conn:
+        columns = table_columns(conn)
+        parents = partition_parents(conn)
+        existing = existing_indexes(conn)
+        workload = load_workload(sample_params(conn), sample_location(conn))
+        baseline = plan_costs(conn, workload)
+
+        findings, candidates = [], {}
+        for label, stmt, binds in workload:
+            try:
+                plan = explain(conn, stmt, binds, analyze=not args.no_analyze)
+            finally:
+                conn.rollback()
+            found, proposed = analyze_plan(label, plan, columns, parents)
+            findings += found
+            for candidate in proposed:
+                merge_candidate(candidates, candidate)
+
+    # === Report: what the workload does today ===
+    for f in findings:
+        if f["kind"] == "seq scan":
+            print(f"🔎 {f['query']}: seq scan on {f['table']} ({f['rows']} rows) filter={f['filter']}")
+        else:
+            print(f"💾 {f['query']}: sort spilled {f['space_kb']} kB to disk on {f['sort_key']}")
+
+    # === Report: candidates, before/after ===
+    for key, candidate in list(candidates.items()):
+        covered = next((index for index in existing if overlaps(candidate, index)), None)
+        if covered:
+            print(f"➖ {index_ddl(candidate)}  (overlaps existing {covered['name']})")
+            del candidates[key]
+            continue
+        candidate["costs"] = evaluate(engine, candidate, workload, baseline)
+        candidate["gain"] = max((1 - c["after"] / c["before"] for c in candidate["costs"].values() if c["before"]),
+                                default=0.0)
+
+    # Greedy pick: BRIN first (a few pages and next to free to maintain, so it
+    # goes in whenever it helps), then by best standalone gain. Each candidate
+    # is re-planned with the indexes already kept in place and kept only if it
+    # still cuts some query's cost by --min-gain on top of them; one that
+    # overlaps a kept index (see overlaps()) is dropped without planning.
+    accepted, best_cost = [], dict(baseline)
+    for candidate in sorted(candidates.values(), key=lambda c: (c["method"] != "brin", -c["gain"])):
+        kept = next((index for index in accepted if overlaps(candidate, index)), None)
+        if kept:
+            print(f"➖ {index_ddl(candidate)}  (overlaps {index_name(kept)})")
+            continue
+        if accepted:
+            candidate["costs"] = evaluate(engine, candidate, workload, best_cost, accepted)
+        improves = [label for label, c in candidate["costs"].items()
+                    if c["before"] and c["after"] <= c["before"] * (1 - args.min_gain)]
+        verdict = "✅" if improves else "➖"
+        print(f"{verdict} {index_ddl(candidate)}  (standalone cost gain {candidate['gain']:.0%})")
+        for label, cost in sorted(candidate["costs"].items()):
+            if cost["after"] != cost["before"]:
+                print(f"      {label}: {cost['before']:.1f} -> {cost['after']:.1f}")
+        if improves:
+            accepted.append(candidate)
+            for label, cost in candidate["costs"].items():
+                best_cost[label] = cost["after"]
+
+    if args.json:
+        args.json.write_text(json.dumps({"findings": findings, "candidates": list(candidates.values())},
+                                        indent=2, default=str))
+    if args.write and accepted:
+        path = next_migration_path("index_advisor")
+        write_migration(accepted, path)
+        print(f"✅ Wrote {len(accepted)} indexes to {path}")
+    elif args.write:
+        print("✅ No candidate met --min-gain; nothing written.")
+
+
+if __name__ == "__main__":
+    main()
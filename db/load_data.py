@@ -1,8 +1,12 @@
 import os
+import re
+import glob
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import pandas as pd
-from sqlalchemy import create_engine, text
-from dotenv import load_dotenv
+from sqlalchemy import text, inspect
 
 # === Setup ===
 project_root = Path(__file__).resolve().parent.parent
@@ -10,168 +14,632 @@ os.chdir(project_root)
 
 import sys
 sys.path.append(str(project_root / "db"))
-from category_map import standardize_category
+sys.path.append(str(project_root / "app"))
+from normalize import normalize_categories, map_sales_types, parse_currency, parse_date_ranges
+from bulk_copy import copy_frame
+from modifiers import assign_line_numbers, load_modifiers
+from partitions import ensure_partitions
+from snapshots import SNAPSHOT_DIR, export_table, write_generation
+from connection import create_db_engine
+import traffic
 
-# === Load Env ===
-load_dotenv(dotenv_path=project_root / ".env")
-DB_URL = (
-    f"postgresql+psycopg2://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@"
-    f"{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}?sslmode=require"
-)
-engine = create_engine(DB_URL)
+# Bulk work: no statement_timeout, more sort/hash memory for the rollup refresh.
+LOADER_WORK_MEM = os.getenv("LOADER_WORK_MEM", "128MB")
 
 # === File Paths ===
 category_path = Path("data/cleaned/cleaned_category_sales.csv")
 summary_path = Path("data/cleaned/cleaned_sales_summary.csv")
 details_path = Path("data/cleaned/cleaned_detail_items.csv")
 schema_path = Path("db/schema.sql")
+rollup_path = Path("db/refresh_rollups.sql")
+migrations_dir = Path("db/migrations")
+
+# Detail rows this close to the previous high-water mark are re-checked
+# against the transaction_ids already loaded (late-arriving/edited sales).
+DEFAULT_LOOKBACK_DAYS = 3
 
-for path in [category_path, summary_path, details_path, schema_path]:
-    if not path.exists():
-        raise FileNotFoundError(f"Missing required file: {path}")
 
 # === Load & Clean Category Sales ===
-category = pd.read_csv(category_path)
-category.columns = category.columns.str.strip().str.lower()
-
-required = ["category", "start_date", "end_date", "revenue"]
-missing = [col for col in required if col not in category.columns]
-if missing:
-    raise ValueError(f"Expected columns in category CSV: {missing}")
-
-category["category"] = category["category"].apply(standardize_category)
-category["start_date"] = pd.to_datetime(category["start_date"])
-category["end_date"] = pd.to_datetime(category["end_date"])
-category["revenue"] = pd.to_numeric(
-    category["revenue"].replace(r"(US)?\$|,", "", regex=True),
-    errors="coerce"
-)
-
-# Log dropped rows
-before = len(category)
-category = category.dropna(subset=required)
-after = len(category)
-if before != after:
-    print(f"⚠️ Dropped {before - after} rows from category_sales due to missing or malformed data.")
-    print(category.head(3))
+def clean_category_sales(path: Path) -> pd.DataFrame:
+    return clean_category_frame(pd.read_csv(path))
+
+
+def clean_category_frame(category: pd.DataFrame) -> pd.DataFrame:
+    category = category.copy()
+    category.columns = category.columns.str.strip().str.lower()
+
+    required = ["category", "start_date", "end_date", "revenue"]
+    missing = [col for col in required if col not in category.columns]
+    if missing:
+        raise ValueError(f"Expected columns in category CSV: {missing}")
+
+    category["category"] = normalize_categories(category["category"])
+    category["start_date"] = pd.to_datetime(category["start_date"])
+    category["end_date"] = pd.to_datetime(category["end_date"])
+    category["revenue"] = parse_currency(category["revenue"])
+
+    # Log dropped rows
+    before = len(category)
+    category = category.dropna(subset=required)
+    after = len(category)
+    if before != after:
+        print(f"⚠️ Dropped {before - after} rows from category_sales due to missing or malformed data.")
+        print(category.head(3))
+    return category
+
 
 # === Load & Clean Sales Summary ===
-summary = pd.read_csv(summary_path)
-summary.columns = summary.columns.str.strip()
-summary.rename(columns={summary.columns[0]: "Sales"}, inplace=True)
-
-# Filter out irrelevant rows
-summary = summary[summary["Sales"].notna()]
-summary = summary[~summary["Sales"].str.lower().isin([
-    "total", "payments", "fees", "net total", "total collected",
-    "card", "cash", "other", "gift card", ""
-])]
-
-# Melt to long format
-date_cols = [col for col in summary.columns if "/" in col]
-summary = summary.melt(id_vars="Sales", value_vars=date_cols,
-                       var_name="date_range", value_name="amount")
-summary.rename(columns={"Sales": "sales_type"}, inplace=True)
-
-# Extract date ranges
-summary["start_date"] = pd.to_datetime(
-    summary["date_range"].str.extract(r"(\d{2}/\d{2}/\d{4})")[0], format="%m/%d/%Y"
-)
-summary["end_date"] = pd.to_datetime(
-    summary["date_range"].str.extract(r"-(\d{2}/\d{2}/\d{4})")[0], format="%m/%d/%Y"
-)
-
-# Clean amounts
-summary["amount"] = summary["amount"].astype(str).replace(r"[^\d\.-]", "", regex=True)
-summary["amount"] = pd.to_numeric(summary["amount"], errors="coerce")
-
-# Map verbose labels to enum
-def map_sales_type(label):
-    label = label.lower()
-    if "gross" in label or "net sales" in label:
-        return "Sale"
-    elif "tip" in label:
-        return "Tip"
-    elif "discount" in label or "comp" in label:
-        return "Discount"
-    elif "tax" in label:
-        return "Tax"
-    elif "refund" in label or "return" in label:
-        return "Refund"
-    else:
-        return "Other"
+def clean_sales_summary(path: Path) -> pd.DataFrame:
+    return clean_summary_frame(pd.read_csv(path))
 
-summary["sales_type"] = summary["sales_type"].apply(map_sales_type)
 
-# Enforce constraint: no negative amounts for Refunds/Discounts
-summary.loc[summary["sales_type"].isin(["Refund", "Discount"]), "amount"] = (
-    summary.loc[summary["sales_type"].isin(["Refund", "Discount"]), "amount"].abs()
-)
+def clean_summary_frame(summary: pd.DataFrame) -> pd.DataFrame:
+    summary = summary.copy()
+    summary.columns = summary.columns.str.strip()
+    summary.rename(columns={summary.columns[0]: "Sales"}, inplace=True)
+
+    # Filter out irrelevant rows
+    summary = summary[summary["Sales"].notna()]
+    summary = summary[~summary["Sales"].str.lower().isin([
+        "total", "payments", "fees", "net total", "total collected",
+        "card", "cash", "other", "gift card", ""
+    ])]
+
+    # Melt to long format
+    date_cols = [col for col in summary.columns if "/" in col]
+    summary = summary.melt(id_vars="Sales", value_vars=date_cols,
+                           var_name="date_range", value_name="amount")
+    summary.rename(columns={"Sales": "sales_type"}, inplace=True)
+
+    # Extract date ranges (parsed once per distinct column label)
+    summary[["start_date", "end_date"]] = parse_date_ranges(summary["date_range"])
+
+    # Clean amounts
+    summary["amount"] = parse_currency(summary["amount"])
+
+    summary["sales_type"] = map_sales_types(summary["sales_type"])
+
+    # Enforce constraint: no negative amounts for Refunds/Discounts
+    summary.loc[summary["sales_type"].isin(["Refund", "Discount"]), "amount"] = (
+        summary.loc[summary["sales_type"].isin(["Refund", "Discount"]), "amount"].abs()
+    )
+
+    return summary[["sales_type", "start_date", "end_date", "amount"]].dropna()
 
-summary = summary[["sales_type", "start_date", "end_date", "amount"]].dropna()
 
 # === Load & Clean Detail Items ===
-details = pd.read_csv(details_path)
-details.columns = (
-    details.columns.str.strip()
-    .str.lower()
-    .str.replace(" ", "_")
-    .str.replace("-", "_")
-)
-
-required = ["item", "date", "time", "gross_sales"]
-missing = [col for col in required if col not in details.columns]
-if missing:
-    raise ValueError(f"Missing required columns: {missing}")
-
-# Clean numeric columns
-for col in ["gross_sales", "discounts", "refunds"]:
-    if col in details.columns:
-        details[col] = pd.to_numeric(
-            details[col].replace(r"[\$,]", "", regex=True), errors="coerce"
-        )
-
-details.dropna(subset=required, inplace=True)
-details = details[details["gross_sales"] >= 0]
-if "discounts" in details.columns:
-    details = details[details["discounts"] >= 0]
-if "refunds" in details.columns:
-    details = details[details["refunds"] >= 0]
-
-# Standardize categories
-if "category" in details.columns:
-    details["category"] = details["category"].apply(standardize_category)
-
-# Final keep columns
-keep_cols = [
-    "transaction_id", "item", "category", "date", "time",
+DETAIL_REQUIRED = ["item", "date", "time", "gross_sales"]
+DETAIL_KEEP_COLS = [
+    "transaction_id", "location", "device_name", "item", "category", "date", "time",
     "gross_sales", "discounts", "refunds",
     "modifiers_applied", "channel", "card_brand",
     "employee_id", "employee_name", "customer_id", "customer_name"
 ]
-details = details[[c for c in keep_cols if c in details.columns]]
 
-# === Execute Schema (DROP + CREATE) ===
-with engine.begin() as conn:
-    conn.execute(text(schema_path.read_text()))
+# Rows without a Square "Location" (older single-truck exports) are assigned
+# to this location.
+DEFAULT_LOCATION = os.getenv("DEFAULT_LOCATION", "Toasted Bean Coffee")
+
+
+def normalize_columns(columns: pd.Index) -> pd.Index:
+    return (
+        columns.str.strip()
+        .str.lower()
+        .str.replace(" ", "_")
+        .str.replace("-", "_")
+    )
+
+
+def clean_detail_chunk(details: pd.DataFrame) -> pd.DataFrame:
+    """Validate and clean detail rows whose column names are already normalized."""
+    missing = [col for col in DETAIL_REQUIRED if col not in details.columns]
+    if missing:
+        raise ValueError(f"Missing required columns: {missing}")
+
+    # Clean numeric columns
+    for col in ["gross_sales", "discounts", "refunds"]:
+        if col in details.columns:
+            details[col] = parse_currency(details[col])
+
+    details = details.dropna(subset=DETAIL_REQUIRED)
+    details = details[details["gross_sales"] >= 0]
+    if "discounts" in details.columns:
+        details = details[details["discounts"] >= 0]
+    if "refunds" in details.columns:
+        details = details[details["refunds"] >= 0]
+
+    # Standardize categories
+    if "category" in details.columns:
+        details = details.assign(category=normalize_categories(details["category"]))
+
+    # Every row belongs to a location
+    if "location" in details.columns:
+        location = details["location"].str.strip()
+        details = details.assign(location=location.where(location != "").fillna(DEFAULT_LOCATION))
+    else:
+        details = details.assign(location=DEFAULT_LOCATION)
+
+    # Final keep columns
+    return details[[c for c in DETAIL_KEEP_COLS if c in details.columns]]
+
+
+def clean_detail_items(path: Path) -> pd.DataFrame:
+    details = pd.read_csv(path)
+    details.columns = normalize_columns(details.columns)
+    return clean_detail_chunk(details)
 
-# === Load Tables ===
-category.to_sql("category_sales", engine, if_exists="append", index=False)
-summary.to_sql("sales_summary", engine, if_exists="append", index=False)
-details.to_sql("detail_items", engine, if_exists="append", index=False)
 
-# === Load Customers ===
-if "customer_id" in details.columns and "customer_name" in details.columns:
-    customers = (
+def read_detail_chunks(path: Path, chunksize: int):
+    """
+    Stream a detail export in bounded chunks of cleaned rows.
+
+    Only the columns that end up in detail_items are parsed (usecols), all as
+    plain text, so peak memory depends on chunksize, not on the file size.
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    names = dict(zip(header, normalize_columns(header)))
+    usecols = [raw for raw, col in names.items() if col in DETAIL_KEEP_COLS]
+    dtypes = {raw: str for raw in usecols}
+
+    for chunk in pd.read_csv(path, usecols=usecols, dtype=dtypes, chunksize=chunksize):
+        chunk.columns = [names[c] for c in chunk.columns]
+        yield clean_detail_chunk(chunk)
+
+
+# === Multi-File Ingest ===
+# Square exports are date-range files that overlap. Every source argument may
+# be a file, a directory (all *.csv inside) or a glob; files are parsed and
+# cleaned in parallel worker processes, then merged newest file first: a
+# transaction is taken whole from the newest file that contains it, and a
+# period (category/sales type + date range) from the newest file that covers
+# it, so overlapping exports never double count.
+LOADER_WORKERS = int(os.getenv("LOADER_WORKERS", str(os.cpu_count() or 1)))
+WORKER_CHUNKSIZE = 250_000
+
+
+def expand_sources(pattern) -> list:
+    """Files matched by a path, directory or glob, oldest first (by mtime, then name)."""
+    path = Path(pattern)
+    if path.is_dir():
+        files = list(path.glob("*.csv"))
+    elif any(ch in str(pattern) for ch in "*?["):
+        files = [Path(p) for p in glob.glob(str(pattern))]
+    else:
+        files = [path]
+    missing = [f for f in files if not f.exists()]
+    if not files or missing:
+        raise FileNotFoundError(f"No export files for {pattern}: {missing or 'nothing matched'}")
+    return sorted(files, key=lambda f: (f.stat().st_mtime, f.name))
+
+
+def parse_detail_file(path: Path) -> tuple:
+    """Worker: (cleaned detail rows of one export with line numbers, seconds taken)."""
+    started = time.perf_counter()
+    details = pd.concat(read_detail_chunks(path, WORKER_CHUNKSIZE), ignore_index=True)
+    if "transaction_id" in details.columns:
+        details = assign_line_numbers(details)
+    return details, time.perf_counter() - started
+
+
+def merge_detail_files(frames: list) -> pd.DataFrame:
+    """
+    Merge per-file detail rows (oldest file first). Each transaction keeps the
+    lines of the newest file it appears in; (transaction_id, line_no) is unique.
+    """
+    merged = pd.concat([f.assign(_source=i) for i, f in enumerate(frames)], ignore_index=True)
+    if "transaction_id" not in merged.columns:
+        return merged.drop(columns="_source")
+    newest = merged.groupby("transaction_id", sort=False)["_source"].transform("max")
+    keep = merged["transaction_id"].isna() | (merged["_source"] == newest)
+    merged = merged[keep].drop_duplicates(subset=["transaction_id", "line_no"], keep="last")
+    return merged.drop(columns="_source").reset_index(drop=True)
+
+
+def merge_period_files(frames: list, key: str) -> pd.DataFrame:
+    """Merge per-file period rows (oldest file first); a newer file's period replaces any overlapping older one."""
+    kept = []
+    for frame in reversed(frames):
+        for prior in kept:
+            overlap = frame.merge(prior[[key, "start_date", "end_date"]], on=key, suffixes=("", "_kept"))
+            overlap = overlap[(overlap["start_date"] <= overlap["end_date_kept"])
+                              & (overlap["end_date"] >= overlap["start_date_kept"])]
+            covered = pd.MultiIndex.from_frame(overlap[[key, "start_date", "end_date"]])
+            frame = frame[~pd.MultiIndex.from_frame(frame[[key, "start_date", "end_date"]]).isin(covered)]
+        kept.append(frame)
+    return pd.concat(reversed(kept), ignore_index=True)
+
+
+def read_detail_files(files: list, workers: int, chunksize=None):
+    """
+    Cleaned detail chunks for the export files: a single file streams as
+    before; several are parsed on a process pool, merged and deduplicated, so
+    the wall time is about that of the slowest file.
+    """
+    if len(files) == 1:
+        return read_detail_chunks(files[0], chunksize) if chunksize else [clean_detail_items(files[0])]
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(files)))) as pool:
+        results = list(pool.map(parse_detail_file, files))
+    frames = [frame for frame, _ in results]
+    merged = merge_detail_files(frames)
+    slowest = max(seconds for _, seconds in results)
+    print(f"✅ Parsed {len(files)} detail exports in {time.perf_counter() - started:.2f}s "
+          f"(slowest file {slowest:.2f}s): {sum(len(f) for f in frames):,} rows -> {len(merged):,} after dedup.")
+    if not chunksize:
+        return [merged]
+    return (merged.iloc[i:i + chunksize] for i in range(0, len(merged), chunksize))
+
+
+def build_customers(details: pd.DataFrame) -> pd.DataFrame:
+    """One row per customer_id (latest spelling wins), junk names removed."""
+    return (
         details[["customer_id", "customer_name"]]
         .dropna()
         .drop_duplicates()
         .query("customer_name.str.strip() != '' and customer_name.str.strip() != ','", engine="python")
+        .drop_duplicates(subset="customer_id", keep="last")
+    )
+
+
+def row_timestamps(details: pd.DataFrame) -> pd.Series:
+    return pd.to_datetime(details["date"].astype(str) + " " + details["time"].astype(str))
+
+
+# === Incremental Upsert ===
+# Watermarks are kept per location ('<export>@<location>'), and every load
+# holds a transaction-scoped advisory lock per location it writes: loads of
+# the same location queue behind each other, loads of different locations
+# run side by side (they only take row locks on detail_items and the rollups).
+def watermark_source(location: str) -> str:
+    return f"{details_path.name}@{location}"
+
+
+def lock_locations(conn, locations, held: set) -> None:
+    """Take the load lock (released at commit) of every location not in `held` yet."""
+    for location in sorted(set(locations) - held):
+        conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": f"toastedbean-load:{location}"})
+        held.add(location)
+
+
+def loaded_locations(conn) -> list:
+    """Locations with a watermark, i.e. loaded at least once."""
+    prefix = watermark_source("")
+    sources = conn.execute(
+        text("SELECT source FROM load_watermarks WHERE starts_with(source, :prefix)"), {"prefix": prefix}
+    ).scalars()
+    return sorted(source[len(prefix):] for source in sources)
+
+
+def latest_by_location(details: pd.DataFrame) -> dict:
+    """{location: newest row timestamp} of a detail frame."""
+    return row_timestamps(details).groupby(details["location"]).max().to_dict()
+
+
+def update_watermarks(conn, latest: dict) -> None:
+    """Advance each location's high-water mark to the newest detail row loaded for it."""
+    for location, high_water in sorted(latest.items()):
+        conn.execute(text("""
+            INSERT INTO load_watermarks (source, high_water, updated_at)
+            VALUES (:source, :high_water, now())
+            ON CONFLICT (source) DO UPDATE
+            SET high_water = GREATEST(load_watermarks.high_water, EXCLUDED.high_water),
+                updated_at = now()
+        """), {"source": watermark_source(location), "high_water": high_water.to_pydatetime()})
+
+
+def seen_transactions(conn, lookback_days: int, locations=None):
+    """
+    Return ({location: since}, seen transaction_ids) for filtering an incremental load.
+
+    Rows of a location older than its `since` (high-water mark - lookback)
+    were loaded by an earlier run. Locations that were never loaded have no
+    entry; `locations` restricts the lookup to those locations.
+    """
+    prefix = watermark_source("")
+    marks = conn.execute(
+        text("SELECT source, high_water FROM load_watermarks WHERE starts_with(source, :prefix)"),
+        {"prefix": prefix},
+    ).all()
+    since = {
+        source[len(prefix):]: pd.Timestamp(high_water) - pd.Timedelta(days=lookback_days)
+        for source, high_water in marks
+        if locations is None or source[len(prefix):] in locations
+    }
+    if not since:
+        return {}, set()
+
+    earliest = min(since.values())
+    seen = pd.read_sql_query(
+        text("""
+            SELECT DISTINCT transaction_id FROM detail_items
+            WHERE location = ANY(CAST(:locations AS TEXT[])) AND date >= :since_date AND datetime >= :since
+        """),
+        conn, params={"locations": sorted(since), "since_date": earliest.date(), "since": earliest.to_pydatetime()},
+    )["transaction_id"]
+    return since, set(seen)
+
+
+def new_detail_rows(details: pd.DataFrame, since: dict, seen: set) -> pd.DataFrame:
+    """
+    Keep only detail rows that are not in the warehouse yet.
+
+    Rows inside their location's lookback window are kept only when their
+    transaction_id has not been seen, so re-exported days never double count;
+    rows of a location that was never loaded are all kept.
+    """
+    cutoff = details["location"].map(since)
+    recent = row_timestamps(details) >= cutoff
+    return details[cutoff.isna() | (recent & ~details["transaction_id"].isin(seen))]
+
+
+def upsert_periods(conn, df: pd.DataFrame, table: str, key: str, staging=False) -> None:
+    """
+    Replace the (key, start_date, end_date) periods present in df.
+
+    Existing rows for the same key whose period overlaps an incoming one are
+    removed first, so a month-to-date export supersedes the earlier partial month.
+    """
+    if df.empty:
+        return
+    periods = df[[key, "start_date", "end_date"]].drop_duplicates()
+    conn.execute(text(f"""
+        DELETE FROM {table} t
+        USING (
+            SELECT unnest(CAST(:keys AS TEXT[])) AS key,
+                   unnest(CAST(:starts AS DATE[])) AS start_date,
+                   unnest(CAST(:ends AS DATE[])) AS end_date
+        ) p
+        WHERE t.{key} = p.key
+          AND t.start_date <= p.end_date
+          AND t.end_date >= p.start_date
+    """), {
+        "keys": periods[key].tolist(),
+        "starts": periods["start_date"].dt.date.tolist(),
+        "ends": periods["end_date"].dt.date.tolist(),
+    })
+    copy_frame(conn, df, table, staging)
+
+
+def upsert_customers(conn, customers: pd.DataFrame) -> None:
+    """Insert or rename customers; row-level only, so concurrent location loads never collide."""
+    if customers.empty:
+        return
+    customers = customers.sort_values("customer_id")  # same lock order in every load
+    conn.execute(text("""
+        INSERT INTO customers (customer_id, customer_name)
+        SELECT unnest(CAST(:ids AS TEXT[])), unnest(CAST(:names AS TEXT[]))
+        ON CONFLICT (customer_id) DO UPDATE SET customer_name = EXCLUDED.customer_name
+    """), {"ids": customers["customer_id"].tolist(), "names": customers["customer_name"].tolist()})
+
+
+# === Stream Detail Rows ===
+def load_details(conn, chunks, incremental: bool, lookback_days: int, staging=False, location=None) -> dict:
+    """
+    COPY cleaned detail chunks into detail_items, reporting progress per chunk.
+
+    Args:
+        location: Load only this location's rows (others in the export are skipped).
+
+    Returns:
+        {'rows': int, 'dates': sorted list of dates loaded, 'locations': sorted
+         locations loaded, 'customers': DataFrame or None}
+    """
+    held = set()
+    if incremental:
+        lock_locations(conn, [location] if location else loaded_locations(conn), held)
+    since, seen = seen_transactions(conn, lookback_days, [location] if location else None) if incremental else ({}, set())
+
+    dates, customers, latest, total, modifier_rows = set(), [], {}, 0, 0
+    carry, modifier_ids = {}, {}
+    started = time.perf_counter()
+    for i, chunk in enumerate(chunks, start=1):
+        chunk_started = time.perf_counter()
+        if "transaction_id" in chunk.columns and "line_no" not in chunk.columns:
+            chunk = assign_line_numbers(chunk, carry)
+            carry.update((chunk.groupby("transaction_id", sort=False)["line_no"].max() + 1).to_dict())
+        if location is not None:
+            chunk = chunk[chunk["location"] == location]
+        if incremental:
+            lock_locations(conn, chunk["location"].unique(), held)  # locations new to the warehouse
+        if since:
+            chunk = new_detail_rows(chunk, since, seen)
+
+        # Incremental loads attach new months from a side transaction (no lock held on detail_items).
+        created = ensure_partitions(conn, chunk["date"], conn.engine if incremental else None) if not chunk.empty else []
+        if created:
+            print(f"   🗂️ Created partitions: {', '.join(created)}")
+        rows = copy_frame(conn, chunk, "detail_items", staging)
+        modifier_rows += load_modifiers(conn, chunk, modifier_ids, staging, conn.engine if incremental else None)
+        if rows:
+            for loc, chunk_latest in latest_by_location(chunk).items():
+                latest[loc] = max(latest.get(loc, chunk_latest), chunk_latest)
+            dates.update(pd.to_datetime(chunk["date"]).dt.date.unique())
+            if "customer_id" in chunk.columns and "customer_name" in chunk.columns:
+                customers.append(build_customers(chunk))
+        total += rows
+
+        elapsed = time.perf_counter() - chunk_started
+        print(f"   📦 chunk {i}: {rows:,} rows in {elapsed:.2f}s "
+              f"({rows / max(elapsed, 1e-9):,.0f} rows/s) | {total:,} total")
+
+    update_watermarks(conn, latest)
+    elapsed = time.perf_counter() - started
+    print(f"✅ Streamed {total:,} detail rows in {elapsed:.2f}s ({total / max(elapsed, 1e-9):,.0f} rows/s), "
+          f"{modifier_rows:,} modifier links.")
+    return {
+        "rows": total,
+        "dates": sorted(dates),
+        "locations": sorted(latest),
+        "customers": build_customers(pd.concat(customers)) if customers else None,
+    }
+
+
+# === Apply Migrations ===
+MIGRATION_INDEX = re.compile(r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+IF\s+NOT\s+EXISTS\s+(\w+)", re.IGNORECASE)
+
+
+def apply_migrations(conn) -> list:
+    """
+    Run every db/migrations/*.sql in filename order (the base detail_items
+    indexes, then those written by db/index_advisor.py). Migrations are idempotent (IF NOT EXISTS); after a
+    full reload they recreate what DROP removed. A file whose indexes all
+    exist already is skipped: CREATE INDEX locks its table against writes
+    even when IF NOT EXISTS turns it into a no-op, which would serialize
+    concurrent location loads.
+    """
+    existing = set(conn.execute(text("SELECT indexname FROM pg_indexes WHERE schemaname = current_schema()")).scalars())
+    applied = []
+    for path in sorted(migrations_dir.glob("*.sql")):
+        sql = path.read_text()
+        indexes = set(MIGRATION_INDEX.findall(sql))
+        if indexes and indexes <= existing:
+            continue
+        conn.execute(text(sql))
+        applied.append(path.name)
+    return applied
+
+
+# === Refresh Rollups ===
+def refresh_rollups(conn, dates, locations=None) -> int:
+    """Recompute the rollup rows for every date touched by this load (only `locations`, if given)."""
+    if dates:
+        conn.execute(text(rollup_path.read_text()), {"dates": list(dates), "locations": locations})
+    return len(dates)
+
+
+# === Bump Load Generation (invalidates dashboard caches) ===
+def bump_generation(conn) -> int:
+    return conn.execute(text("""
+        INSERT INTO load_metadata (id, load_generation, loaded_at)
+        VALUES (1, 1, now())
+        ON CONFLICT (id) DO UPDATE
+        SET load_generation = load_metadata.load_generation + 1,
+            loaded_at = now()
+        RETURNING load_generation
+    """)).scalar()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load cleaned Square exports into Postgres.")
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Upsert new periods and append unseen detail rows instead of DROP + full reload.",
+    )
+    parser.add_argument(
+        "--lookback-days", type=int, default=DEFAULT_LOOKBACK_DAYS,
+        help="Days before the high-water mark to re-check for unseen transactions.",
+    )
+    parser.add_argument(
+        "--staging", action="store_true",
+        help="COPY into per-session temp staging tables first, then swap rows into the live tables.",
+    )
+    parser.add_argument(
+        "--no-snapshots", action="store_true",
+        help="Skip writing the month-partitioned Parquet snapshots used by the offline backend.",
+    )
+    parser.add_argument(
+        "--chunksize", type=int, default=None,
+        help="Stream the detail export in chunks of this many rows (flat peak memory).",
+    )
+    parser.add_argument(
+        "--details", default=str(details_path),
+        help="Detail export(s): a CSV, a directory of CSVs or a glob; overlapping exports are deduplicated.",
+    )
+    parser.add_argument("--category", default=str(category_path), help="Category sales export(s), same forms.")
+    parser.add_argument("--summary", default=str(summary_path), help="Sales summary export(s), same forms.")
+    parser.add_argument(
+        "--workers", type=int, default=LOADER_WORKERS,
+        help="Processes parsing detail exports in parallel (LOADER_WORKERS).",
+    )
+    parser.add_argument(
+        "--traffic-window", type=int, default=traffic.WINDOW_WEEKS,
+        help="Same-weekday observations in each low-traffic baseline (TRAFFIC_WINDOW_WEEKS).",
+    )
+    parser.add_argument(
+        "--traffic-hourly", action="store_true", default=traffic.HOURLY,
+        help="Also keep per-hour traffic baselines and flags (TRAFFIC_HOURLY).",
+    )
+    parser.add_argument(
+        "--location", default=None,
+        help="Load only this location's detail rows (needs --incremental). Runs for different "
+             "locations can overlap; the store-wide category/summary exports are skipped.",
+    )
+    args = parser.parse_args()
+    if args.location and not args.incremental:
+        parser.error("--location needs --incremental (a full reload replaces every location)")
+
+    for path in [schema_path, rollup_path]:
+        if not path.exists():
+            raise FileNotFoundError(f"Missing required file: {path}")
+
+    if args.location:
+        category = summary = pd.DataFrame()
+    else:
+        category = merge_period_files([clean_category_sales(f) for f in expand_sources(args.category)], "category")
+        summary = merge_period_files([clean_sales_summary(f) for f in expand_sources(args.summary)], "sales_type")
+    chunks = read_detail_files(expand_sources(args.details), args.workers, args.chunksize)
+
+    engine = create_db_engine(
+        statement_timeout_ms=0, work_mem=LOADER_WORK_MEM, pool_size=2, max_overflow=0,
+        application_name="toastedbean-loader",
     )
-    customers.to_sql("customers", engine, if_exists="replace", index=False)
-    print(f"✅ Loaded: {len(customers)} cleaned customers.")
-else:
-    print("⚠️ Skipped customer table — missing required columns.")
+    incremental = args.incremental
+    if incremental and not inspect(engine).has_table("load_watermarks"):
+        if args.location:
+            raise SystemExit("[ERROR] No previous load found — run a full load of every location first.")
+        print("⚠️ No previous load found — running a full reload instead.")
+        incremental = False
+
+    # One transaction: readers keep seeing the previous load until commit.
+    with engine.begin() as conn:
+        if incremental:
+            upsert_periods(conn, category, "category_sales", "category", args.staging)
+            upsert_periods(conn, summary, "sales_summary", "sales_type", args.staging)
+        else:
+            conn.execute(text(schema_path.read_text()))
+            copy_frame(conn, category, "category_sales", args.staging)
+            copy_frame(conn, summary, "sales_summary", args.staging)
+
+        loaded = load_details(conn, chunks, incremental, args.lookback_days, args.staging, args.location)
+
+        # Indexes are built after the COPY, not maintained row by row during it.
+        applied = apply_migrations(conn)
+        if applied:
+            print(f"✅ Applied migrations: {', '.join(applied)}")
+
+        # === Load Customers ===
+        if loaded["customers"] is not None:
+            upsert_customers(conn, loaded["customers"])
+            print(f"✅ Loaded: {len(loaded['customers'])} cleaned customers.")
+        else:
+            print("⚠️ Skipped customer table — no customer rows in this load.")
+
+        refreshed = refresh_rollups(conn, loaded["dates"], loaded["locations"])
+        print(f"✅ Refreshed rollups for {refreshed} dates ({', '.join(loaded['locations']) or 'no locations'}).")
+
+        # === Traffic Baselines ===
+        scored = traffic.update_baselines(conn, loaded["dates"], args.traffic_window, args.traffic_hourly,
+                                          loaded["locations"])
+        print(f"✅ Scored {scored} days/hours against {args.traffic_window}-week traffic baselines.")
+
+        generation = bump_generation(conn)
+
+    # === Parquet Snapshots (after commit, so they never run ahead of the DB) ===
+    if not args.no_snapshots:
+        months = {d.strftime("%Y-%m") for d in loaded["dates"]} if incremental else None
+        with engine.connect() as conn:
+            detail_rows = export_table(conn, "detail_items", months)
+            if not args.location:
+                export_table(conn, "category_sales")
+                export_table(conn, "sales_summary")
+        write_generation(generation)
+        print(f"✅ Wrote Parquet snapshots to {SNAPSHOT_DIR} ({detail_rows} detail rows rewritten).")
+
+    # === Final Log ===
+    mode = "incremental" if incremental else "full"
+    print(f"✅ Loaded ({mode}): {len(category)} category rows | {len(summary)} summary rows | {loaded['rows']} detail rows (generation {generation}).")
+
 
-# === Final Log ===
-print(f"✅ Loaded: {len(category)} category rows | {len(summary)} summary rows | {len(details)} detail rows.")
+if __name__ == "__main__":
+    main()
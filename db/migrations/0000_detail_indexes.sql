@@ -0,0 +1,11 @@
+-- db/migrations/0000_detail_indexes.sql
+-- Base indexes on detail_items. Kept out of db/schema.sql so a full reload
+-- builds them once after the COPY instead of maintaining them row by row
+-- during it. Created on the parent, they cascade to every month partition,
+-- and partitions attached later get them too.
+-- Idempotent; applied by db/load_data.py after the detail rows on every load.
+
+CREATE INDEX IF NOT EXISTS idx_detail_items_datetime ON detail_items (datetime);
+CREATE INDEX IF NOT EXISTS idx_detail_items_location_date ON detail_items (location, date);
+CREATE INDEX IF NOT EXISTS idx_detail_items_transaction_id ON detail_items (transaction_id, line_no);
+CREATE INDEX IF NOT EXISTS idx_detail_items_employee_id ON detail_items (employee_id);
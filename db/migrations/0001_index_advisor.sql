@@ -0,0 +1,26 @@
+-- db/migrations/0001_index_advisor.sql
+-- Generated by db/index_advisor.py. Planner cost (before -> after) per affected query.
+-- Idempotent; applied by db/load_data.py after the detail rows on every load.
+-- <file>@location is the query scoped to one location (a page with a location selected),
+-- <file>@week the query over the last week of its date range.
+
+-- sql/employee_sales_summary.sql: 1635.6 -> 1040.1
+CREATE INDEX IF NOT EXISTS idx_detail_items_date_brin ON detail_items USING brin (date);
+
+-- sql/avg_items_per_order.sql: 14296.5 -> 12942.3
+-- sql/bundle_effect.sql: 8084.6 -> 6730.4
+-- sql/employee_sales_summary.sql: 1040.1 -> 52.6
+-- sql/employee_sales_summary.sql@location: 99.4 -> 99.3
+-- sql/zero_value_orders.sql: 9558.2 -> 7986.5
+CREATE INDEX IF NOT EXISTS idx_detail_items_date_transaction_id_employee_name_cov ON detail_items USING btree (date, transaction_id, employee_name) INCLUDE (gross_sales);
+
+-- sql/customer_frequency.sql: 8343.8 -> 2230.6
+-- sql/top_returning_customers.sql: 9037.9 -> 8968.9
+CREATE INDEX IF NOT EXISTS idx_detail_items_customer_id_date_cov_partial ON detail_items USING btree (customer_id, date) INCLUDE (gross_sales) WHERE customer_id IS NOT NULL;
+
+-- sql/avg_items_per_order.sql: 12942.3 -> 6550.7
+-- sql/bundle_effect.sql: 6730.4 -> 6132.9
+CREATE INDEX IF NOT EXISTS idx_detail_items_transaction_id_cov_partial ON detail_items USING btree (transaction_id) INCLUDE (gross_sales) WHERE transaction_id IS NOT NULL;
+
+-- sql/aov_by_payment_method.sql: 14505.1 -> 12609.4
+CREATE INDEX IF NOT EXISTS idx_detail_items_card_brand_cov_partial ON detail_items USING btree (card_brand) INCLUDE (transaction_id, gross_sales) WHERE card_brand IS NOT NULL;
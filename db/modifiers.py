@@ -0,0 +1,88 @@
+# db/modifiers.py
+
+import pandas as pd
+from sqlalchemy import text
+from bulk_copy import copy_frame
+
+# Square joins a line's modifiers with ", " in "Modifiers Applied"; they are
+# split once here into detail_item_modifiers (one row per line x modifier)
+# against a dictionary-encoded `modifiers` dimension.
+
+
+def assign_line_numbers(details: pd.DataFrame, carry: dict | None = None) -> pd.DataFrame:
+    """
+    Number the lines of each transaction 0, 1, 2, ... in file order.
+
+    Args:
+        details: Cleaned detail rows with a transaction_id column.
+        carry: Lines already numbered per transaction_id by all earlier chunks,
+            so a transaction split across chunk boundaries keeps counting.
+    """
+    line_no = details.groupby("transaction_id", sort=False).cumcount()
+    if carry:
+        line_no = line_no + details["transaction_id"].map(carry).fillna(0).astype(int)
+    return details.assign(line_no=line_no.astype("int16"))
+
+
+def explode_modifiers(details: pd.DataFrame) -> pd.DataFrame:
+    """Split modifiers_applied into (transaction_id, line_no, modifier_name) rows."""
+    lines = details.loc[details["modifiers_applied"].notna(), ["transaction_id", "line_no", "modifiers_applied"]]
+    exploded = (
+        lines.assign(modifier_name=lines["modifiers_applied"].str.split(","))
+        .explode("modifier_name")
+        .drop(columns="modifiers_applied")
+    )
+    exploded["modifier_name"] = exploded["modifier_name"].str.strip()
+    exploded = exploded[exploded["modifier_name"].fillna("") != ""]
+    return exploded.drop_duplicates()
+
+
+def load_modifiers(conn, details: pd.DataFrame, known_ids: dict, staging=False, engine=None) -> int:
+    """
+    Write the modifier rows for these detail lines.
+
+    New names are added to the `modifiers` dimension first; `known_ids`
+    (name -> modifier_id) is updated in place so later chunks skip the lookup.
+
+    Args:
+        engine: Add new names in their own short transaction on another
+            connection from this engine, committed before the links are
+            copied (incremental loads). Concurrent loads then never hold
+            uncommitted names until they commit, so they cannot deadlock
+            on each other's unique-index entries. None adds them in conn's
+            transaction, for a full reload whose tables nobody else can see.
+
+    Returns:
+        Number of detail_item_modifiers rows written.
+    """
+    if "modifiers_applied" not in details.columns:
+        return 0
+    exploded = explode_modifiers(details)
+    if exploded.empty:
+        return 0
+
+    new_names = sorted(set(exploded["modifier_name"]) - known_ids.keys())
+    if new_names:
+        if engine is None:
+            known_ids.update(_add_modifier_names(conn, new_names))
+        else:
+            # Committed even if the load later rolls back; an unused name is harmless.
+            with engine.begin() as tx:
+                known_ids.update(_add_modifier_names(tx, new_names))
+
+    links = exploded.assign(modifier_id=exploded["modifier_name"].map(known_ids))
+    return copy_frame(conn, links[["transaction_id", "line_no", "modifier_id"]], "detail_item_modifiers", staging)
+
+
+def _add_modifier_names(conn, names: list) -> dict:
+    """Insert the names that are missing (in sorted order) and return name -> modifier_id for all of them."""
+    conn.execute(text("""
+        INSERT INTO modifiers (modifier_name)
+        SELECT unnest(CAST(:names AS TEXT[]))
+        ON CONFLICT (modifier_name) DO NOTHING
+    """), {"names": names})
+    rows = conn.execute(
+        text("SELECT modifier_name, modifier_id FROM modifiers WHERE modifier_name = ANY(CAST(:names AS TEXT[]))"),
+        {"names": names},
+    )
+    return dict(rows.all())
@@ -0,0 +1,83 @@
+# db/normalize.py
+
+import numpy as np
+import pandas as pd
+from category_map import standardize_category
+
+# Vectorized cleaning kernels for the loader. Label mappings run once per
+# distinct value (pd.factorize) and are broadcast back through the codes, so
+# cost follows the number of distinct labels rather than the number of rows.
+
+CURRENCY_JUNK = r"[^\d.\-]"  # drops "US$", "$", thousands separators, spaces
+DATE_RANGE = r"(\d{2}/\d{2}/\d{4})(?:\s*[-–]\s*(\d{2}/\d{2}/\d{4}))?"
+
+
+def map_unique(series: pd.Series, func, na_value=None) -> pd.Series:
+    """
+    Apply a scalar function once per distinct value and broadcast the result.
+
+    Args:
+        series: Values to map.
+        func: Scalar mapping, e.g. standardize_category.
+        na_value: Result for missing values.
+    """
+    codes, uniques = pd.factorize(series)
+    mapped = np.array([func(u) for u in uniques] + [na_value], dtype=object)
+    return pd.Series(mapped[codes], index=series.index)  # code -1 (NaN) -> na_value
+
+
+def normalize_categories(series: pd.Series) -> pd.Series:
+    return map_unique(series, standardize_category, na_value=standardize_category(None))
+
+
+# Map verbose labels to enum
+def map_sales_type(label):
+    label = label.lower()
+    if "gross" in label or "net sales" in label:
+        return "Sale"
+    elif "tip" in label:
+        return "Tip"
+    elif "discount" in label or "comp" in label:
+        return "Discount"
+    elif "tax" in label:
+        return "Tax"
+    elif "refund" in label or "return" in label:
+        return "Refund"
+    else:
+        return "Other"
+
+
+def map_sales_types(series: pd.Series) -> pd.Series:
+    return map_unique(series, map_sales_type, na_value="Other")
+
+
+def parse_currency(series: pd.Series) -> pd.Series:
+    """
+    Parse amounts like 'US$2,240.06', '$4.50' or '-US$1.00' into floats.
+
+    Numeric input is passed through; strings are cleaned in one regex pass over
+    the distinct values only. Unparseable values become NaN.
+    """
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float)
+    codes, uniques = pd.factorize(series)
+    cleaned = pd.Series(uniques, dtype=str).str.replace(CURRENCY_JUNK, "", regex=True)
+    parsed = np.append(pd.to_numeric(cleaned, errors="coerce").to_numpy(dtype=float), np.nan)
+    return pd.Series(parsed[codes], index=series.index)
+
+
+def parse_date_ranges(series: pd.Series) -> pd.DataFrame:
+    """
+    Split 'MM/DD/YYYY-MM/DD/YYYY' labels into start_date/end_date columns.
+
+    Each distinct label is parsed once; a label without an end date gets NaT.
+    """
+    codes, uniques = pd.factorize(series)
+    parts = pd.Series(uniques, dtype=str).str.extract(DATE_RANGE)
+    starts = pd.to_datetime(parts[0], format="%m/%d/%Y").to_numpy()
+    ends = pd.to_datetime(parts[1], format="%m/%d/%Y").to_numpy()
+    nat = np.array(["NaT"], dtype="datetime64[ns]")
+    return pd.DataFrame({
+        "start_date": np.append(starts, nat)[codes],
+        "end_date": np.append(ends, nat)[codes],
+    }, index=series.index)
@@ -0,0 +1,157 @@
+# db/partitions.py
+
+import os
+import re
+import argparse
+from datetime import date
+from pathlib import Path
+import pandas as pd
+from sqlalchemy import text
+
+# detail_items is range-partitioned by month on `date` (db/schema.sql). The
+# loader creates the month partitions a chunk needs right before its COPY, so
+# there is no DEFAULT partition; time-bounded queries only touch the months
+# they ask for. An incremental load creates a missing month as a plain table
+# and ATTACHes it in its own short transaction on a second connection: ATTACH
+# PARTITION only takes a SHARE UPDATE EXCLUSIVE lock on detail_items, so
+# dashboard reads and other locations' loads keep running, whereas CREATE
+# TABLE ... PARTITION OF would hold ACCESS EXCLUSIVE until the load commits.
+# Loads starting the same new month serialize on an advisory lock. Old months
+# are detached with DETACH ... CONCURRENTLY (same lock level); rollups keep
+# their rows for detached months.
+PARENT = "detail_items"
+ARCHIVE_SCHEMA = "archive"
+PARTITION_NAME = re.compile(rf"^{PARENT}_(\d{{4}})_(\d{{2}})$")
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_{month.year:04d}_{month.month:02d}"
+
+
+def months_in(dates) -> list:
+    """First day of every distinct month in `dates` (anything pd.to_datetime accepts)."""
+    periods = pd.to_datetime(pd.Series(dates)).dropna().dt.to_period("M").unique()
+    return sorted(p.to_timestamp().date() for p in periods)
+
+
+def ensure_partitions(conn, dates, engine=None) -> list:
+    """
+    Create the month partitions of detail_items that `dates` fall into.
+
+    Args:
+        conn: An open SQLAlchemy Connection (the load transaction).
+        dates: Dates about to be loaded.
+        engine: Create and attach missing months in their own transaction on
+            another connection from this engine, committed before the COPY
+            (incremental loads). None creates them in conn's transaction,
+            for a full reload whose detail_items nobody else can see yet.
+
+    Returns:
+        Names of the partitions created by this call.
+    """
+    months = months_in(dates)
+    existing = {name for name, _ in list_partitions(conn)}
+    if all(partition_name(month) in existing for month in months):
+        return []
+    if engine is None:
+        return _create_partitions(conn, months, attach=False)
+    # Committed even if the load later rolls back; an empty partition is harmless.
+    with engine.begin() as tx:
+        return _create_partitions(tx, months, attach=True)
+
+
+def _create_partitions(conn, months: list, attach: bool) -> list:
+    conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('toastedbean-partitions'))"))
+    existing = {name for name, _ in list_partitions(conn)}  # another load may have created them meanwhile
+    created = []
+    for month in months:
+        name = partition_name(month)
+        if name in existing:
+            continue
+        bounds = f"FROM ('{month}') TO ('{(pd.Timestamp(month) + pd.offsets.MonthBegin(1)).date()}')"
+        if attach:
+            conn.execute(text(
+                f"CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING CONSTRAINTS)"
+            ))
+            conn.execute(text(f"ALTER TABLE {PARENT} ATTACH PARTITION {name} FOR VALUES {bounds}"))
+        else:
+            conn.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT} FOR VALUES {bounds}"))
+        created.append(name)
+    return created
+
+
+def list_partitions(conn) -> list:
+    """[(partition name, first day of its month)] currently attached to detail_items, oldest first."""
+    names = conn.execute(text("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = CAST(:parent AS regclass)
+    """), {"parent": PARENT}).scalars()
+    partitions = []
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def detach_before(engine, cutoff: date, drop=False) -> list:
+    """
+    Detach every month partition that ends on or before `cutoff`.
+
+    Detached months move to the `archive` schema (still queryable, no longer
+    scanned by the dashboard); with drop=True they are dropped together with
+    their modifier links instead.
+
+    Returns:
+        Names of the partitions detached.
+    """
+    # DETACH ... CONCURRENTLY cannot run inside a transaction block.
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        old = [name for name, month in list_partitions(conn)
+               if (pd.Timestamp(month) + pd.offsets.MonthBegin(1)).date() <= cutoff]
+        if old and not drop:
+            conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+        for name in old:
+            conn.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {name} CONCURRENTLY"))
+            if drop:
+                with engine.begin() as tx:
+                    tx.execute(text(f"""
+                        DELETE FROM detail_item_modifiers m
+                        USING {name} d
+                        WHERE m.transaction_id = d.transaction_id AND m.line_no = d.line_no
+                    """))
+                    tx.execute(text(f"DROP TABLE {name}"))
+            else:
+                conn.execute(text(f"ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA}"))
+            print(f"✅ Detached {name}{' (dropped)' if drop else f' -> {ARCHIVE_SCHEMA}.{name}'}")
+    return old
+
+
+if __name__ == "__main__":
+    project_root = Path(__file__).resolve().parent.parent
+    os.chdir(project_root)
+
+    import sys
+    sys.path.append(str(project_root / "app"))
+    from connection import create_db_engine
+
+    parser = argparse.ArgumentParser(description="List or detach monthly detail_items partitions.")
+    parser.add_argument("--detach-before", default=None, metavar="YYYY-MM",
+                        help="Detach every month before this one (moved to the archive schema).")
+    parser.add_argument("--drop", action="store_true", help="Drop detached months instead of archiving them.")
+    args = parser.parse_args()
+
+    # Two connections: --drop runs its DELETE + DROP in a transaction next to the autocommit one.
+    engine = create_db_engine(statement_timeout_ms=0, pool_size=2, max_overflow=0,
+                              application_name="toastedbean-partitions")
+    if args.detach_before:
+        cutoff = pd.Period(args.detach_before, freq="M").to_timestamp().date()
+        detached = detach_before(engine, cutoff, args.drop)
+        print(f"✅ Detached {len(detached)} partitions before {args.detach_before}.")
+    else:
+        with engine.connect() as conn:
+            for name, month in list_partitions(conn):
+                rows = conn.execute(text(f"SELECT COUNT(*) FROM {name}")).scalar()
+                print(f"   {month:%Y-%m}  {name}  {rows:,} rows")
@@ -0,0 +1,420 @@
+# db/pipeline.py
+
+import os
+import json
+import time
+import hashlib
+import inspect
+import argparse
+from pathlib import Path
+from collections import defaultdict
+import pandas as pd
+from sqlalchemy import text, inspect as sa_inspect
+
+# === Setup ===
+project_root = Path(__file__).resolve().parent.parent
+os.chdir(project_root)
+
+import sys
+sys.path.append(str(project_root / "db"))
+sys.path.append(str(project_root / "app"))
+import normalize
+import category_map
+import load_data as ld
+from bulk_copy import copy_frame
+from modifiers import assign_line_numbers, load_modifiers
+from partitions import ensure_partitions
+from snapshots import SNAPSHOT_DIR, export_table, write_generation
+from connection import create_db_engine
+import traffic
+
+# Raw Square exports -> warehouse in five stages:
+#   raw_parse  read each CSV as text; the detail export is split by month
+#   clean      the notebook's cleaning (currency, Cash card brand, time parts)
+#   normalize  the loader's cleaning (column names, categories, line numbers)
+#   load       replace the changed months / periods in Postgres
+#   rollup     refresh rollups + traffic baselines for the touched dates
+# Every parse/clean/normalize output is cached as Parquet under CACHE_DIR,
+# keyed by a hash of its input (file bytes, or the upstream key) and of the
+# source of the code that produced it, so a new export only recomputes the
+# months whose rows changed. Postgres remembers the key each partition was
+# loaded from (pipeline_loads); months missing from a new export are left as
+# they are. load + rollup run in one transaction, like db/load_data.py.
+CACHE_DIR = Path(os.getenv("PIPELINE_CACHE_DIR", "data/cache"))
+RAW_DIR = Path("data/raw")
+RAW_FILES = {
+    "detail_items": RAW_DIR / "detail_item_summary.csv",
+    "category_sales": RAW_DIR / "category_sales.csv",
+    "sales_summary": RAW_DIR / "salessummary2.csv",
+}
+CLEANED_FILES = {
+    "detail_items": ld.details_path,
+    "category_sales": ld.category_path,
+    "sales_summary": ld.summary_path,
+}
+STAGES = ["raw_parse", "clean", "normalize", "load", "rollup"]
+
+
+# === Hashing ===
+def digest(*parts) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else str(part).encode())
+        h.update(b"\0")
+    return h.hexdigest()[:20]
+
+
+def file_hash(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()[:20]
+
+
+def frame_hash(df: pd.DataFrame) -> str:
+    """Content hash of a frame: column names + every row, in order."""
+    rows = pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()
+    return digest(",".join(map(str, df.columns)), rows)
+
+
+def code_version(*objects) -> str:
+    """Hash of the source of the functions/modules a stage runs."""
+    return digest(*(inspect.getsource(obj) for obj in objects))
+
+
+# === Stage Cache ===
+class StageCache:
+    """Parquet files under CACHE_DIR/<stage>/<key>.parquet, with per-stage timing and hit counts."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.seconds = defaultdict(float)
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+        self.used = set()
+
+    def path(self, stage: str, key: str, suffix=".parquet") -> Path:
+        return self.root / stage / f"{key}{suffix}"
+
+    def get(self, stage: str, key: str):
+        path = self.path(stage, key)
+        self.used.add(path)
+        return pd.read_parquet(path) if path.exists() else None
+
+    def put(self, stage: str, key: str, df: pd.DataFrame) -> None:
+        path = self.path(stage, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        df.to_parquet(path, index=False)
+
+    def cached(self, stage: str, key: str, build) -> pd.DataFrame:
+        """Return the cached output for key, or build(), store and return it."""
+        started = time.perf_counter()
+        df = self.get(stage, key)
+        if df is None:
+            df = build()
+            self.put(stage, key, df)
+            self.misses[stage] += 1
+        else:
+            self.hits[stage] += 1
+        self.seconds[stage] += time.perf_counter() - started
+        return df
+
+    def prune(self) -> int:
+        """Delete cached files not used by this run."""
+        removed = 0
+        for path in self.root.glob("*/*"):
+            if path not in self.used:
+                path.unlink()
+                removed += 1
+        return removed
+
+    def report(self) -> None:
+        print("⏱️ Pipeline stages:")
+        for stage in STAGES:
+            total = self.hits[stage] + self.misses[stage]
+            print(f"   {stage:<10} {self.seconds[stage]:7.2f}s | {self.hits[stage]}/{total} cached")
+
+
+# === Stage: Raw Parse ===
+def parse_raw(path: Path) -> pd.DataFrame:
+    """Read a Square export with every column as text (values are parsed by later stages)."""
+    return pd.read_csv(path, dtype=str)
+
+
+def parse_detail_months(cache: StageCache, path: Path) -> dict:
+    """
+    Split the detail export into month partitions.
+
+    Returns:
+        {'YYYY-MM': partition key}; the manifest is cached per file hash, the
+        partitions per content hash, so an unchanged month keeps its key even
+        when other months of the file changed.
+    """
+    started = time.perf_counter()
+    key = digest(PARSE_VERSION, file_hash(path))
+    manifest = cache.path("raw_parse", key, ".json")
+    cache.used.add(manifest)
+    if manifest.exists():
+        months = json.loads(manifest.read_text())
+        cache.hits["raw_parse"] += 1
+    else:
+        raw = parse_raw(path)
+        raw.columns = raw.columns.str.strip()
+        month = raw["Date"].str[:7]
+        if month.isna().any():
+            print(f"⚠️ Dropped {int(month.isna().sum())} detail rows without a date.")
+        months = {}
+        for name, part in raw.groupby(month, sort=True):
+            part = part.reset_index(drop=True)
+            months[name] = frame_hash(part)
+            if not cache.path("raw_parse", months[name]).exists():
+                cache.put("raw_parse", months[name], part)
+        manifest.parent.mkdir(parents=True, exist_ok=True)
+        manifest.write_text(json.dumps(months))
+        cache.misses["raw_parse"] += 1
+    for part_key in months.values():
+        cache.used.add(cache.path("raw_parse", part_key))
+    cache.seconds["raw_parse"] += time.perf_counter() - started
+    return months
+
+
+# === Stage: Clean ===
+def clean_detail(raw: pd.DataFrame) -> pd.DataFrame:
+    """Notebook cleaning: money columns as floats, missing card brand = Cash, time parts."""
+    df = raw.copy()
+    for col in ["Gross Sales", "Discounts", "Refunds"]:
+        if col in df.columns:
+            df[col] = normalize.parse_currency(df[col])
+    if "Card Brand" in df.columns:
+        df["Card Brand"] = df["Card Brand"].fillna("Cash")
+    stamp = pd.to_datetime(df["Date"] + " " + df["Time"], errors="coerce")
+    df["Datetime"] = stamp
+    df["Hour"] = stamp.dt.hour
+    df["Weekday"] = stamp.dt.day_name()
+    df["Week"] = stamp.dt.to_period("W").astype(str)
+    df["Month"] = stamp.dt.to_period("M").astype(str)
+    df["AM/PM"] = (stamp.dt.hour < 12).map({True: "AM", False: "PM"})
+    return df
+
+
+def clean_category(raw: pd.DataFrame) -> pd.DataFrame:
+    """Wide category export (one column per period) -> category, start_date, end_date, revenue."""
+    df = raw.copy()
+    df.columns = df.columns.str.strip()
+    label = df.columns[0]
+    long = df.melt(id_vars=label, var_name="date_range", value_name="revenue")
+    long[["start_date", "end_date"]] = normalize.parse_date_ranges(long["date_range"])
+    long["revenue"] = normalize.parse_currency(long["revenue"])
+    return long.rename(columns={label: "category"})[["category", "start_date", "end_date", "revenue"]]
+
+
+def clean_summary(raw: pd.DataFrame) -> pd.DataFrame:
+    df = raw.copy()
+    df.columns = df.columns.str.strip()
+    return df
+
+
+# === Stage: Normalize ===
+def normalize_detail(clean: pd.DataFrame) -> pd.DataFrame:
+    """The loader's detail cleaning, plus line numbers (a transaction never spans months)."""
+    details = clean.copy()
+    details.columns = ld.normalize_columns(details.columns)
+    details = ld.clean_detail_chunk(details)
+    return assign_line_numbers(details).reset_index(drop=True)
+
+
+PARSE_VERSION = code_version(parse_raw, parse_detail_months)
+CLEAN_VERSION = code_version(clean_detail, clean_category, clean_summary, normalize)
+NORMALIZE_VERSION = code_version(
+    normalize_detail, ld.normalize_columns, ld.clean_detail_chunk, ld.clean_category_frame,
+    ld.clean_summary_frame, normalize, category_map, assign_line_numbers,
+)
+CLEANERS = {"detail_items": clean_detail, "category_sales": clean_category, "sales_summary": clean_summary}
+NORMALIZERS = {"detail_items": normalize_detail, "category_sales": ld.clean_category_frame,
+               "sales_summary": ld.clean_summary_frame}
+
+
+def build_partitions(cache: StageCache) -> tuple:
+    """
+    Run raw_parse -> clean -> normalize for every partition.
+
+    Returns:
+        ({partition: normalize key}, {partition: normalized frame},
+         {table: [clean frames]}) where partition is 'detail_items/YYYY-MM',
+        'category_sales' or 'sales_summary'.
+    """
+    keys, frames, cleaned = {}, {}, defaultdict(list)
+    sources = {}  # partition -> (table, raw key, loader of the raw frame)
+    for table, path in RAW_FILES.items():
+        if not path.exists():
+            raise FileNotFoundError(f"Missing raw export: {path}")
+        if table == "detail_items":
+            for month, part_key in parse_detail_months(cache, path).items():
+                sources[f"{table}/{month}"] = (table, part_key, lambda k=part_key: cache.get("raw_parse", k))
+        else:
+            raw_key = digest(PARSE_VERSION, file_hash(path))
+            raw = cache.cached("raw_parse", raw_key, lambda: parse_raw(path))
+            sources[table] = (table, raw_key, lambda raw=raw: raw)
+
+    for partition, (table, raw_key, load_raw) in sources.items():
+        clean_key = digest(CLEAN_VERSION, raw_key)
+        clean = cache.cached("clean", clean_key, lambda: CLEANERS[table](load_raw()))
+        cleaned[table].append(clean)
+        keys[partition] = digest(NORMALIZE_VERSION, clean_key)
+        frames[partition] = cache.cached("normalize", keys[partition], lambda: NORMALIZERS[table](clean))
+    return keys, frames, cleaned
+
+
+def export_cleaned(cleaned: dict) -> None:
+    """Write the clean stage's output to data/cleaned/ (the files db/load_data.py reads)."""
+    for table, parts in cleaned.items():
+        df = pd.concat(parts, ignore_index=True)
+        if table == "category_sales":
+            df = df.assign(start_date=df["start_date"].dt.date, end_date=df["end_date"].dt.date)
+        df.to_csv(CLEANED_FILES[table], index=False)
+        print(f"✅ Wrote {CLEANED_FILES[table]} ({len(df)} rows).")
+
+
+# === Stage: Load ===
+def month_bounds(month: str) -> tuple:
+    start = pd.Timestamp(f"{month}-01")
+    return start.date(), (start + pd.offsets.MonthBegin(1)).date()
+
+
+def replace_month(conn, month: str, details: pd.DataFrame, modifier_ids: dict, full: bool) -> int:
+    """Delete one month of detail rows (and their modifier links) and COPY its new rows."""
+    start, end = month_bounds(month)
+    conn.execute(text("""
+        DELETE FROM detail_item_modifiers m
+        USING detail_items d
+        WHERE d.date >= :start AND d.date < :end
+          AND m.transaction_id = d.transaction_id AND m.line_no = d.line_no
+    """), {"start": start, "end": end})
+    conn.execute(text("DELETE FROM detail_items WHERE date >= :start AND date < :end"), {"start": start, "end": end})
+    if details.empty:
+        return 0
+    created = ensure_partitions(conn, details["date"], None if full else conn.engine)
+    if created:
+        print(f"   🗂️ Created partitions: {', '.join(created)}")
+    rows = copy_frame(conn, details, "detail_items")
+    load_modifiers(conn, details, modifier_ids, engine=None if full else conn.engine)
+    return rows
+
+
+def load_partitions(conn, keys: dict, frames: dict, full: bool) -> list:
+    """
+    Load every partition whose normalize key differs from the one it was last
+    loaded from, and record the new keys.
+
+    Returns:
+        Changed partition names.
+    """
+    if full:
+        conn.execute(text(ld.schema_path.read_text()))
+        loaded = {}
+    else:
+        loaded = dict(conn.execute(text("SELECT partition_name, input_key FROM pipeline_loads")).all())
+    changed = [p for p, key in keys.items() if loaded.get(p) != key]
+
+    modifier_ids, customers, latest = {}, [], {}
+    for partition in changed:
+        df = frames[partition]
+        if partition.startswith("detail_items/"):
+            rows = replace_month(conn, partition.split("/", 1)[1], df, modifier_ids, full)
+            print(f"   📦 {partition}: {rows:,} rows")
+            if rows:
+                customers.append(ld.build_customers(df))
+                for location, month_latest in ld.latest_by_location(df).items():
+                    latest[location] = max(latest.get(location, month_latest), month_latest)
+        elif partition == "category_sales":
+            ld.upsert_periods(conn, df, "category_sales", "category")
+        elif partition == "sales_summary":
+            ld.upsert_periods(conn, df, "sales_summary", "sales_type")
+
+    if customers:
+        ld.upsert_customers(conn, ld.build_customers(pd.concat(customers)))
+    ld.update_watermarks(conn, latest)
+    applied = ld.apply_migrations(conn)
+    if full and applied:
+        print(f"✅ Applied migrations: {', '.join(applied)}")
+
+    if changed:
+        conn.execute(text("""
+            INSERT INTO pipeline_loads (partition_name, input_key, loaded_at)
+            SELECT unnest(CAST(:partitions AS TEXT[])), unnest(CAST(:keys AS TEXT[])), now()
+            ON CONFLICT (partition_name) DO UPDATE
+            SET input_key = EXCLUDED.input_key, loaded_at = EXCLUDED.loaded_at
+        """), {"partitions": changed, "keys": [keys[p] for p in changed]})
+    return changed
+
+
+# === Stage: Rollup ===
+def rollup_months(conn, months: list) -> int:
+    """Refresh rollups and traffic baselines for every day of the changed months."""
+    dates = sorted({
+        d.date()
+        for month in months
+        for d in pd.date_range(*month_bounds(month), inclusive="left")
+    })
+    ld.refresh_rollups(conn, dates)
+    traffic.update_baselines(conn, dates)
+    return len(dates)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Raw Square exports -> Postgres, recomputing only what changed.")
+    parser.add_argument("--full", action="store_true", help="Recreate the schema and load every partition.")
+    parser.add_argument("--no-load", action="store_true", help="Only run raw_parse, clean and normalize.")
+    parser.add_argument("--export-cleaned", action="store_true",
+                        help="Also write the clean stage's output to data/cleaned/ for db/load_data.py.")
+    parser.add_argument("--no-snapshots", action="store_true", help="Skip the Parquet snapshots.")
+    args = parser.parse_args()
+
+    cache = StageCache(CACHE_DIR)
+    keys, frames, cleaned = build_partitions(cache)
+    if args.export_cleaned:
+        export_cleaned(cleaned)
+
+    if not args.no_load:
+        engine = create_db_engine(
+            statement_timeout_ms=0, work_mem=ld.LOADER_WORK_MEM, pool_size=2, max_overflow=0,
+            application_name="toastedbean-pipeline",
+        )
+        full = args.full or not sa_inspect(engine).has_table("pipeline_loads")
+        with engine.begin() as conn:
+            started = time.perf_counter()
+            changed = load_partitions(conn, keys, frames, full)
+            cache.seconds["load"] += time.perf_counter() - started
+            cache.hits["load"] += len(keys) - len(changed)
+            cache.misses["load"] += len(changed)
+
+            months = [p.split("/", 1)[1] for p in changed if p.startswith("detail_items/")]
+            started = time.perf_counter()
+            if changed:
+                days = rollup_months(conn, months)
+                print(f"✅ Refreshed rollups for {days} days ({', '.join(months) or 'no detail months'}).")
+                generation = ld.bump_generation(conn)
+                cache.misses["rollup"] += 1
+            else:
+                cache.hits["rollup"] += 1
+            cache.seconds["rollup"] += time.perf_counter() - started
+
+        if changed and not args.no_snapshots:
+            with engine.connect() as conn:
+                export_table(conn, "detail_items", None if full else months)
+                export_table(conn, "category_sales")
+                export_table(conn, "sales_summary")
+            write_generation(generation)
+            print(f"✅ Wrote Parquet snapshots to {SNAPSHOT_DIR}.")
+        print(f"✅ Loaded {len(changed)} of {len(keys)} partitions"
+              f"{' (full)' if full else ''}: {', '.join(changed) or 'nothing changed'}.")
+
+    removed = cache.prune()
+    if removed:
+        print(f"🧹 Removed {removed} stale cache files from {CACHE_DIR}.")
+    cache.report()
+
+
+if __name__ == "__main__":
+    main()
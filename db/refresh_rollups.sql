@@ -0,0 +1,55 @@
+-- db/refresh_rollups.sql
+-- Rebuild the rollup rows for the dates in :dates from detail_items.
+-- :locations limits the refresh to those locations (NULL = every location),
+-- so loads of different locations never touch each other's rollup rows.
+-- Run by db/load_data.py inside the load transaction.
+
+DELETE FROM daily_rollup
+WHERE date = ANY(CAST(:dates AS DATE[]))
+  AND (CAST(:locations AS TEXT[]) IS NULL OR location = ANY(CAST(:locations AS TEXT[])));
+INSERT INTO daily_rollup (location, date, orders, items, revenue)
+SELECT
+  location,
+  date,
+  COUNT(DISTINCT transaction_id),
+  COUNT(*),
+  SUM(gross_sales)
+FROM detail_items
+WHERE date = ANY(CAST(:dates AS DATE[]))
+  AND (CAST(:locations AS TEXT[]) IS NULL OR location = ANY(CAST(:locations AS TEXT[])))
+GROUP BY location, date;
+
+DELETE FROM hourly_rollup
+WHERE date = ANY(CAST(:dates AS DATE[]))
+  AND (CAST(:locations AS TEXT[]) IS NULL OR location = ANY(CAST(:locations AS TEXT[])));
+INSERT INTO hourly_rollup (location, date, hour, orders, items, revenue)
+SELECT
+  location,
+  date,
+  EXTRACT(HOUR FROM time)::INT,
+  COUNT(DISTINCT transaction_id),
+  COUNT(*),
+  SUM(gross_sales)
+FROM detail_items
+WHERE date = ANY(CAST(:dates AS DATE[])) AND time IS NOT NULL
+  AND (CAST(:locations AS TEXT[]) IS NULL OR location = ANY(CAST(:locations AS TEXT[])))
+GROUP BY location, date, EXTRACT(HOUR FROM time)::INT;
+
+DELETE FROM item_daily_rollup
+WHERE date = ANY(CAST(:dates AS DATE[]))
+  AND (CAST(:locations AS TEXT[]) IS NULL OR location = ANY(CAST(:locations AS TEXT[])));
+INSERT INTO item_daily_rollup (location, date, item, category, channel, card_brand, orders, items, revenue)
+SELECT
+  location,
+  date,
+  item,
+  category,
+  channel,
+  card_brand,
+  COUNT(DISTINCT transaction_id),
+  COUNT(*),
+  SUM(gross_sales)
+FROM detail_items
+WHERE date = ANY(CAST(:dates AS DATE[]))
+  AND (CAST(:locations AS TEXT[]) IS NULL OR location = ANY(CAST(:locations AS TEXT[])))
+GROUP BY location, date, item, category, channel, card_brand;
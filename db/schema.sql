@@ -6,9 +6,53 @@
 -- 🔁 Drop tables to avoid duplicate definitions
 DROP TABLE IF EXISTS sales_summary;
 DROP TABLE IF EXISTS category_sales;
+DROP TABLE IF EXISTS detail_item_modifiers;
+DROP TABLE IF EXISTS modifiers;
 DROP TABLE IF EXISTS detail_items;
 DROP TABLE IF EXISTS employees;
 DROP TABLE IF EXISTS customers;
+DROP TABLE IF EXISTS load_watermarks;
+DROP TABLE IF EXISTS pipeline_loads;
+DROP TABLE IF EXISTS daily_rollup;
+DROP TABLE IF EXISTS hourly_rollup;
+DROP TABLE IF EXISTS item_daily_rollup;
+DROP TABLE IF EXISTS traffic_baselines;
+DROP TABLE IF EXISTS traffic_flags;
+
+-- ========================
+-- 🔢 load_metadata
+-- Single-row load counter (never dropped). The dashboard caches query results
+-- per load_generation, so every finished load must bump it.
+-- ========================
+CREATE TABLE IF NOT EXISTS load_metadata (
+    id               SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    load_generation  BIGINT NOT NULL DEFAULT 0,
+    loaded_at        TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+COMMENT ON TABLE load_metadata IS 'Load generation counter used by the dashboard to invalidate cached results.';
+
+-- ========================
+-- 🌊 load_watermarks
+-- Newest detail row loaded per source file, used by incremental loads
+-- ========================
+CREATE TABLE load_watermarks (
+    source      TEXT PRIMARY KEY,
+    high_water  TIMESTAMP NOT NULL,
+    updated_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+COMMENT ON TABLE load_watermarks IS 'High-water mark (max detail datetime) per source export for incremental loads.';
+
+-- ========================
+-- 🧬 pipeline_loads
+-- Stage-cache key each partition was last loaded from by db/pipeline.py
+-- ('detail_items/YYYY-MM', 'category_sales', 'sales_summary')
+-- ========================
+CREATE TABLE pipeline_loads (
+    partition_name  TEXT PRIMARY KEY,
+    input_key       TEXT NOT NULL,
+    loaded_at       TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+COMMENT ON TABLE pipeline_loads IS 'Normalized-input hash per loaded partition, so unchanged months are skipped.';
 
 -- ========================
 -- 🧑‍💼 employees
@@ -56,9 +100,17 @@ COMMENT ON TABLE category_sales IS 'Monthly revenue totals for each item categor
 -- ========================
 -- 🧾 detail_items
 -- Item-level POS detail w/ employee tracking
+-- Range-partitioned by month on date: detail_items_YYYY_MM partitions are
+-- created by the loader before each COPY (db/partitions.py), and old months
+-- can be detached without blocking the current one. Every month partition
+-- carries a (location, date) index, so one truck's queries never read
+-- another truck's rows.
 -- ========================
 CREATE TABLE detail_items (
     transaction_id     TEXT NOT NULL,
+    line_no            SMALLINT NOT NULL DEFAULT 0,
+    location           TEXT NOT NULL,
+    device_name        TEXT,
     item               TEXT NOT NULL,
     category           TEXT,
     date               DATE NOT NULL,
@@ -74,20 +126,105 @@ CREATE TABLE detail_items (
     customer_id        TEXT,
     customer_name      TEXT,
     datetime           TIMESTAMP GENERATED ALWAYS AS ((date + time)::timestamp) STORED
-);
+) PARTITION BY RANGE (date);
 COMMENT ON TABLE detail_items IS 'Granular transaction-level sales data with employee and customer context.';
 
 -- ========================
--- OPTIONAL: Normalized modifier table for advanced analytics
+-- 🧮 Rollups
+-- Pre-aggregated detail_items, refreshed by the loader for the dates it
+-- touched (db/refresh_rollups.sql). Dashboard queries read these instead of
+-- re-grouping every line item. orders = distinct transactions, items = lines.
+-- Keys lead with location: a location's rows are one index range, and all
+-- locations together are a SUM over it.
+-- ========================
+CREATE TABLE daily_rollup (
+    location  TEXT NOT NULL,
+    date      DATE NOT NULL,
+    orders    INTEGER NOT NULL,
+    items     INTEGER NOT NULL,
+    revenue   NUMERIC(12,2) NOT NULL,
+    PRIMARY KEY (location, date)
+);
+COMMENT ON TABLE daily_rollup IS 'Per-location, per-day order, item and revenue totals from detail_items.';
+
+CREATE TABLE hourly_rollup (
+    location  TEXT NOT NULL,
+    date      DATE NOT NULL,
+    hour      SMALLINT NOT NULL,
+    orders    INTEGER NOT NULL,
+    items     INTEGER NOT NULL,
+    revenue   NUMERIC(12,2) NOT NULL,
+    PRIMARY KEY (location, date, hour)
+);
+COMMENT ON TABLE hourly_rollup IS 'Per-location, per-day, per-hour order, item and revenue totals from detail_items.';
+
+CREATE TABLE item_daily_rollup (
+    location    TEXT NOT NULL,
+    date        DATE NOT NULL,
+    item        TEXT NOT NULL,
+    category    TEXT,
+    channel     TEXT,
+    card_brand  TEXT,
+    orders      INTEGER NOT NULL,
+    items       INTEGER NOT NULL,
+    revenue     NUMERIC(12,2) NOT NULL
+);
+COMMENT ON TABLE item_daily_rollup IS 'Per-location, per-day totals by item, category, channel and card brand.';
+CREATE INDEX idx_item_daily_rollup_date ON item_daily_rollup(date);
+CREATE INDEX idx_item_daily_rollup_location_date ON item_daily_rollup(location, date);
+
+-- ========================
+-- 🚦 traffic_baselines + traffic_flags
+-- Rolling per-location, per-weekday (and optionally per-hour) order baselines,
+-- updated by the loader after the rollup refresh (app/traffic.py). hour = -1 is the
+-- whole day; weekday 0 = Monday. A flag row holds the baseline *before* that
+-- day; sql/low_traffic_alerts.sql turns z into traffic_flag at read time.
 -- ========================
--- CREATE TABLE modifiers (
---     modifier_id SERIAL PRIMARY KEY,
---     transaction_id TEXT,
---     modifier_name TEXT NOT NULL
--- );
--- COMMENT ON TABLE modifiers IS 'Exploded view of modifiers from orders for lift and attach rate analysis.';
+CREATE TABLE traffic_baselines (
+    location     TEXT NOT NULL,
+    weekday      SMALLINT NOT NULL,
+    hour         SMALLINT NOT NULL,
+    n            INTEGER NOT NULL,
+    mean         DOUBLE PRECISION NOT NULL,
+    m2           DOUBLE PRECISION NOT NULL,
+    last_date    DATE NOT NULL,
+    window_size  INTEGER NOT NULL,
+    PRIMARY KEY (location, weekday, hour)
+);
+COMMENT ON TABLE traffic_baselines IS 'Welford state (count, mean, M2) of the last window_size observations per location, weekday and hour.';
+
+CREATE TABLE traffic_flags (
+    location  TEXT NOT NULL,
+    date      DATE NOT NULL,
+    hour      SMALLINT NOT NULL,
+    orders    INTEGER NOT NULL,
+    n         INTEGER NOT NULL,
+    mean      DOUBLE PRECISION,
+    std       DOUBLE PRECISION,
+    z         DOUBLE PRECISION,
+    PRIMARY KEY (location, date, hour)
+);
+COMMENT ON TABLE traffic_flags IS 'Orders per location and day (and hour) scored against the rolling same-weekday baseline.';
+
+-- ========================
+-- ✨ modifiers + detail_item_modifiers
+-- Normalized modifiers, exploded from detail_items.modifiers_applied at ingest
+-- (db/modifiers.py). A line is identified by (transaction_id, line_no).
+-- ========================
+CREATE TABLE modifiers (
+    modifier_id    SERIAL PRIMARY KEY,
+    modifier_name  TEXT NOT NULL UNIQUE
+);
+COMMENT ON TABLE modifiers IS 'Dictionary of distinct modifier names.';
+
+CREATE TABLE detail_item_modifiers (
+    transaction_id  TEXT NOT NULL,
+    line_no         SMALLINT NOT NULL,
+    modifier_id     INTEGER NOT NULL REFERENCES modifiers(modifier_id),
+    PRIMARY KEY (transaction_id, line_no, modifier_id)
+);
+COMMENT ON TABLE detail_item_modifiers IS 'Exploded view of modifiers from orders for lift and attach rate analysis.';
+CREATE INDEX idx_detail_item_modifiers_modifier_id ON detail_item_modifiers(modifier_id);
 
--- Indexes for fast query time
-CREATE INDEX idx_detail_items_datetime ON detail_items(datetime);
-CREATE INDEX idx_detail_items_transaction_id ON detail_items(transaction_id);
-CREATE INDEX idx_detail_items_employee_id ON detail_items(employee_id);
+-- detail_items indexes are built after the first COPY, not maintained row by
+-- row during it: db/migrations/0000_detail_indexes.sql.
@@ -0,0 +1,102 @@
+# db/snapshots.py
+
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import text
+
+SNAPSHOT_DIR = Path(os.getenv("SNAPSHOT_DIR", "data/snapshots"))
+
+# table -> column whose month becomes the `month=YYYY-MM` partition
+SNAPSHOT_TABLES = {
+    "detail_items": "date",
+    "category_sales": "start_date",
+    "sales_summary": "start_date",
+}
+# A full export writes a new `.<table>.<version>` directory next to the old
+# one and then atomically repoints the `<table>` symlink at it (os.replace),
+# so readers see either the previous snapshot or the complete new one, and
+# concurrent exports never delete each other's output. Month rewrites go
+# through the symlink into the current version, one atomic file per month.
+
+
+def _write_partition(df: pd.DataFrame, table: str, month: str, root: Path | None = None) -> None:
+    """Write one month atomically: temp file first (one per process), then rename over the old one."""
+    part_dir = (root or SNAPSHOT_DIR / table) / f"month={month}"
+    part_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = part_dir / f"part-0.parquet.{os.getpid()}.tmp"
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path, compression="zstd")
+    os.replace(tmp_path, part_dir / "part-0.parquet")
+
+
+def export_table(conn, table: str, months=None) -> int:
+    """
+    Export a warehouse table to month-partitioned Parquet.
+
+    Args:
+        conn: An open SQLAlchemy Connection.
+        table: One of SNAPSHOT_TABLES.
+        months: Iterable of 'YYYY-MM' strings to rewrite; None rewrites the
+            whole table (stale months are removed).
+
+    Returns:
+        Number of rows written.
+    """
+    date_col = SNAPSHOT_TABLES[table]
+    root = None
+    if months is None:
+        df = pd.read_sql_query(text(f"SELECT * FROM {table}"), conn)
+        root = SNAPSHOT_DIR / f".{table}.{time.time_ns()}.{os.getpid()}"
+        root.mkdir(parents=True)
+    else:
+        months = sorted(set(months))
+        if not months:
+            return 0
+        df = pd.read_sql_query(
+            text(f"SELECT * FROM {table} WHERE TO_CHAR({date_col}, 'YYYY-MM') = ANY(CAST(:months AS TEXT[]))"),
+            conn, params={"months": months},
+        )
+
+    if not df.empty:
+        df[date_col] = pd.to_datetime(df[date_col])
+        if "location" in df.columns:
+            df = df.sort_values("location", kind="stable")  # row-group stats prune by location
+        for month, part in df.groupby(df[date_col].dt.strftime("%Y-%m"), sort=True):
+            _write_partition(part.reset_index(drop=True), table, month, root)
+    if root is not None:
+        _swap_in(table, root)
+    return len(df)
+
+
+def _swap_in(table: str, version: Path) -> None:
+    """Point SNAPSHOT_DIR/<table> at a fully written version directory and remove the one it replaced."""
+    current = SNAPSHOT_DIR / table
+    previous = None
+    if current.is_symlink():
+        previous = SNAPSHOT_DIR / os.readlink(current)
+    elif current.exists():  # plain directory from before versioned snapshots
+        previous = SNAPSHOT_DIR / f".{table}.{time.time_ns()}.{os.getpid()}.old"
+        os.replace(current, previous)
+    link = SNAPSHOT_DIR / f".{table}.{os.getpid()}.link.tmp"
+    link.unlink(missing_ok=True)
+    os.symlink(version.name, link)
+    os.replace(link, current)
+    if previous is not None and previous != version:
+        shutil.rmtree(previous, ignore_errors=True)
+
+
+def write_generation(generation: int) -> None:
+    """Record which load generation the snapshots reflect (read by the dashboard)."""
+    SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = SNAPSHOT_DIR / f"_generation.json.{os.getpid()}.tmp"
+    tmp_path.write_text(json.dumps({
+        "generation": generation,
+        "written_at": datetime.now(timezone.utc).isoformat(),
+    }))
+    os.replace(tmp_path, SNAPSHOT_DIR / "_generation.json")
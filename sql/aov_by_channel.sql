@@ -1,9 +1,10 @@
 -- sql/aov_by_channel.sql
 SELECT
   channel,
-  COUNT(*) AS order_count,
-  ROUND(SUM(gross_sales), 2) AS total_revenue,
-  ROUND(SUM(gross_sales)/COUNT(*), 2) AS avg_order_value
-FROM detail_items
+  SUM(items)::BIGINT AS order_count,
+  ROUND(SUM(revenue), 2) AS total_revenue,
+  ROUND(SUM(revenue) / SUM(items), 2) AS avg_order_value
+FROM item_daily_rollup
+WHERE (CAST(:location AS TEXT) IS NULL OR location = :location)
 GROUP BY channel
 ORDER BY total_revenue DESC;
@@ -10,5 +10,6 @@ SELECT
   END AS avg_order_value
 FROM detail_items
 WHERE card_brand IS NOT NULL AND gross_sales > 0
+  AND (CAST(:location AS TEXT) IS NULL OR location = :location)
 GROUP BY payment_method
 ORDER BY avg_order_value DESC;
@@ -4,6 +4,7 @@ WITH orders AS (
   SELECT transaction_id, gross_sales
   FROM detail_items
   WHERE transaction_id IS NOT NULL
+    AND (CAST(:location AS TEXT) IS NULL OR location = :location)
 )
 SELECT
   COUNT(DISTINCT transaction_id) AS total_orders,
@@ -7,6 +7,7 @@ WITH orders AS (
     SUM(gross_sales) AS total_revenue
   FROM detail_items
   WHERE transaction_id IS NOT NULL
+    AND (CAST(:location AS TEXT) IS NULL OR location = :location)
   GROUP BY transaction_id
 )
 SELECT
@@ -7,6 +7,7 @@ SELECT
   ROUND(SUM(gross_sales), 2) AS total_spent
 FROM detail_items
 WHERE customer_id IS NOT NULL
+  AND (CAST(:location AS TEXT) IS NULL OR location = :location)
 GROUP BY customer_id
 ORDER BY total_visits DESC
 LIMIT 20;
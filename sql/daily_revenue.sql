@@ -1,7 +1,8 @@
 -- sql/daily_revenue.sql
 SELECT
   date,
-  ROUND(SUM(gross_sales), 2) AS total_revenue
-FROM detail_items
+  ROUND(SUM(revenue), 2) AS total_revenue
+FROM daily_rollup
+WHERE (CAST(:location AS TEXT) IS NULL OR location = :location)
 GROUP BY date
 ORDER BY date;
@@ -1,4 +1,5 @@
 SELECT
+    transaction_id,
     item,
     category,
     date,
@@ -10,4 +11,5 @@ SELECT
     channel,
     card_brand,
     (date + time)::timestamp AS datetime  -- <-- include this!
-FROM detail_items;
+FROM detail_items
+WHERE (CAST(:location AS TEXT) IS NULL OR location = :location);
@@ -0,0 +1,24 @@
+-- sql/detail_items_filtered.sql
+-- detail_items.sql with the page filters pushed down into Postgres.
+-- :start_date is inclusive, :end_date exclusive. A NULL list (or :location) means "no filter".
+
+SELECT
+    item,
+    category,
+    date,
+    time,
+    gross_sales,
+    discounts,
+    refunds,
+    modifiers_applied,
+    channel,
+    card_brand,
+    (date + time)::timestamp AS datetime
+FROM detail_items
+WHERE
+    (CAST(:location AS TEXT) IS NULL OR location = :location)
+    AND date >= :start_date
+    AND date < :end_date
+    AND (CAST(:channels AS TEXT[]) IS NULL OR channel = ANY(CAST(:channels AS TEXT[])))
+    AND (CAST(:categories AS TEXT[]) IS NULL OR category = ANY(CAST(:categories AS TEXT[])))
+    AND (CAST(:card_brands AS TEXT[]) IS NULL OR card_brand = ANY(CAST(:card_brands AS TEXT[])));
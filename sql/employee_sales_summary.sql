@@ -9,6 +9,7 @@ SELECT
 FROM detail_items
 WHERE
   employee_name IS NOT NULL
-  AND date >= date_trunc('month', CURRENT_DATE)
+  AND (CAST(:location AS TEXT) IS NULL OR location = :location)
+  AND date >= date_trunc('month', CURRENT_DATE)::date  -- date vs date: prunes to the current month
 GROUP BY employee_name
 ORDER BY total_revenue DESC;
@@ -0,0 +1,42 @@
+-- sql/filter_options.sql
+-- Distinct values for the sidebar selectors, one (dimension, value) row each.
+-- Read from the rollups so the cost scales with days, not line items.
+-- Every dimension but 'location' is limited to :location (NULL = all).
+
+SELECT 'location' AS dimension, location AS value
+FROM (SELECT DISTINCT location FROM daily_rollup) l
+
+UNION ALL
+SELECT 'month', TO_CHAR(month, 'YYYY-MM')
+FROM (
+  SELECT DISTINCT DATE_TRUNC('month', date) AS month FROM daily_rollup
+  WHERE (CAST(:location AS TEXT) IS NULL OR location = :location)
+) m
+
+UNION ALL
+SELECT 'date', TO_CHAR(date, 'YYYY-MM-DD')
+FROM (
+  SELECT DISTINCT date FROM daily_rollup
+  WHERE (CAST(:location AS TEXT) IS NULL OR location = :location)
+) d
+
+UNION ALL
+SELECT 'channel', channel
+FROM (
+  SELECT DISTINCT channel FROM item_daily_rollup
+  WHERE channel IS NOT NULL AND (CAST(:location AS TEXT) IS NULL OR location = :location)
+) c
+
+UNION ALL
+SELECT 'category', category
+FROM (
+  SELECT DISTINCT category FROM item_daily_rollup
+  WHERE category IS NOT NULL AND (CAST(:location AS TEXT) IS NULL OR location = :location)
+) k
+
+UNION ALL
+SELECT 'card_brand', card_brand
+FROM (
+  SELECT DISTINCT card_brand FROM item_daily_rollup
+  WHERE card_brand IS NOT NULL AND (CAST(:location AS TEXT) IS NULL OR location = :location)
+) b;
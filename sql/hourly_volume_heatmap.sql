@@ -1,11 +1,11 @@
 -- app/sql/hourly_volume_heatmap.sql
 
 SELECT
-  TO_CHAR(date, 'Day') AS weekday,
-  EXTRACT(HOUR FROM datetime)::INT AS hour,
-  COUNT(DISTINCT transaction_id) AS orders,
-  ROUND(SUM(gross_sales), 2) AS revenue
-FROM detail_items
-WHERE datetime IS NOT NULL
+  TO_CHAR(date, 'FMDay') AS weekday,
+  hour::INT AS hour,
+  SUM(orders)::BIGINT AS orders,
+  ROUND(SUM(revenue), 2) AS revenue
+FROM hourly_rollup
+WHERE (CAST(:location AS TEXT) IS NULL OR location = :location)
 GROUP BY weekday, hour
 ORDER BY weekday, hour;
@@ -1,29 +1,26 @@
 -- app/sql/low_traffic_alerts.sql
+-- Days scored by the loader against their location's rolling same-weekday
+-- baseline (traffic_flags, app/traffic.py). Reads only the last :days days
+-- of :location (NULL = every location, one row per location and day).
 
-WITH daily AS (
-  SELECT
-    date,
-    COUNT(DISTINCT transaction_id) AS orders,
-    ROUND(SUM(gross_sales), 2) AS total_sales
-  FROM detail_items
-  WHERE date IS NOT NULL
-  GROUP BY date
-),
-avg_stats AS (
-  SELECT
-    ROUND(AVG(orders), 2) AS avg_orders,
-    ROUND(STDDEV(orders), 2) AS std_orders
-  FROM daily
-)
 SELECT
-  d.date,
-  d.orders,
-  d.total_sales,
-  a.avg_orders,
-  a.std_orders,
+  f.location,
+  f.date,
+  f.orders,
+  ROUND(r.revenue, 2) AS total_sales,
+  ROUND(CAST(f.mean AS NUMERIC), 2) AS avg_orders,
+  ROUND(CAST(f.std AS NUMERIC), 2) AS std_orders,
+  ROUND(CAST(f.z AS NUMERIC), 2) AS z_score,
   CASE
-    WHEN d.orders < a.avg_orders - a.std_orders THEN '🔻 BELOW AVERAGE'
+    WHEN f.n >= :min_history AND f.z < -:z_threshold THEN '🔻 BELOW AVERAGE'
     ELSE 'Normal'
   END AS traffic_flag
-FROM daily d, avg_stats a
-ORDER BY d.date DESC;
+FROM traffic_flags f
+JOIN daily_rollup r ON r.location = f.location AND r.date = f.date
+WHERE f.hour = -1
+  AND (CAST(:location AS TEXT) IS NULL OR f.location = :location)
+  AND f.date > (
+    SELECT MAX(date) FROM traffic_flags
+    WHERE hour = -1 AND (CAST(:location AS TEXT) IS NULL OR location = :location)
+  ) - CAST(:days AS INTEGER)
+ORDER BY f.date DESC, f.location;
@@ -1,18 +1,56 @@
 -- app/sql/modifier_lift.sql
+-- Revenue lift per modifier: a line's value with the modifier vs. the same
+-- item's lines without it, weighted by how often each item carries it.
+-- Reads the normalized detail_item_modifiers table (indexed join, no string
+-- parsing); per-item totals come from item_daily_rollup. :location limits
+-- both sides to one location (NULL = all).
 
-WITH exploded AS (
+WITH item_totals AS (
+  SELECT item, SUM(items) AS n_all, SUM(revenue) AS sum_all
+  FROM item_daily_rollup
+  WHERE (CAST(:location AS TEXT) IS NULL OR location = :location)
+  GROUP BY item
+),
+with_modifier AS (
   SELECT
-    unnest(string_to_array(modifiers_applied, ', ')) AS modifier,
-    gross_sales
-  FROM detail_items
-  WHERE modifiers_applied IS NOT NULL
+    dm.modifier_id,
+    d.item,
+    COUNT(*) AS n_with,
+    SUM(d.gross_sales) AS sum_with
+  FROM detail_item_modifiers dm
+  JOIN detail_items d USING (transaction_id, line_no)
+  WHERE (CAST(:location AS TEXT) IS NULL OR d.location = :location)
+  GROUP BY dm.modifier_id, d.item
+),
+per_item AS (
+  SELECT
+    w.modifier_id,
+    w.n_with,
+    w.sum_with,
+    (t.sum_all - w.sum_with) / NULLIF(t.n_all - w.n_with, 0) AS avg_without
+  FROM with_modifier w
+  JOIN item_totals t USING (item)
+),
+lift AS (
+  SELECT
+    modifier_id,
+    SUM(n_with) AS usage_count,
+    SUM(sum_with) AS total_sales,
+    SUM(n_with) FILTER (WHERE avg_without IS NOT NULL) AS compared,
+    SUM(sum_with) FILTER (WHERE avg_without IS NOT NULL) AS compared_with,
+    SUM(n_with * avg_without) AS compared_without
+  FROM per_item
+  GROUP BY modifier_id
 )
 SELECT
-  modifier,
-  COUNT(*) AS usage_count,
-  ROUND(AVG(gross_sales), 2) AS avg_gross_sales,
-  ROUND(SUM(gross_sales), 2) AS total_sales
-FROM exploded
-GROUP BY modifier
-ORDER BY avg_gross_sales DESC
+  m.modifier_name AS modifier,
+  l.usage_count::BIGINT AS usage_count,
+  ROUND(l.total_sales / l.usage_count, 2) AS avg_gross_sales,
+  ROUND(l.total_sales, 2) AS total_sales,
+  ROUND(l.compared_without / NULLIF(l.compared, 0), 2) AS avg_without_modifier,
+  ROUND((l.compared_with - l.compared_without) / NULLIF(l.compared, 0), 2) AS avg_lift,
+  ROUND((l.compared_with - l.compared_without) / NULLIF(l.compared_without, 0) * 100, 1) AS lift_pct
+FROM lift l
+JOIN modifiers m USING (modifier_id)
+ORDER BY avg_lift DESC NULLS LAST, usage_count DESC
 LIMIT 15;
@@ -3,9 +3,10 @@
 
 SELECT
   DATE_TRUNC('month', date) AS month,
-  COUNT(DISTINCT transaction_id) AS total_orders,
-  ROUND(SUM(gross_sales), 2) AS total_revenue,
-  ROUND(AVG(gross_sales), 2) AS avg_order_value
-FROM detail_items
+  SUM(orders)::BIGINT AS total_orders,
+  ROUND(SUM(revenue), 2) AS total_revenue,
+  ROUND(SUM(revenue) / NULLIF(SUM(items), 0), 2) AS avg_order_value
+FROM daily_rollup
+WHERE (CAST(:location AS TEXT) IS NULL OR location = :location)
 GROUP BY month
 ORDER BY month DESC;
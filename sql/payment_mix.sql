@@ -1,8 +1,9 @@
 -- sql/payment_mix.sql
 SELECT
   COALESCE(card_brand, 'Cash') AS payment_method,
-  COUNT(*) AS transaction_count,
-  ROUND(SUM(gross_sales), 2) AS total_revenue
-FROM detail_items
+  SUM(items)::BIGINT AS transaction_count,
+  ROUND(SUM(revenue), 2) AS total_revenue
+FROM item_daily_rollup
+WHERE (CAST(:location AS TEXT) IS NULL OR location = :location)
 GROUP BY payment_method
 ORDER BY total_revenue DESC;
@@ -1,8 +1,9 @@
 -- sql/peak_hours.sql
 SELECT
-  EXTRACT(HOUR FROM time)::int AS hour,
-  ROUND(SUM(gross_sales), 2) AS total_revenue,
-  COUNT(*) AS order_count
-FROM detail_items
+  hour::INT AS hour,
+  ROUND(SUM(revenue), 2) AS total_revenue,
+  SUM(items)::BIGINT AS order_count
+FROM hourly_rollup
+WHERE (CAST(:location AS TEXT) IS NULL OR location = :location)
 GROUP BY hour
 ORDER BY hour;
@@ -2,10 +2,10 @@
 
 SELECT
   TO_CHAR(date, 'Day') AS weekday,
-  COUNT(*) AS orders,
-  ROUND(SUM(gross_sales), 2) AS total_revenue,
-  ROUND(AVG(gross_sales), 2) AS avg_order_value
-FROM detail_items
-WHERE date IS NOT NULL
+  SUM(items)::BIGINT AS orders,
+  ROUND(SUM(revenue), 2) AS total_revenue,
+  ROUND(SUM(revenue) / NULLIF(SUM(items), 0), 2) AS avg_order_value
+FROM daily_rollup
+WHERE (CAST(:location AS TEXT) IS NULL OR location = :location)
 GROUP BY weekday
 ORDER BY total_revenue DESC;
@@ -3,10 +3,12 @@
 SELECT
     item,
     category,
-    COUNT(*) AS sale_count,
-    ROUND(SUM(gross_sales), 2) AS total_gross_sales
+    SUM(items)::BIGINT AS sale_count,
+    ROUND(SUM(revenue), 2) AS total_gross_sales
 FROM
-    detail_items
+    item_daily_rollup
+WHERE
+    (CAST(:location AS TEXT) IS NULL OR location = :location)
 GROUP BY
     item, category
 ORDER BY
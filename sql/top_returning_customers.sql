@@ -8,6 +8,7 @@ SELECT
 FROM detail_items
 WHERE
   customer_id IS NOT NULL
+  AND (CAST(:location AS TEXT) IS NULL OR location = :location)
   AND TRIM(customer_name) IS NOT NULL
   AND TRIM(customer_name) NOT IN ('', ',')
 GROUP BY customer_id, customer_name
@@ -8,6 +8,7 @@ SELECT
   COUNT(*) AS item_count,
   ROUND(SUM(gross_sales), 2) AS total_revenue
 FROM detail_items
+WHERE (CAST(:location AS TEXT) IS NULL OR location = :location)
 GROUP BY transaction_id, employee_name, date
 HAVING SUM(gross_sales) < 0.01
 ORDER BY date DESC;
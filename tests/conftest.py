@@ -0,0 +1,12 @@
+# tests/conftest.py
+
+import os
+import sys
+from pathlib import Path
+
+# The app and loader modules import each other by flat name (they run as
+# scripts from their own folder), so put both folders on the path. Tests run
+# offline against in-memory frames, so keep utils from dialing Postgres.
+ROOT = Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT / "app"), str(ROOT / "db")]
+os.environ.setdefault("DASHBOARD_BACKEND", "parquet")
@@ -0,0 +1,74 @@
+# tests/test_basket.py
+
+import collections
+import itertools
+import numpy as np
+import pandas as pd
+from basket import Basket, PAIR_SHIFT
+
+
+def synthetic_frame(seed: int = 0, n_txn: int = 400, days: int = 5, items: int = 30) -> pd.DataFrame:
+    """Small baskets over a few days, plus one 25-item basket on the second day."""
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(1, 6, n_txn)
+    txn = np.repeat(np.arange(n_txn), sizes)
+    df = pd.DataFrame({
+        "transaction_id": [f"t{t}" for t in txn],
+        "item": [f"item{i}" for i in rng.zipf(1.5, len(txn)) % items],
+        "date": pd.Timestamp("2025-01-01") + pd.to_timedelta(np.repeat(rng.integers(0, days, n_txn), sizes), "D"),
+    })
+    big = pd.DataFrame({"transaction_id": "BIG", "item": [f"item{i}" for i in range(25)], "date": pd.Timestamp("2025-01-02")})
+    return categorize(pd.concat([df, big], ignore_index=True))
+
+
+def categorize(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    for col in ["transaction_id", "item"]:
+        df[col] = df[col].astype(str).astype("category")
+    df["gross_cents"] = np.int32(100)
+    return df
+
+
+def brute_force(df: pd.DataFrame) -> tuple:
+    """Baskets, item counts and pair counts via itertools.combinations."""
+    baskets = df.groupby(["date", "transaction_id"], observed=True)["item"].agg(lambda s: sorted(set(s)))
+    items, pairs = collections.Counter(), collections.Counter()
+    for basket in baskets:
+        items.update(basket)
+        pairs.update(itertools.combinations(basket, 2))
+    return len(baskets), dict(items), dict(pairs)
+
+
+def counted(basket: Basket) -> tuple:
+    items = {basket.labels[i]: int(c) for i, c in enumerate(basket.item_counts) if c}
+    pairs = {}
+    for code, count in zip(basket.pair_codes, basket.pair_counts):
+        a, b = basket.labels[code >> PAIR_SHIFT], basket.labels[code & ((1 << PAIR_SHIFT) - 1)]
+        pairs[tuple(sorted((a, b)))] = int(count)
+    return basket.baskets, items, pairs
+
+
+def test_offset_pairs_match_combinations():
+    df = synthetic_frame()
+    basket = Basket()
+    basket.update(df)
+    baskets, items, pairs = brute_force(df)
+    assert counted(basket) == (baskets, items, {tuple(sorted(k)): v for k, v in pairs.items()})
+    assert pairs[("item0", "item24")] >= 1  # the large basket's outermost pair
+
+
+def test_item_swap_recounts_the_date():
+    df = synthetic_frame()
+    basket = Basket()
+    basket.update(df)
+
+    # Same lines and revenue on that date, but one line now sells a different item.
+    swapped = df.copy()
+    swapped["item"] = swapped["item"].astype(str)
+    row = swapped.index[swapped["date"] == pd.Timestamp("2025-01-03")][0]
+    swapped.loc[row, "item"] = "item99"
+    swapped = categorize(swapped)
+    assert basket.update(swapped) == 1
+
+    baskets, items, pairs = brute_force(swapped)
+    assert counted(basket) == (baskets, items, {tuple(sorted(k)): v for k, v in pairs.items()})
@@ -0,0 +1,58 @@
+# tests/test_cube.py
+
+import pandas as pd
+from cube import Cube
+from utils import prepare_detail_frame
+
+
+def detail_frame() -> pd.DataFrame:
+    raw = pd.DataFrame({
+        "transaction_id": ["t1", "t1", "t2", "t3", "t4"],
+        "item": ["Latte", "Scone", "Latte", "Mocha", "Scone"],
+        "category": ["Coffee", "Food", "Coffee", "Coffee", "Food"],
+        "channel": ["Toasted Bean Coffee", "Toasted Bean Coffee", "Truck Two", "Toasted Bean Coffee", "Truck Two"],
+        "card_brand": ["Visa", "Visa", "Amex", "Visa", "Amex"],
+        "gross_sales": [4.5, 3.0, 4.5, 5.0, 3.0],
+        "datetime": ["2024-03-01 08:10", "2024-03-01 08:10", "2024-03-01 09:30", "2024-03-02 10:00", "2024-03-02 11:15"],
+    })
+    return prepare_detail_frame(raw)
+
+
+def test_channel_change_reaggregates_only_that_date():
+    df = detail_frame()
+    cube = Cube()
+    assert cube.update(df) == 2
+    assert cube.update(df) == 0
+
+    # Same lines, same revenue, different channel on 2024-03-02 only.
+    moved = df.copy()
+    moved["channel"] = moved["channel"].astype(str)
+    moved.loc[moved["date"] == "2024-03-02", "channel"] = "Truck Three"
+    moved["channel"] = moved["channel"].astype("category")
+    assert cube.update(moved) == 1
+
+    day = [pd.Timestamp("2024-03-02")]
+    assert cube.total("revenue", date=day, channel=["Truck Three"]) == 800
+    assert cube.total("revenue", date=day, channel=["Toasted Bean Coffee", "Truck Two"]) == 0
+    assert cube.total("orders", date=day, channel=["Truck Three"]) == 2
+    assert cube.total("revenue", date=[pd.Timestamp("2024-03-01")], channel=["Truck Two"]) == 450
+
+
+def test_matches_fresh_build_after_incremental_changes():
+    df = detail_frame()
+    cube = Cube()
+    cube.update(df)
+
+    changed = df.copy()
+    for col in ["card_brand", "category"]:
+        changed[col] = changed[col].astype(str)
+    changed.loc[0, "card_brand"] = "Discover"
+    changed.loc[3, "category"] = "Tea"
+    cube.update(changed)
+
+    fresh = Cube()
+    fresh.update(changed)
+    for measure in ["revenue", "items", "orders", "item_revenue", "item_lines"]:
+        for brand in ["Visa", "Amex", "Discover"]:
+            assert cube.total(measure, card_brand=[brand]) == fresh.total(measure, card_brand=[brand])
+    assert cube.total("revenue", category=["Tea"]) == 500
@@ -0,0 +1,60 @@
+# tests/test_load_merge.py
+
+import os
+import pandas as pd
+import load_data as ld
+
+DETAIL_HEADER = "Date,Time,Transaction ID,Item,Category,Gross Sales,Location\n"
+
+
+def write(path, text: str, mtime: int):
+    path.write_text(text)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_newest_detail_file_wins_for_a_shared_transaction(tmp_path):
+    # March export, then a re-export covering the last day where t2 was edited.
+    write(tmp_path / "b_march.csv", DETAIL_HEADER + (
+        "2025-03-30,08:00:00,t1,Latte,Coffee,$4.50,Truck Two\n"
+        "2025-03-31,09:00:00,t2,Latte,Coffee,$4.50,Truck Two\n"
+        "2025-03-31,09:00:00,t2,Scone,Food,$3.00,Truck Two\n"
+    ), mtime=1_700_000_000)
+    write(tmp_path / "a_reexport.csv", DETAIL_HEADER + (
+        "2025-03-31,09:00:00,t2,Mocha,Coffee,$5.00,Truck Two\n"
+        "2025-04-01,10:00:00,t3,Drip,Coffee,$2.50,Truck Two\n"
+    ), mtime=1_700_000_100)
+
+    files = ld.expand_sources(tmp_path)
+    assert [f.name for f in files] == ["b_march.csv", "a_reexport.csv"]  # by mtime, not name
+    merged = ld.merge_detail_files([ld.parse_detail_file(f)[0] for f in files])
+
+    assert sorted(merged["transaction_id"].unique()) == ["t1", "t2", "t3"]
+    t2 = merged[merged["transaction_id"] == "t2"]
+    assert t2["item"].tolist() == ["Mocha"]  # whole transaction from the newer file, no stale lines
+    assert t2["gross_sales"].tolist() == [5.0]
+    assert not merged.duplicated(["transaction_id", "line_no"]).any()
+
+
+def test_overlapping_period_files_are_deduplicated(tmp_path):
+    header = "category,start_date,end_date,revenue\n"
+    older = write(tmp_path / "older.csv", header + (
+        "Coffee,2025-03-01,2025-03-31,$100.00\n"
+        "Coffee,2025-04-01,2025-04-30,$90.00\n"
+        "Food,2025-03-01,2025-03-31,$40.00\n"
+    ), mtime=1_700_000_000)
+    newer = write(tmp_path / "newer.csv", header + (
+        "Coffee,2025-03-15,2025-04-14,$120.00\n"
+        "Food,2025-04-01,2025-04-30,$35.00\n"
+    ), mtime=1_700_000_100)
+
+    frames = [ld.clean_category_sales(f) for f in ld.expand_sources(tmp_path)]
+    assert [len(f) for f in frames] == [3, 2] and ld.expand_sources(tmp_path) == [older, newer]
+    merged = ld.merge_period_files(frames, "category").sort_values(["category", "start_date"])
+
+    rows = list(merged[["category", "start_date", "revenue"]].itertuples(index=False, name=None))
+    assert rows == [
+        ("Coffee", pd.Timestamp("2025-03-15"), 120.0),  # both older Coffee periods overlap the newer one
+        ("Food", pd.Timestamp("2025-03-01"), 40.0),     # no newer Food period overlaps March
+        ("Food", pd.Timestamp("2025-04-01"), 35.0),
+    ]
@@ -0,0 +1,81 @@
+# tests/test_snapshot_backend.py
+
+from datetime import date, time
+from pathlib import Path
+import pandas as pd
+import pytest
+import snapshot_backend
+from snapshots import _write_partition
+
+SQL_DIR = Path(__file__).resolve().parents[1] / "sql"
+
+
+def test_every_sql_file_has_a_handler():
+    files = {path.stem for path in SQL_DIR.glob("*.sql")}
+    assert files - snapshot_backend.HANDLERS.keys() == set()
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path, monkeypatch):
+    """A two-month, two-location snapshot laid out like db/snapshots.py writes it."""
+    days = [date(2025, 5, 30), date(2025, 5, 31), date(2025, 6, 1), date(2025, 6, 2)]
+    details = pd.DataFrame({
+        "transaction_id": ["t1", "t1", "t2", "t3", "t4", "t5"],
+        "line_no": [0, 1, 0, 0, 0, 0],
+        "location": ["Toasted Bean Coffee", "Toasted Bean Coffee", "Truck Two", "Toasted Bean Coffee", "Truck Two",
+                     "Toasted Bean Coffee"],
+        "item": ["Latte", "Scone", "Latte", "Mocha", "Drip", "Water"],
+        "category": ["Coffee", "Food", "Coffee", "Coffee", "Coffee", None],
+        "date": pd.to_datetime([days[0], days[0], days[1], days[2], days[3], days[3]]),
+        "time": [time(8, 10), time(8, 10), time(9, 30), time(10, 0), time(11, 15), time(12, 0)],
+        "gross_sales": [4.5, 3.0, 4.5, 5.0, 2.5, 0.0],
+        "discounts": 0.0,
+        "refunds": 0.0,
+        "modifiers_applied": ["Oat Milk", None, "Oat Milk, 3x shot", None, None, None],
+        "channel": ["Toasted Bean Coffee", "Toasted Bean Coffee", "Truck Two", "Toasted Bean Coffee", "Truck Two",
+                    "Toasted Bean Coffee"],
+        "card_brand": ["Visa", "Visa", None, "Amex", "Visa", None],
+        "employee_name": ["Ana", "Ana", "Ben", "Ana", None, "Ben"],
+        "customer_id": ["c1", "c1", None, "c1", "c2", None],
+        "customer_name": ["Cara", "Cara", None, "Cara", "Dev", None],
+    })
+    details["datetime"] = details["date"] + pd.to_timedelta(details["time"].astype(str))
+    periods = pd.DataFrame({"start_date": pd.to_datetime([days[0], days[2]]), "end_date": pd.to_datetime([days[1], days[3]])})
+    tables = {
+        "detail_items": ("date", details),
+        "category_sales": ("start_date", periods.assign(category="Coffee", revenue=[12.0, 7.5])),
+        "sales_summary": ("start_date", periods.assign(sales_type="Sale", amount=[12.0, 7.5])),
+    }
+    for table, (date_col, df) in tables.items():
+        for month, part in df.groupby(df[date_col].dt.strftime("%Y-%m")):
+            _write_partition(part.reset_index(drop=True), table, month, tmp_path / table)
+    monkeypatch.setattr(snapshot_backend, "SNAPSHOT_DIR", tmp_path)
+    return tmp_path
+
+
+PARAMS = {
+    "detail_items_filtered": {"start_date": date(2025, 5, 1), "end_date": date(2025, 7, 1),
+                              "channels": None, "categories": None, "card_brands": None},
+    "low_traffic_alerts": {"days": 30, "z_threshold": 1.0, "min_history": 1},
+}
+
+
+@pytest.mark.parametrize("location", [None, "Truck Two"])
+def test_every_handler_runs_on_a_snapshot(snapshot_dir, location):
+    for name in snapshot_backend.HANDLERS:
+        df = snapshot_backend.run(f"sql/{name}.sql", {"location": location, **PARAMS.get(name, {})})
+        assert isinstance(df, pd.DataFrame), name
+
+
+def test_rollup_handlers_match_the_detail_rows(snapshot_dir):
+    monthly = snapshot_backend.run("sql/monthly_summary.sql", {"location": None})
+    assert monthly["total_orders"].tolist() == [3, 2]  # June, then May
+    assert monthly["total_revenue"].tolist() == [7.5, 12.0]
+
+    mix = snapshot_backend.run("sql/payment_mix.sql", {"location": None}).set_index("payment_method")
+    assert mix.loc["Cash", "transaction_count"] == 2
+    assert mix.loc["Visa", "total_revenue"] == 10.0
+
+    zero = snapshot_backend.run("sql/zero_value_orders.sql", {"location": None})
+    assert zero["transaction_id"].tolist() == ["t5"]
+    assert snapshot_backend.run("sql/zero_value_orders.sql", {"location": "Truck Two"}).empty
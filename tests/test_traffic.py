@@ -0,0 +1,59 @@
+# tests/test_traffic.py
+
+import numpy as np
+import pandas as pd
+import pytest
+from traffic import DAY, RollingStats, score
+
+WINDOW = 4
+
+
+def daily_series(weeks: int = 12, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2025-01-06", periods=weeks * 7, freq="D")
+    return pd.DataFrame({"date": dates, "hour": DAY, "orders": rng.integers(5, 60, len(dates))})
+
+
+def test_rolling_stats_match_pandas_rolling():
+    values = np.random.default_rng(1).normal(40, 12, 50)
+    expected = pd.Series(values).rolling(WINDOW)
+    stats, means, stds = RollingStats(), [], []
+    for i, x in enumerate(values):
+        stats.add(x)
+        if i >= WINDOW:
+            stats.remove(values[i - WINDOW])
+        means.append(stats.mean)
+        stds.append(stats.std)
+    assert means[WINDOW - 1:] == pytest.approx(expected.mean().to_numpy()[WINDOW - 1:])
+    assert stds[WINDOW - 1:] == pytest.approx(expected.std().to_numpy()[WINDOW - 1:])
+
+
+def test_score_uses_the_previous_same_weekday_window():
+    series = daily_series()
+    flags, _ = score(series, window=WINDOW)
+
+    # Baseline for a row: the WINDOW previous observations of its weekday.
+    previous = series.groupby(series["date"].dt.weekday)["orders"].transform(
+        lambda s: s.shift(1).rolling(WINDOW, min_periods=1).mean()
+    )
+    spread = series.groupby(series["date"].dt.weekday)["orders"].transform(
+        lambda s: s.shift(1).rolling(WINDOW, min_periods=2).std()
+    )
+    expected = series.assign(mean=previous, std=spread)
+    merged = flags.merge(expected, on=["date", "hour"], suffixes=("", "_pandas"))
+    assert len(merged) == len(series)
+    assert merged["mean"].astype(float).to_numpy() == pytest.approx(merged["mean_pandas"].to_numpy(), nan_ok=True)
+    assert merged["std"].to_numpy() == pytest.approx(merged["std_pandas"].to_numpy(), nan_ok=True)
+    z = (merged["orders"] - merged["mean_pandas"]) / merged["std_pandas"]
+    assert merged["z"].to_numpy() == pytest.approx(z.to_numpy(), nan_ok=True)
+
+
+def test_resumed_score_matches_a_full_rescore():
+    series = daily_series()
+    since = series["date"].iloc[-10]
+    full, _ = score(series, window=WINDOW)
+    _, baselines = score(series[series["date"] < since], window=WINDOW)
+    states = {(b.weekday, b.hour): (b.n, b.mean, b.m2, b.last_date, b.window) for b in baselines.itertuples()}
+    resumed, _ = score(series, window=WINDOW, since=since, states=states)
+    tail = full[full["date"] >= since].reset_index(drop=True)
+    pd.testing.assert_frame_equal(resumed, tail, check_exact=False)